@@ -0,0 +1,42 @@
+"""add_queue_counters
+
+Revision ID: 27a699274dbb
+Revises: edb5e93e1aa2
+Create Date: 2026-10-16 18:30:48.304549
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '27a699274dbb'
+down_revision: Union[str, None] = 'edb5e93e1aa2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'queue_counters',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('last_number', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', name=op.f('pk_queue_counters'))
+    )
+    # Continue numbering from the numbers already issued
+    op.execute(
+        """
+        INSERT INTO queue_counters (day, last_number)
+        SELECT created_at::date, max(queue_number)
+        FROM queue
+        GROUP BY created_at::date
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('queue_counters')
@@ -0,0 +1,43 @@
+"""add_queue_date_column
+
+Revision ID: 2bb7fe20fc02
+Revises: e44b7c905ad1
+Create Date: 2026-10-16 18:33:02.975057
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2bb7fe20fc02'
+down_revision: Union[str, None] = 'e44b7c905ad1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'queue',
+        sa.Column(
+            'queue_date',
+            sa.Date(),
+            sa.Computed("(created_at AT TIME ZONE 'UTC')::date", persisted=True),
+            nullable=True
+        )
+    )
+    op.create_index(
+        'ix_queue_date_number',
+        'queue',
+        ['queue_date', 'queue_number'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_date_number', table_name='queue')
+    op.drop_column('queue', 'queue_date')
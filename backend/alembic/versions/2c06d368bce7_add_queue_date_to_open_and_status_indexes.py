@@ -0,0 +1,51 @@
+"""add_queue_date_to_open_and_status_indexes
+
+Revision ID: 2c06d368bce7
+Revises: 93eac9659158
+Create Date: 2026-10-16 18:44:41.564938
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c06d368bce7'
+down_revision: Union[str, None] = '93eac9659158'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_queue_open_by_priority', table_name='queue')
+    op.create_index(
+        'ix_queue_open_by_priority',
+        'queue',
+        ['doctor_id', 'queue_date', sa.text('priority_key DESC'), 'id'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('WAITING', 'SERVING')"),
+        postgresql_include=['patient_id', 'appointment_id', 'queue_number']
+    )
+    op.create_index(
+        'ix_queue_date_status',
+        'queue',
+        ['queue_date', 'status'],
+        unique=False,
+        postgresql_include=['wait_minutes']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_date_status', table_name='queue')
+    op.drop_index('ix_queue_open_by_priority', table_name='queue')
+    op.create_index(
+        'ix_queue_open_by_priority',
+        'queue',
+        ['doctor_id', sa.text('priority_key DESC'), 'id'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('WAITING', 'SERVING')")
+    )
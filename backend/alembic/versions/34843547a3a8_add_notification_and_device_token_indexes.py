@@ -0,0 +1,41 @@
+"""add_notification_and_device_token_indexes
+
+Revision ID: 34843547a3a8
+Revises: 39ffd2fb0e65
+Create Date: 2026-10-16 18:17:44.188817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '34843547a3a8'
+down_revision: Union[str, None] = '39ffd2fb0e65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_notifications_patient_created',
+        'notifications',
+        ['patient_id', sa.text('created_at DESC')],
+        unique=False
+    )
+    op.create_index(
+        'ix_device_tokens_patient_active',
+        'device_tokens',
+        ['patient_id'],
+        unique=False,
+        postgresql_where=sa.text('is_active IS true')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_device_tokens_patient_active', table_name='device_tokens')
+    op.drop_index('ix_notifications_patient_created', table_name='notifications')
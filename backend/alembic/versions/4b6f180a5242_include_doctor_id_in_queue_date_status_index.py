@@ -0,0 +1,42 @@
+"""include_doctor_id_in_queue_date_status_index
+
+Revision ID: 4b6f180a5242
+Revises: 966d6ab326f4
+Create Date: 2026-10-16 19:01:55.278613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b6f180a5242'
+down_revision: Union[str, None] = '966d6ab326f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_queue_date_status', table_name='queue')
+    op.create_index(
+        'ix_queue_date_status',
+        'queue',
+        ['queue_date', 'status'],
+        unique=False,
+        postgresql_include=['wait_minutes', 'doctor_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_date_status', table_name='queue')
+    op.create_index(
+        'ix_queue_date_status',
+        'queue',
+        ['queue_date', 'status'],
+        unique=False,
+        postgresql_include=['wait_minutes']
+    )
@@ -0,0 +1,34 @@
+"""add_skipped_to_queuestatus
+
+Revision ID: 5a1f0c9e7d24
+Revises: bf6269d4b117
+Create Date: 2026-10-16 18:52:10.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1f0c9e7d24'
+down_revision: Union[str, None] = 'bf6269d4b117'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # QueueStatus.SKIPPED was never added to the type created by the initial
+    # migration. A new enum label cannot be used in the transaction that adds
+    # it, so it is committed on its own before later migrations refer to it
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE queuestatus ADD VALUE IF NOT EXISTS 'SKIPPED'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # PostgreSQL cannot drop a label from an enum type; SKIPPED rows go back
+    # to WAITING and the unused label is left in place
+    op.execute("UPDATE queue SET status = 'WAITING' WHERE status = 'SKIPPED'")
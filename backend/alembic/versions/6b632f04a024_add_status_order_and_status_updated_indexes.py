@@ -0,0 +1,42 @@
+"""add_status_order_and_status_updated_indexes
+
+Revision ID: 6b632f04a024
+Revises: 4b6f180a5242
+Create Date: 2026-10-16 19:16:53.215949
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b632f04a024'
+down_revision: Union[str, None] = '4b6f180a5242'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_queue_status_order',
+        'queue',
+        ['status', sa.text('priority_key DESC'), 'id'],
+        unique=False
+    )
+    op.create_index('ix_queue_status_updated', 'queue', ['status', 'updated_at'], unique=False)
+    op.create_index(
+        'ix_appointments_status_updated',
+        'appointments',
+        ['status', 'updated_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_status_updated', table_name='appointments')
+    op.drop_index('ix_queue_status_updated', table_name='queue')
+    op.drop_index('ix_queue_status_order', table_name='queue')
@@ -0,0 +1,33 @@
+"""add_queue_doctor_created_status_index
+
+Revision ID: 76da69ca6f57
+Revises: 34843547a3a8
+Create Date: 2026-10-16 18:24:01.867374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '76da69ca6f57'
+down_revision: Union[str, None] = '34843547a3a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_queue_doctor_created_status',
+        'queue',
+        ['doctor_id', 'created_at', 'status'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_doctor_created_status', table_name='queue')
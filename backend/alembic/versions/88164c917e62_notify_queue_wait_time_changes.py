@@ -0,0 +1,45 @@
+"""notify_queue_wait_time_changes
+
+Revision ID: 88164c917e62
+Revises: 8d6c00a3ed73
+Create Date: 2026-10-16 19:59:10.245841
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '88164c917e62'
+down_revision: Union[str, None] = '8d6c00a3ed73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Wait estimates are rewritten when the queue moves; patients subscribed
+    # over WebSocket need those updates pushed too
+    op.execute("DROP TRIGGER IF EXISTS queue_notify_change ON queue")
+    op.execute(
+        """
+        CREATE TRIGGER queue_notify_change
+        AFTER INSERT OR DELETE
+        OR UPDATE OF status, priority_score, doctor_id, estimated_wait_time ON queue
+        FOR EACH ROW EXECUTE FUNCTION notify_queue_change()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS queue_notify_change ON queue")
+    op.execute(
+        """
+        CREATE TRIGGER queue_notify_change
+        AFTER INSERT OR DELETE OR UPDATE OF status, priority_score, doctor_id ON queue
+        FOR EACH ROW EXECUTE FUNCTION notify_queue_change()
+        """
+    )
@@ -0,0 +1,33 @@
+"""add_queue_doctor_status_order_index
+
+Revision ID: 89e6dd531937
+Revises: de81f8944d28
+Create Date: 2026-10-16 18:28:30.567898
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '89e6dd531937'
+down_revision: Union[str, None] = 'de81f8944d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_queue_doctor_status_order',
+        'queue',
+        ['doctor_id', 'status', sa.text('priority_score DESC'), 'created_at', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_doctor_status_order', table_name='queue')
@@ -0,0 +1,33 @@
+"""drop_queue_doctor_created_status_index
+
+Revision ID: 8d6c00a3ed73
+Revises: 9764290b8b9d
+Create Date: 2026-10-16 19:50:05.104422
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d6c00a3ed73'
+down_revision: Union[str, None] = '9764290b8b9d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_queue_doctor_created_status', table_name='queue')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_queue_doctor_created_status',
+        'queue',
+        ['doctor_id', 'created_at', 'status'],
+        unique=False
+    )
@@ -0,0 +1,103 @@
+"""add_queue_priority_key
+
+Revision ID: 93eac9659158
+Revises: 94b17384432f
+Create Date: 2026-10-16 18:43:54.025475
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def _notify_function(priority_column: str) -> str:
+    """notify_queue_change() publishing the given ordering column"""
+    return f"""
+        CREATE OR REPLACE FUNCTION notify_queue_change() RETURNS trigger AS $$
+        DECLARE
+            changed queue;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := OLD;
+            ELSE
+                changed := NEW;
+            END IF;
+            PERFORM pg_notify(
+                'queue_changes',
+                json_build_object(
+                    'op', TG_OP,
+                    'id', changed.id,
+                    'doctor_id', changed.doctor_id,
+                    'status', changed.status,
+                    '{priority_column}', changed.{priority_column},
+                    'created_at', changed.created_at,
+                    'queue_date', changed.queue_date
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+
+
+# revision identifiers, used by Alembic.
+revision: str = '93eac9659158'
+down_revision: Union[str, None] = '94b17384432f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'queue',
+        sa.Column(
+            'priority_key',
+            sa.BigInteger(),
+            sa.Computed(
+                "COALESCE(priority_score, 0)::bigint * 360"
+                " - EXTRACT(epoch FROM created_at - TIMESTAMPTZ '2000-01-01 00:00:00+00')::bigint",
+                persisted=True
+            ),
+            nullable=True
+        )
+    )
+    # Order by the aged key instead of (priority_score, created_at)
+    op.drop_index('ix_queue_doctor_status_order', table_name='queue')
+    op.drop_index('ix_queue_open_by_priority', table_name='queue')
+    op.create_index(
+        'ix_queue_doctor_status_order',
+        'queue',
+        ['doctor_id', 'status', sa.text('priority_key DESC'), 'id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_queue_open_by_priority',
+        'queue',
+        ['doctor_id', sa.text('priority_key DESC'), 'id'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('WAITING', 'SERVING')")
+    )
+    op.execute(_notify_function('priority_key'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(_notify_function('priority_score'))
+    op.drop_index('ix_queue_open_by_priority', table_name='queue')
+    op.drop_index('ix_queue_doctor_status_order', table_name='queue')
+    op.create_index(
+        'ix_queue_doctor_status_order',
+        'queue',
+        ['doctor_id', 'status', sa.text('priority_score DESC'), 'created_at', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_queue_open_by_priority',
+        'queue',
+        ['doctor_id', sa.text('priority_score DESC'), 'created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('WAITING', 'SERVING')")
+    )
+    op.drop_column('queue', 'priority_key')
@@ -0,0 +1,65 @@
+"""add_queue_change_notify_trigger
+
+Revision ID: 94b17384432f
+Revises: 2bb7fe20fc02
+Create Date: 2026-10-16 18:42:09.910688
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '94b17384432f'
+down_revision: Union[str, None] = '2bb7fe20fc02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Publish queue row changes so API processes can keep their in-memory
+    # waiting heaps current (see services/queue_heap.py)
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_queue_change() RETURNS trigger AS $$
+        DECLARE
+            changed queue;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := OLD;
+            ELSE
+                changed := NEW;
+            END IF;
+            PERFORM pg_notify(
+                'queue_changes',
+                json_build_object(
+                    'op', TG_OP,
+                    'id', changed.id,
+                    'doctor_id', changed.doctor_id,
+                    'status', changed.status,
+                    'priority_score', changed.priority_score,
+                    'created_at', changed.created_at,
+                    'queue_date', changed.queue_date
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER queue_notify_change
+        AFTER INSERT OR DELETE OR UPDATE OF status, priority_score, doctor_id ON queue
+        FOR EACH ROW EXECUTE FUNCTION notify_queue_change()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS queue_notify_change ON queue")
+    op.execute("DROP FUNCTION IF EXISTS notify_queue_change()")
@@ -0,0 +1,35 @@
+"""add_appointment_created_at_indexes
+
+Revision ID: 966d6ab326f4
+Revises: c4d01793188b
+Create Date: 2026-10-16 19:00:36.277281
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '966d6ab326f4'
+down_revision: Union[str, None] = 'c4d01793188b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_appointments_created_at', 'appointments', ['created_at'], unique=False)
+    op.create_index(
+        'ix_appointments_patient_created',
+        'appointments',
+        ['patient_id', 'created_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_patient_created', table_name='appointments')
+    op.drop_index('ix_appointments_created_at', table_name='appointments')
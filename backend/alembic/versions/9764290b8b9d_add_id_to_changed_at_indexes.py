@@ -0,0 +1,43 @@
+"""add_id_to_changed_at_indexes
+
+Revision ID: 9764290b8b9d
+Revises: c21566bb78f3
+Create Date: 2026-10-16 19:27:24.747577
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9764290b8b9d'
+down_revision: Union[str, None] = 'c21566bb78f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sync pages walk (change time, id) in order, so the id is part of the key
+    for table in ('patients', 'appointments', 'queue'):
+        op.drop_index(f'ix_{table}_changed_at', table_name=table)
+        op.create_index(
+            f'ix_{table}_changed_at',
+            table,
+            [sa.text('COALESCE(updated_at, created_at)'), 'id'],
+            unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('patients', 'appointments', 'queue'):
+        op.drop_index(f'ix_{table}_changed_at', table_name=table)
+        op.create_index(
+            f'ix_{table}_changed_at',
+            table,
+            [sa.text('COALESCE(updated_at, created_at)')],
+            unique=False
+        )
@@ -0,0 +1,57 @@
+"""add_row_version_counters
+
+Revision ID: ad6519d1af6f
+Revises: 6b632f04a024
+Create Date: 2026-10-16 19:18:26.179874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ad6519d1af6f'
+down_revision: Union[str, None] = '6b632f04a024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('patients', 'appointments', 'queue'):
+        op.add_column(
+            table,
+            sa.Column('version', sa.Integer(), server_default='0', nullable=False)
+        )
+    
+    # Every UPDATE bumps the row's version, including bulk Core updates that
+    # never go through the ORM; offline sync compares it to spot newer edits
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in ('patients', 'appointments', 'queue'):
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_bump_version
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION bump_row_version()
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('patients', 'appointments', 'queue'):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_bump_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_row_version()")
+    for table in ('queue', 'appointments', 'patients'):
+        op.drop_column(table, 'version')
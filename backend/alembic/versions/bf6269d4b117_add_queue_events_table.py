@@ -0,0 +1,40 @@
+"""add_queue_events_table
+
+Revision ID: bf6269d4b117
+Revises: 2c06d368bce7
+Create Date: 2026-10-16 18:51:40.002568
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf6269d4b117'
+down_revision: Union[str, None] = '2c06d368bce7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'queue_events',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('queue_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event', sa.String(length=20), nullable=False),
+        sa.Column('reason', sa.Text(), nullable=True),
+        sa.Column('actor_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['queue_id'], ['queue.id'], name=op.f('fk_queue_events_queue_id_queue')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_queue_events'))
+    )
+    op.create_index('ix_queue_events_queue_created', 'queue_events', ['queue_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_events_queue_created', table_name='queue_events')
+    op.drop_table('queue_events')
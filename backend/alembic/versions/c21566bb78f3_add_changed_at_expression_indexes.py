@@ -0,0 +1,35 @@
+"""add_changed_at_expression_indexes
+
+Revision ID: c21566bb78f3
+Revises: ad6519d1af6f
+Create Date: 2026-10-16 19:24:28.298099
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c21566bb78f3'
+down_revision: Union[str, None] = 'ad6519d1af6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('patients', 'appointments', 'queue'):
+        op.create_index(
+            f'ix_{table}_changed_at',
+            table,
+            [sa.text('COALESCE(updated_at, created_at)')],
+            unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('queue', 'appointments', 'patients'):
+        op.drop_index(f'ix_{table}_changed_at', table_name=table)
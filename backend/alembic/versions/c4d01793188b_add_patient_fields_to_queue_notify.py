@@ -0,0 +1,65 @@
+"""add_patient_fields_to_queue_notify
+
+Revision ID: c4d01793188b
+Revises: d24e4e5b72e1
+Create Date: 2026-10-16 18:53:52.912759
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def _notify_function(include_patient: bool) -> str:
+    """notify_queue_change(), optionally with the fields WebSocket clients need"""
+    client_fields = (
+        """
+                    'patient_id', changed.patient_id,
+                    'queue_number', changed.queue_number,
+                    'estimated_wait_time', changed.estimated_wait_time,"""
+        if include_patient else ""
+    )
+    return f"""
+        CREATE OR REPLACE FUNCTION notify_queue_change() RETURNS trigger AS $$
+        DECLARE
+            changed queue;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := OLD;
+            ELSE
+                changed := NEW;
+            END IF;
+            PERFORM pg_notify(
+                'queue_changes',
+                json_build_object(
+                    'op', TG_OP,
+                    'id', changed.id,
+                    'doctor_id', changed.doctor_id,
+                    'status', changed.status,{client_fields}
+                    'priority_key', changed.priority_key,
+                    'created_at', changed.created_at,
+                    'queue_date', changed.queue_date
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d01793188b'
+down_revision: Union[str, None] = 'd24e4e5b72e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(_notify_function(include_patient=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(_notify_function(include_patient=False))
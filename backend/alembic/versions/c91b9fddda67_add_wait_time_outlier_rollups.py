@@ -0,0 +1,103 @@
+"""add_wait_time_outlier_rollups
+
+Revision ID: c91b9fddda67
+Revises: 27a699274dbb
+Create Date: 2026-10-16 18:31:36.694706
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c91b9fddda67'
+down_revision: Union[str, None] = '27a699274dbb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Recreate the hourly rollup with wait sums that exclude outliers
+    # (entries served 8 hours or more after joining the queue)
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS queue_hourly_stats")
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW queue_hourly_stats AS
+        SELECT
+            date_trunc('hour', created_at) AS hour_start,
+            status,
+            count(*) AS total,
+            count(*) FILTER (WHERE status = 'COMPLETED') AS served,
+            sum(extract(epoch FROM served_at - created_at) / 60)
+                FILTER (WHERE status = 'COMPLETED' AND served_at IS NOT NULL) AS wait_minutes,
+            count(*)
+                FILTER (WHERE status = 'COMPLETED' AND served_at IS NOT NULL) AS waits,
+            sum(extract(epoch FROM served_at - created_at) / 60)
+                FILTER (WHERE status = 'COMPLETED' AND served_at - created_at < interval '8 hours') AS clamped_wait_minutes,
+            count(*)
+                FILTER (WHERE status = 'COMPLETED' AND served_at - created_at < interval '8 hours') AS clamped_waits
+        FROM queue
+        WHERE created_at < date_trunc('day', now())
+        GROUP BY 1, 2
+        """
+    )
+    op.create_index(
+        'ix_queue_hourly_stats_hour_status',
+        'queue_hourly_stats',
+        ['hour_start', 'status'],
+        unique=True
+    )
+    # Medians are not additive across hours, so closed days get their own rollup
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW queue_daily_wait_stats AS
+        SELECT
+            created_at::date AS day,
+            percentile_cont(0.5) WITHIN GROUP (
+                ORDER BY extract(epoch FROM served_at - created_at) / 60
+            ) AS p50_wait_minutes
+        FROM queue
+        WHERE status = 'COMPLETED'
+            AND served_at IS NOT NULL
+            AND created_at < date_trunc('day', now())
+        GROUP BY 1
+        """
+    )
+    op.create_index(
+        'ix_queue_daily_wait_stats_day',
+        'queue_daily_wait_stats',
+        ['day'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS queue_daily_wait_stats")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS queue_hourly_stats")
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW queue_hourly_stats AS
+        SELECT
+            date_trunc('hour', created_at) AS hour_start,
+            status,
+            count(*) AS total,
+            count(*) FILTER (WHERE status = 'COMPLETED') AS served,
+            sum(extract(epoch FROM served_at - created_at) / 60)
+                FILTER (WHERE status = 'COMPLETED' AND served_at IS NOT NULL) AS wait_minutes,
+            count(*)
+                FILTER (WHERE status = 'COMPLETED' AND served_at IS NOT NULL) AS waits
+        FROM queue
+        WHERE created_at < date_trunc('day', now())
+        GROUP BY 1, 2
+        """
+    )
+    op.create_index(
+        'ix_queue_hourly_stats_hour_status',
+        'queue_hourly_stats',
+        ['hour_start', 'status'],
+        unique=True
+    )
@@ -0,0 +1,137 @@
+"""add_queue_daily_stats
+
+Revision ID: d24e4e5b72e1
+Revises: 5a1f0c9e7d24
+Create Date: 2026-10-16 18:52:34.525091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# Per-status counters; wait totals are added separately
+_COUNTERS = [
+    'total', 'waiting', 'called', 'serving', 'completed', 'cancelled', 'no_show', 'skipped'
+]
+# doctor_id stored for entries without a doctor
+UNASSIGNED = '00000000-0000-0000-0000-000000000000'
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd24e4e5b72e1'
+down_revision: Union[str, None] = '5a1f0c9e7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'queue_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('doctor_id', postgresql.UUID(as_uuid=True), nullable=False),
+        *[
+            sa.Column(name, sa.Integer(), server_default='0', nullable=False)
+            for name in _COUNTERS
+        ],
+        sa.Column('wait_minutes_sum', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('waits', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('day', 'doctor_id', name=op.f('pk_queue_daily_stats'))
+    )
+    
+    # Add (sign = 1) or take back (sign = -1) one queue row's contribution
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION queue_daily_stats_apply(entry queue, sign integer)
+        RETURNS void AS $$
+        BEGIN
+            INSERT INTO queue_daily_stats AS stats (
+                day, doctor_id, total, waiting, called, serving, completed,
+                cancelled, no_show, skipped, wait_minutes_sum, waits
+            )
+            VALUES (
+                entry.queue_date,
+                COALESCE(entry.doctor_id, '{UNASSIGNED}'::uuid),
+                sign,
+                CASE WHEN entry.status = 'WAITING' THEN sign ELSE 0 END,
+                CASE WHEN entry.status = 'CALLED' THEN sign ELSE 0 END,
+                CASE WHEN entry.status = 'SERVING' THEN sign ELSE 0 END,
+                CASE WHEN entry.status = 'COMPLETED' THEN sign ELSE 0 END,
+                CASE WHEN entry.status = 'CANCELLED' THEN sign ELSE 0 END,
+                CASE WHEN entry.status = 'NO_SHOW' THEN sign ELSE 0 END,
+                CASE WHEN entry.status = 'SKIPPED' THEN sign ELSE 0 END,
+                sign * COALESCE(entry.wait_minutes, 0),
+                CASE WHEN entry.wait_minutes IS NOT NULL THEN sign ELSE 0 END
+            )
+            ON CONFLICT (day, doctor_id) DO UPDATE SET
+                total = stats.total + EXCLUDED.total,
+                waiting = stats.waiting + EXCLUDED.waiting,
+                called = stats.called + EXCLUDED.called,
+                serving = stats.serving + EXCLUDED.serving,
+                completed = stats.completed + EXCLUDED.completed,
+                cancelled = stats.cancelled + EXCLUDED.cancelled,
+                no_show = stats.no_show + EXCLUDED.no_show,
+                skipped = stats.skipped + EXCLUDED.skipped,
+                wait_minutes_sum = stats.wait_minutes_sum + EXCLUDED.wait_minutes_sum,
+                waits = stats.waits + EXCLUDED.waits;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION queue_daily_stats_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM queue_daily_stats_apply(OLD, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM queue_daily_stats_apply(NEW, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER queue_daily_stats
+        AFTER INSERT OR DELETE OR UPDATE OF status, doctor_id, served_at ON queue
+        FOR EACH ROW EXECUTE FUNCTION queue_daily_stats_trigger()
+        """
+    )
+    
+    # Counts for existing rows
+    op.execute(
+        f"""
+        INSERT INTO queue_daily_stats (
+            day, doctor_id, total, waiting, called, serving, completed,
+            cancelled, no_show, skipped, wait_minutes_sum, waits
+        )
+        SELECT
+            queue_date,
+            COALESCE(doctor_id, '{UNASSIGNED}'::uuid),
+            count(*),
+            count(*) FILTER (WHERE status = 'WAITING'),
+            count(*) FILTER (WHERE status = 'CALLED'),
+            count(*) FILTER (WHERE status = 'SERVING'),
+            count(*) FILTER (WHERE status = 'COMPLETED'),
+            count(*) FILTER (WHERE status = 'CANCELLED'),
+            count(*) FILTER (WHERE status = 'NO_SHOW'),
+            count(*) FILTER (WHERE status = 'SKIPPED'),
+            COALESCE(sum(wait_minutes), 0),
+            count(wait_minutes)
+        FROM queue
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS queue_daily_stats ON queue")
+    op.execute("DROP FUNCTION IF EXISTS queue_daily_stats_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS queue_daily_stats_apply(queue, integer)")
+    op.drop_table('queue_daily_stats')
@@ -0,0 +1,53 @@
+"""add_queue_hourly_stats_view
+
+Revision ID: de81f8944d28
+Revises: 76da69ca6f57
+Create Date: 2026-10-16 18:26:55.639293
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'de81f8944d28'
+down_revision: Union[str, None] = '76da69ca6f57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per-hour, per-status rollup of closed days; the current day is always
+    # read from the queue table itself
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW queue_hourly_stats AS
+        SELECT
+            date_trunc('hour', created_at) AS hour_start,
+            status,
+            count(*) AS total,
+            count(*) FILTER (WHERE status = 'COMPLETED') AS served,
+            sum(extract(epoch FROM served_at - created_at) / 60)
+                FILTER (WHERE status = 'COMPLETED' AND served_at IS NOT NULL) AS wait_minutes,
+            count(*)
+                FILTER (WHERE status = 'COMPLETED' AND served_at IS NOT NULL) AS waits
+        FROM queue
+        WHERE created_at < date_trunc('day', now())
+        GROUP BY 1, 2
+        """
+    )
+    # Required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index(
+        'ix_queue_hourly_stats_hour_status',
+        'queue_hourly_stats',
+        ['hour_start', 'status'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS queue_hourly_stats")
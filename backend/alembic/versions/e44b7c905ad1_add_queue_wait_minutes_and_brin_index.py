@@ -0,0 +1,45 @@
+"""add_queue_wait_minutes_and_brin_index
+
+Revision ID: e44b7c905ad1
+Revises: c91b9fddda67
+Create Date: 2026-10-16 18:32:18.237138
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e44b7c905ad1'
+down_revision: Union[str, None] = 'c91b9fddda67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'queue',
+        sa.Column(
+            'wait_minutes',
+            sa.Integer(),
+            sa.Computed("(EXTRACT(epoch FROM served_at - created_at) / 60)::integer", persisted=True),
+            nullable=True
+        )
+    )
+    op.create_index(
+        'ix_queue_created_brin',
+        'queue',
+        ['created_at'],
+        unique=False,
+        postgresql_using='brin',
+        postgresql_with={'pages_per_range': 32}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_created_brin', table_name='queue')
+    op.drop_column('queue', 'wait_minutes')
@@ -0,0 +1,34 @@
+"""add_queue_open_by_priority_index
+
+Revision ID: edb5e93e1aa2
+Revises: 89e6dd531937
+Create Date: 2026-10-16 18:28:40.382942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'edb5e93e1aa2'
+down_revision: Union[str, None] = '89e6dd531937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_queue_open_by_priority',
+        'queue',
+        ['doctor_id', sa.text('priority_score DESC'), 'created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('WAITING', 'SERVING')")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queue_open_by_priority', table_name='queue')
@@ -6,6 +6,7 @@ from sqlalchemy import select, insert
 from database import get_db, AsyncSessionLocal
 from models import User, Patient, UserRole
 from api.core.security import verify_token, create_credentials_exception
+from services.notification_service import NotificationService
 from uuid import UUID
 import logging
 
@@ -83,6 +84,11 @@ require_admin_or_staff = RoleChecker([UserRole.ADMIN, UserRole.STAFF, UserRole.R
 require_staff_or_doctor = RoleChecker([UserRole.ADMIN, UserRole.STAFF, UserRole.RECEPTIONIST, UserRole.DOCTOR])
 
 
+def notification_service_dependency(request: Request) -> NotificationService:
+    """Get the NotificationService owned by the application lifespan"""
+    return request.app.state.notification_service
+
+
 async def log_audit_event(
     request: Request,
     user_id: Optional[UUID] = None,
@@ -14,7 +14,7 @@ from schemas import (
     SystemAnalytics, Token, UserLogin, PatientCreate, PatientSchema
 )
 from services import AuthService, PatientService
-from services.notification_service import notification_service
+from services.doctor_service import invalidate_available_doctors
 from services.queue_analytics import get_queue_analytics
 from services.appointment_analytics import get_appointment_analytics
 from services.doctor_analytics import get_doctor_analytics
@@ -327,6 +327,7 @@ async def create_doctor(
             raise ValueError("Username already exists")
         
         # Create user with timestamps
+        now = datetime.utcnow()
         stmt = insert(User).values(
             username=user_data.username,
             password_hash=get_password_hash(user_data.password),
@@ -334,8 +335,8 @@ async def create_doctor(
             first_name=user_data.first_name,
             last_name=user_data.last_name,
             role=user_data.role,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            created_at=now,
+            updated_at=now
         ).returning(User)
         
         result = await db.execute(stmt)
@@ -354,6 +355,7 @@ async def create_doctor(
         result = await db.execute(doctor_stmt)
         doctor = result.scalar_one()
         await db.commit()
+        await invalidate_available_doctors()
         
         # Log audit event
         background_tasks.add_task(
@@ -444,6 +446,7 @@ async def update_doctor(
             
         await db.commit()
         await db.refresh(doctor)
+        await invalidate_available_doctors()
         
         # Log audit event
         background_tasks.add_task(
@@ -528,7 +531,10 @@ async def get_admin_dashboard_stats(
         # Appointments today
         appointments_today = await db.execute(
             select(func.count(Appointment.id))
-            .where(func.date(Appointment.created_at) == func.current_date())
+            .where(
+                Appointment.created_at >= func.current_date(),
+                Appointment.created_at < func.current_date() + 1
+            )
         )
         
         # Active queue length
@@ -586,7 +592,7 @@ async def get_system_analytics(
         # Average wait times by day
         daily_wait_times = await db.execute(
             select(
-                func.date(Queue.created_at).label('date'),
+                Queue.queue_date.label('date'),
                 func.avg(
                     func.extract('epoch', Queue.updated_at - Queue.created_at) / 60
                 ).label('avg_wait_time')
@@ -597,8 +603,8 @@ async def get_system_analytics(
                     Queue.created_at >= start_date
                 )
             )
-            .group_by(func.date(Queue.created_at))
-            .order_by(func.date(Queue.created_at))
+            .group_by(Queue.queue_date)
+            .order_by(Queue.queue_date)
         )
         
         # Most active doctors
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func, desc, insert
 from uuid import UUID
@@ -7,8 +7,8 @@ import uuid
 import logging
 from datetime import datetime, timedelta
 
-from database import get_db
-from models import Patient, User, Doctor, Appointment, Queue, QueueStatus, UrgencyLevel, AppointmentStatus, NotificationType
+from database import get_db, AsyncSessionLocal
+from models import Patient, User, UserRole, Doctor, Appointment, Queue, QueueStatus, UrgencyLevel, AppointmentStatus, NotificationType
 from schemas import (
     Queue as QueueSchema, 
     Patient as PatientSchema,
@@ -24,11 +24,13 @@ from schemas import (
     Notification, NotificationCreate
 )
 from services import AuthService, DoctorService
-from services.notification_service import notification_service
+from services.notification_service import NotificationService
 from services.queue_service import QueueService
-from api.dependencies import require_doctor, log_audit_event
-from api.core.security import create_access_token
+from services.queue_broadcast import queue_broadcaster
+from api.dependencies import require_doctor, notification_service_dependency, log_audit_event
+from api.core.security import create_access_token, verify_token
 from api.core.config import settings
+from utils.datetime_utils import get_utc_today
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -255,7 +257,7 @@ async def get_doctor_queue(
             print(f"Error in query execution: {str(query_error)}")
             # Try a simpler query to debug
             result = await db.execute(
-                select(Queue)
+                select(func.count(Queue.id))
                 .join(Appointment, Queue.appointment_id == Appointment.id)
                 .where(
                     and_(
@@ -264,7 +266,7 @@ async def get_doctor_queue(
                     )
                 )
             )
-            print(f"Simple query executed, found {len(result.all())} queue entries")
+            print(f"Simple query executed, found {result.scalar_one()} queue entries")
             return []
         
         # Convert to Pydantic schemas to avoid MissingGreenlet issues
@@ -326,6 +328,41 @@ async def get_doctor_queue(
             detail=f"Failed to fetch doctor queue: {str(e)}"
         )
 
+@router.websocket("/queue/ws")
+async def queue_updates(websocket: WebSocket, token: str):
+    """
+    Push changes to the doctor's queue as they are committed
+    
+    The access token is passed as the `token` query parameter. Each message is
+    the changed queue row (id, status, patient_id, queue_number, ...).
+    """
+    subject = verify_token(token)
+    doctor = None
+    if subject is not None:
+        try:
+            async with AsyncSessionLocal() as db:  # type: ignore
+                result = await db.execute(
+                    select(Doctor)
+                    .join(User, Doctor.user_id == User.id)
+                    .where(
+                        and_(
+                            User.id == UUID(subject),
+                            User.is_active.is_(True),
+                            User.role.in_([UserRole.ADMIN, UserRole.DOCTOR])
+                        )
+                    )
+                )
+                doctor = result.scalar_one_or_none()
+        except ValueError:
+            doctor = None
+    
+    if doctor is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await queue_broadcaster.serve(("doctor", doctor.id), websocket)
+
+
 @router.get("/queue/next", response_model=Optional[QueueSchema])
 async def get_next_patient(
     current_user: User = Depends(require_doctor),
@@ -423,7 +460,8 @@ async def mark_patient_served(
     background_tasks: BackgroundTasks,
     notes: Optional[str] = None,
     current_user: User = Depends(require_doctor),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Mark patient as served"""
     try:
@@ -479,7 +517,7 @@ async def mark_patient_served(
             QueueService.update_queue_positions,
             db=db,
             doctor_id=doctor.id,
-            notification_service=None
+            notification_service=notification_service
         )
         
         # Send completion notification
@@ -684,7 +722,8 @@ async def get_doctor_dashboard_stats(
                 and_(
                     Appointment.doctor_id == doctor.id,
                     Appointment.status == "completed",
-                    func.date(Appointment.updated_at) == func.current_date()
+                    Appointment.updated_at >= func.current_date(),
+                    Appointment.updated_at < func.current_date() + 1
                 )
             )
         )
@@ -724,7 +763,7 @@ async def get_doctor_dashboard_stats(
                 and_(
                     Appointment.doctor_id == doctor.id,
                     Queue.status == QueueStatus.COMPLETED,
-                    func.date(Queue.created_at) == func.current_date()
+                    Queue.queue_date == get_utc_today()
                 )
             )
         )
@@ -1219,7 +1258,8 @@ async def skip_patient(
     request: Request,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(require_doctor),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Skip patient in queue"""
     try:
@@ -1258,7 +1298,7 @@ async def skip_patient(
         queue_entry, appointment, patient = queue_data
         
         # Skip the patient using QueueService
-        await QueueService.skip_patient(db, queue_id, "Skipped by doctor")
+        await QueueService.skip_patient(db, queue_id, "Skipped by doctor", current_user.id)
         
         # Commit the transaction
         await db.commit()
@@ -1268,7 +1308,7 @@ async def skip_patient(
             QueueService.update_queue_positions,
             db=db,
             doctor_id=doctor.id,
-            notification_service=None
+            notification_service=notification_service
         )
         
         # Log audit event
@@ -1390,7 +1430,8 @@ async def create_notification(
     request: Request,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(require_doctor),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Create and send a notification (doctor access)"""
     try:
@@ -1423,7 +1464,8 @@ async def notify_patient(
     request: Request,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(require_doctor),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Send a manual notification from doctor to patient"""
     try:
@@ -7,8 +7,8 @@ from datetime import datetime
 from database import get_db
 from models import User, Patient, Notification as NotificationModel, NotificationType, DeviceToken
 from schemas import NotificationUpdate, Notification
-from services.notification_service import notification_service
-from api.dependencies import get_current_user, log_audit_event
+from services.notification_service import NotificationService
+from api.dependencies import get_current_user, notification_service_dependency, log_audit_event
 
 router = APIRouter()
 
@@ -18,7 +18,8 @@ async def mark_notification_read(
     request: Request,
     background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Mark a notification as read"""
     try:
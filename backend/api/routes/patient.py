@@ -1,6 +1,6 @@
 from typing import Optional
 from datetime import timedelta, datetime
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, insert
 from sqlalchemy.orm import selectinload
@@ -9,7 +9,7 @@ from uuid import UUID
 import logging
 import uuid
 
-from database import get_db
+from database import get_db, AsyncSessionLocal
 from models import Patient, Appointment, Notification, DeviceToken, PatientSettings, Doctor, User, UrgencyLevel, AppointmentStatus
 from schemas import (
     PatientCreate, PatientUpdate, PatientLogin, Patient as PatientSchema,
@@ -19,8 +19,10 @@ from schemas import (
 )
 from services import AuthService
 from services.queue_service import QueueService
-from services.notification_service import NotificationService, notification_service
-from api.core.security import create_access_token, get_password_hash, verify_password
+from services.queue_broadcast import queue_broadcaster
+from services.notification_service import NotificationService
+from workers.notification_tasks import enqueue_notification
+from api.core.security import create_access_token, get_password_hash, verify_password, verify_token
 from api.core.config import settings
 from api.dependencies import get_current_patient, log_audit_event
 
@@ -290,6 +292,33 @@ async def get_queue_status(
         )
 
 
+@router.websocket("/queue-status/ws")
+async def queue_status_updates(websocket: WebSocket, token: str):
+    """
+    Push the patient's queue status as the queue changes
+    
+    Browsers cannot set headers on WebSocket requests, so the access token is
+    passed as the `token` query parameter. The current status is sent on
+    connect and again whenever it changes (someone ahead is served, the wait
+    estimate is recalculated, ...); each message has the /queue-status fields,
+    or is null once the patient is no longer queued.
+    """
+    subject = verify_token(token)
+    patient = None
+    if subject is not None:
+        try:
+            async with AsyncSessionLocal() as db:  # type: ignore
+                patient = await db.get(Patient, UUID(subject))
+        except ValueError:
+            patient = None
+    
+    if patient is None or not patient.is_active:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await queue_broadcaster.serve(("patient", patient.id), websocket)
+
+
 @router.get("/appointments", response_model=list[AppointmentSchema])
 async def get_patient_appointments(
     current_patient: Patient = Depends(get_current_patient),
@@ -850,10 +879,9 @@ async def create_appointment(
         try:
             queue_entry = await QueueService.add_to_queue(db, appointment.id)
             
-            # Send confirmation notification using the global instance
-            background_tasks.add_task(
-                notification_service.send_appointment_confirmation,
-                db=db,
+            # Hand the confirmation off to the notification worker
+            await enqueue_notification(
+                "send_appointment_confirmation",
                 patient_id=current_patient.id,
                 appointment_id=appointment.id,
                 queue_number=queue_entry.queue_number
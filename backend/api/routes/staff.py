@@ -1,7 +1,8 @@
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, desc, asc, insert, update
+from sqlalchemy import select, and_, func, desc, insert, update
 from sqlalchemy.orm import selectinload
 from uuid import UUID
 from datetime import datetime, timedelta, timezone
@@ -21,12 +22,13 @@ from schemas import (
 )
 from services.queue_service import QueueService
 from services.notification_service import NotificationService
+from workers.notification_tasks import enqueue_notification
 from services import AuthService, AppointmentService, PatientService
-from api.dependencies import require_staff, require_staff_or_doctor, log_audit_event
+from api.dependencies import require_staff, require_staff_or_doctor, notification_service_dependency, log_audit_event
 from api.core.security import create_access_token
 from api.core.config import settings
 from pydantic import BaseModel
-from utils.datetime_utils import get_timezone_aware_now
+from utils.datetime_utils import get_timezone_aware_now, get_utc_today
 import uuid
 import logging
 
@@ -196,19 +198,12 @@ async def create_appointment(
             queue_entry = await QueueService.add_to_queue(db, appointment.id)
             print(f"Added to queue with ID: {queue_entry.id}")
             
-            # Send notification to patient
-            async def send_notification_task(patient, appointment, queue_number):
-                from database import AsyncSessionLocal
-                async with AsyncSessionLocal() as db:  # type: ignore
-                    await NotificationService.notify_appointment_booked(
-                        db, patient, appointment, queue_number
-                    )
-            
-            background_tasks.add_task(
-                send_notification_task,
-                patient,
-                appointment,
-                queue_entry.queue_number
+            # Hand the confirmation off to the notification worker
+            await enqueue_notification(
+                "send_appointment_confirmation",
+                patient_id=patient.id,
+                appointment_id=appointment.id,
+                queue_number=queue_entry.queue_number
             )
         except Exception as queue_error:
             print(f"Error adding to queue: {str(queue_error)}")
@@ -351,62 +346,9 @@ async def get_queue_status(
 ):
     """Get current queue status"""
     try:
-        # Get all queue entries for today with relationships
-        result = await db.execute(
-            select(Queue, Appointment, Patient)
-            .join(Appointment, Queue.appointment_id == Appointment.id)
-            .join(Patient, Appointment.patient_id == Patient.id)
-            .where(func.date(Queue.created_at) == func.current_date())
-            .order_by(desc(Queue.priority_score), asc(Queue.queue_number))
-        )
-        
-        queue_entries = []
-        all_results = result.all()
-        
-        for queue, appointment, patient in all_results:
-            # Manually construct the queue entry with relationships
-            queue_entry = {
-                "id": str(queue.id),
-                "appointment_id": str(queue.appointment_id),
-                "queue_number": queue.queue_number,
-                "priority_score": queue.priority_score,
-                "status": queue.status.value if hasattr(queue.status, 'value') else str(queue.status),
-                "estimated_wait_time": queue.estimated_wait_time,
-                "called_at": queue.called_at.isoformat() if queue.called_at else None,
-                "served_at": queue.served_at.isoformat() if queue.served_at else None,
-                "created_at": queue.created_at.isoformat() if queue.created_at else None,
-                "updated_at": queue.updated_at.isoformat() if queue.updated_at else None,
-                "appointment": {
-                    "id": str(appointment.id),
-                    "patient_id": str(appointment.patient_id),
-                    "doctor_id": str(appointment.doctor_id) if appointment.doctor_id else None,
-                    "appointment_date": appointment.appointment_date.isoformat() if appointment.appointment_date else None,
-                    "urgency": appointment.urgency.value if hasattr(appointment.urgency, 'value') else str(appointment.urgency),
-                    "reason": appointment.reason,
-                    "status": appointment.status.value if hasattr(appointment.status, 'value') else str(appointment.status),
-                    "created_at": appointment.created_at.isoformat() if appointment.created_at else None,
-                    "updated_at": appointment.updated_at.isoformat() if appointment.updated_at else None,
-                    "patient": {
-                        "id": str(patient.id),
-                        "first_name": patient.first_name,
-                        "last_name": patient.last_name,
-                        "phone_number": patient.phone_number,
-                        "email": patient.email,
-                        "gender": patient.gender,
-                        "date_of_birth": patient.date_of_birth.isoformat() if patient.date_of_birth else None,
-                        "address": patient.address,
-                        "emergency_contact": patient.emergency_contact,
-                        "emergency_contact_name": patient.emergency_contact_name,
-                        "emergency_contact_relationship": patient.emergency_contact_relationship,
-                        "is_active": patient.is_active,
-                        "created_at": patient.created_at.isoformat() if patient.created_at else None,
-                        "updated_at": patient.updated_at.isoformat() if patient.updated_at else None
-                    }
-                }
-            }
-            queue_entries.append(queue_entry)
-        
-        return queue_entries
+        # Waiting-room screens poll this; the board is cached briefly and
+        # dropped whenever QueueService changes an entry
+        return await QueueService.get_queue_board(db)
         
     except Exception as e:
         print(f"Error fetching queue status: {str(e)}")  # Add logging for debugging
@@ -415,6 +357,21 @@ async def get_queue_status(
             detail="Failed to fetch queue status"
         )
 
+@router.get("/queue/stream")
+async def stream_queue(
+    current_user: User = Depends(require_staff)
+):
+    """Stream today's active queue as newline-delimited JSON"""
+    async def queue_lines():
+        # The request's session is closed before a streamed body is sent,
+        # so the stream owns its own session
+        from database import AsyncSessionLocal
+        async with AsyncSessionLocal() as db:  # type: ignore
+            async for queue_entry in QueueService.stream_all_queue(db):
+                yield QueueSchema.model_validate(queue_entry).model_dump_json() + "\n"
+    
+    return StreamingResponse(queue_lines(), media_type="application/x-ndjson")
+
 @router.put("/queue/{appointment_id}")
 async def update_queue_entry(
     appointment_id: UUID,
@@ -422,15 +379,16 @@ async def update_queue_entry(
     request: Request,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(require_staff),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Update queue entry by appointment ID"""
     try:
-        # Find queue entry by appointment ID
-        result = await db.execute(
-            select(Queue).where(Queue.appointment_id == appointment_id)
-        )
-        queue_entry = result.scalar_one_or_none()
+        # Update queue fields and read the entry back in one statement
+        update_data = queue_update.model_dump(exclude_unset=True)
+        print(f"Updating queue with data: {update_data}")  # Debug logging
+        
+        queue_entry = await QueueService.update_queue_entry(db, appointment_id, update_data)
         
         if not queue_entry:
             raise HTTPException(
@@ -438,32 +396,8 @@ async def update_queue_entry(
                 detail="Queue entry not found for this appointment"
             )
         
-        # Update queue fields
-        update_data = queue_update.model_dump(exclude_unset=True)
-        print(f"Updating queue with data: {update_data}")  # Debug logging
-        
-        for field, value in update_data.items():
-            if hasattr(queue_entry, field):
-                setattr(queue_entry, field, value)
-            else:
-                print(f"Warning: Queue model does not have field '{field}'")
-        
-        # Update timestamp
-        queue_entry.updated_at = get_timezone_aware_now()
-        
         await db.commit()
         
-        # Re-fetch the queue entry with relationships loaded
-        result = await db.execute(
-            select(Queue)
-            .options(
-                selectinload(Queue.appointment).selectinload(Appointment.patient),
-                selectinload(Queue.appointment).selectinload(Appointment.doctor)
-            )
-            .where(Queue.appointment_id == appointment_id)
-        )
-        queue_entry = result.scalar_one()
-        
         # Log audit event
         background_tasks.add_task(
             log_audit_event,
@@ -483,7 +417,7 @@ async def update_queue_entry(
                 from database import AsyncSessionLocal
                 async with AsyncSessionLocal() as db:  # type: ignore
                     await QueueService.update_queue_positions(
-                        db, doctor_id, notification_service=None
+                        db, doctor_id, notification_service=notification_service
                     )
             
             background_tasks.add_task(
@@ -663,59 +597,42 @@ async def get_dashboard_stats(
 ):
     """Get dashboard statistics for staff"""
     try:
-        # Total patients today
-        today_patients = await db.execute(
-            select(func.count(Appointment.id))
-            .where(func.date(Appointment.created_at) == func.current_date())
-        )
-        
-        # Current queue length
-        queue_length = await db.execute(
-            select(func.count(Queue.id))
-            .where(Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED]))
-        )
-        
-        # Urgent cases
-        urgent_cases = await db.execute(
-            select(func.count(Queue.id))
-            .join(Appointment, Queue.appointment_id == Appointment.id)
-            .where(
-                and_(
-                    Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED]),
-                    Appointment.urgency == UrgencyLevel.HIGH
-                )
-            )
-        )
+        # Every figure is for the current UTC day, the day queue_date is kept in
+        today = get_utc_today()
+        day_start = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
         
-        # Average wait time (in minutes)
-        avg_wait_time = await db.execute(
-            select(func.avg(
-                func.extract('epoch', Queue.updated_at - Queue.created_at) / 60
-            ))
+        # Appointments created today
+        today_patients_query = (
+            select(func.count(Appointment.id))
             .where(
-                and_(
-                    Queue.status == QueueStatus.COMPLETED,
-                    func.date(Queue.created_at) == func.current_date()
-                )
+                Appointment.created_at >= day_start,
+                Appointment.created_at < day_start + timedelta(days=1)
             )
+            .scalar_subquery()
         )
         
-        # Get count of completed appointments today
-        served_today = await db.execute(
-            select(func.count(Queue.id))
-            .where(
-                and_(
-                    Queue.status == QueueStatus.COMPLETED,
-                    func.date(Queue.created_at) == func.current_date()
-                )
+        # Current queue length, completed entries and their average wait time
+        # (in minutes) in one pass over today's queue rows; the dashboard is
+        # polled, so everything runs as one statement on the request's session
+        completed = Queue.status == QueueStatus.COMPLETED
+        result = await db.execute(
+            select(
+                today_patients_query,
+                func.count(Queue.id).filter(Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED])),
+                func.count(Queue.id).filter(completed),
+                func.avg(
+                    func.extract('epoch', Queue.updated_at - Queue.created_at) / 60
+                ).filter(completed)
             )
+            .where(Queue.queue_date == today)
         )
+        today_patients, queue_length, served_today, avg_wait_time = result.one()
         
         return DashboardStats(
-            total_patients_today=today_patients.scalar() or 0,
-            total_served_today=served_today.scalar() or 0,
-            current_queue_length=queue_length.scalar() or 0,
-            average_wait_time=int(avg_wait_time.scalar() or 0)
+            total_patients_today=today_patients or 0,
+            total_served_today=served_today or 0,
+            current_queue_length=queue_length or 0,
+            average_wait_time=int(avg_wait_time or 0)
         )
         
     except Exception as e:
@@ -731,78 +648,33 @@ async def get_queue_stats(
 ):
     """Get queue statistics for staff"""
     try:
-        # Get queue counts by status
-        waiting_count_result = await db.execute(
-            select(func.count(Queue.id))
-            .where(
-                and_(
-                    Queue.status == QueueStatus.WAITING,
-                    func.date(Queue.created_at) == func.current_date()
-                )
-            )
-        )
-        waiting_count = waiting_count_result.scalar() or 0
-        
-        called_count_result = await db.execute(
-            select(func.count(Queue.id))
-            .where(
-                and_(
-                    Queue.status == QueueStatus.CALLED,
-                    func.date(Queue.created_at) == func.current_date()
-                )
-            )
-        )
-        called_count = called_count_result.scalar() or 0
-        
-        completed_count_result = await db.execute(
-            select(func.count(Queue.id))
-            .where(
-                and_(
-                    Queue.status == QueueStatus.COMPLETED,
-                    func.date(Queue.created_at) == func.current_date()
-                )
-            )
-        )
-        completed_count = completed_count_result.scalar() or 0
-        
-        cancelled_count_result = await db.execute(
-            select(func.count(Queue.id))
-            .where(
-                and_(
-                    Queue.status == QueueStatus.CANCELLED,
-                    func.date(Queue.created_at) == func.current_date()
+        # Today's counts by status and average wait in one pass over the day's rows
+        counts_result = await db.execute(
+            select(
+                func.count(Queue.id).filter(Queue.status == QueueStatus.WAITING),
+                func.count(Queue.id).filter(Queue.status == QueueStatus.CALLED),
+                func.count(Queue.id).filter(Queue.status == QueueStatus.COMPLETED),
+                func.count(Queue.id).filter(Queue.status == QueueStatus.CANCELLED),
+                func.avg(Queue.wait_minutes).filter(
+                    and_(
+                        Queue.status == QueueStatus.COMPLETED,
+                        Queue.served_at.isnot(None)
+                    )
                 )
             )
+            .where(Queue.queue_date == get_utc_today())
         )
-        cancelled_count = cancelled_count_result.scalar() or 0
+        waiting_count, called_count, completed_count, cancelled_count, avg_wait_time = counts_result.one()
+        avg_wait_time = avg_wait_time or 0
         
-        # Average wait time
-        avg_wait_time_result = await db.execute(
-            select(func.avg(
-                func.extract('epoch', Queue.served_at - Queue.created_at) / 60
-            ))
-            .where(
-                and_(
-                    Queue.status == QueueStatus.COMPLETED,
-                    Queue.served_at.isnot(None),
-                    func.date(Queue.created_at) == func.current_date()
-                )
+        # Get available and total doctors count
+        doctors_result = await db.execute(
+            select(
+                func.count(Doctor.id).filter(Doctor.is_available == True),
+                func.count(Doctor.id)
             )
         )
-        avg_wait_time = avg_wait_time_result.scalar() or 0
-        
-        # Get available doctors count
-        available_doctors_result = await db.execute(
-            select(func.count(Doctor.id))
-            .where(Doctor.is_available == True)
-        )
-        available_doctors = available_doctors_result.scalar() or 0
-        
-        # Get total doctors count
-        total_doctors_result = await db.execute(
-            select(func.count(Doctor.id))
-        )
-        total_doctors = total_doctors_result.scalar() or 0
+        available_doctors, total_doctors = doctors_result.one()
         
         # Get high priority count - using appointment urgency instead of queue urgency
         try:
@@ -812,7 +684,7 @@ async def get_queue_stats(
                     and_(
                         Queue.status == QueueStatus.WAITING,
                         Queue.appointment.has(Appointment.urgency.in_(['high', 'emergency'])),
-                        func.date(Queue.created_at) == func.current_date()
+                        Queue.queue_date == get_utc_today()
                     )
                 )
             )
@@ -923,22 +795,9 @@ async def create_queue_entry(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="appointment_id is required"
             )
-            
-        # Get the appointment to check its urgency
-        result = await db.execute(
-            select(Appointment).where(Appointment.id == appointment_id)
-        )
-        appointment = result.scalar_one_or_none()
-        if not appointment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Appointment not found"
-            )
         
-        # Create queue entry
-        queue_entry = await QueueService.add_to_queue(
-            db, appointment.id, appointment.urgency
-        )
+        # Create queue entry; existence and duplicate checks happen in the insert
+        queue_entry = await QueueService.add_to_queue(db, UUID(str(appointment_id)))
         
         # Log audit event
         background_tasks.add_task(
@@ -954,6 +813,52 @@ async def create_queue_entry(
         
         return queue_entry
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND if str(e) == "Appointment not found" else status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Queue entry creation failed: {str(e)}"
+        )
+
+@router.post("/queue/entries/bulk", response_model=List[QueueSchema])
+async def create_queue_entries(
+    entry_data: dict,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(require_staff),
+    db: AsyncSession = Depends(get_db)
+):
+    """Add several checked-in appointments to the queue in one transaction"""
+    try:
+        appointment_ids = [UUID(str(appointment_id)) for appointment_id in entry_data.get("appointment_ids") or []]
+        if not appointment_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="appointment_ids is required"
+            )
+        
+        queue_entries = await QueueService.add_many_to_queue(db, appointment_ids)
+        
+        for queue_entry in queue_entries:
+            background_tasks.add_task(
+                log_audit_event,
+                request=request,
+                user_id=current_user.id,
+                user_type="user",
+                action="create",
+                resource="queue_entry",
+                resource_id=queue_entry.id,
+                details=f"Staff {current_user.username} added patient to queue"
+            )
+        
+        return queue_entries
+        
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1170,9 +1075,7 @@ async def update_appointment_priority(
             # Temporarily update appointment urgency for priority calculation
             original_urgency = appointment.urgency
             appointment.urgency = UrgencyLevel(urgency)
-            appointment.queue_entry.priority_score = await QueueService._calculate_priority_score(
-                db, appointment, None
-            )
+            appointment.queue_entry.priority_score = QueueService._calculate_priority_score(appointment)
             # Restore original urgency
             appointment.urgency = original_urgency
             
@@ -1253,13 +1156,14 @@ async def assign_patient_to_doctor(
             )
         
         # Update appointment with new doctor
+        now = get_timezone_aware_now()
         appointment.doctor_id = doctor_id
-        appointment.updated_at = get_timezone_aware_now()
+        appointment.updated_at = now
         
         # If appointment is in queue, update queue entry
         if appointment.queue_entry:
             appointment.queue_entry.doctor_id = doctor_id
-            appointment.queue_entry.updated_at = get_timezone_aware_now()
+            appointment.queue_entry.updated_at = now
         
         await db.commit()
         
@@ -1324,8 +1228,9 @@ async def cancel_appointment(
             )
         
         # Update appointment status
+        now = get_timezone_aware_now()
         appointment.status = AppointmentStatus.CANCELLED
-        appointment.updated_at = get_timezone_aware_now()
+        appointment.updated_at = now
         
         # Add cancellation reason if provided
         reason = cancel_data.get("reason", "Cancelled by staff")
@@ -1334,7 +1239,7 @@ async def cancel_appointment(
         # Remove from queue if in queue
         if appointment.queue_entry:
             appointment.queue_entry.status = QueueStatus.CANCELLED
-            appointment.queue_entry.updated_at = get_timezone_aware_now()
+            appointment.queue_entry.updated_at = now
         
         # Save changes
         await db.commit()
@@ -1396,7 +1301,8 @@ async def create_notification(
     request: Request,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(require_staff_or_doctor),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Create and send a notification"""
     try:
@@ -1417,7 +1323,6 @@ async def create_notification(
         
         # Convert to NotificationCreate schema
         notification_create = NotificationCreate(**notification_data)
-        notification_service = NotificationService()
         notification = await notification_service.create_notification(db, notification_create)
         
         # Send notification based on type
@@ -1450,11 +1355,12 @@ async def create_notification(
                 if device_token:
                     subject = getattr(notification, 'subject', notification_create.subject) or "Notification"
                     message = getattr(notification, 'message', notification_create.message)
-                    success = await NotificationService.send_push_notification(
+                    push_result = await notification_service.send_push_notification(
                         device_token.token,
                         subject,
                         message
                     )
+                    success = push_result.get('success', False)
                 else:
                     success = False
                     notification.error_message = "No active device token found"
@@ -1466,9 +1372,10 @@ async def create_notification(
             success = True  # Assume success for now
         
         # Update notification status
+        sent_at = get_timezone_aware_now() if success else None
         try:
             notification.status = "sent" if success else "failed"
-            notification.sent_at = get_timezone_aware_now() if success else None
+            notification.sent_at = sent_at
             await db.commit()
             await db.refresh(notification)
         except Exception as e:
@@ -1480,7 +1387,7 @@ async def create_notification(
                     .where(Notification.id == notification.id)
                     .values(
                         status="sent" if success else "failed",
-                        sent_at=get_timezone_aware_now() if success else None
+                        sent_at=sent_at
                     )
                 )
                 await db.commit()
@@ -1512,11 +1419,11 @@ async def create_bulk_notifications(
     request: Request,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(require_staff_or_doctor),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(notification_service_dependency)
 ):
     """Create and send multiple notifications"""
     try:
-        notification_service = NotificationService()
         notifications = []
         
         # Create notifications one by one
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional
 from datetime import datetime
@@ -7,7 +8,7 @@ from uuid import UUID
 from database import get_db
 from api.dependencies import get_current_user, RoleChecker
 from models import User, UserRole, AuditResource
-from services.sync_service import SyncService
+from services.sync_service import SyncService, SERVER_UPDATES_PAGE_SIZE, decode_sync_cursor
 from services.audit_service import AuditService
 from schemas import SyncRequest, SyncResponse, ConflictResolution
 
@@ -68,16 +69,20 @@ async def sync_offline_data(
 
 @router.get("/status")
 async def get_sync_status(
+    force_refresh: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get current sync status for the user
+    
+    Counts may be a few seconds old; pass force_refresh=true to read them fresh.
     """
     try:
         sync_status = await SyncService.get_sync_status(
             db=db,
-            user_id=current_user.id
+            user_id=current_user.id,
+            force_refresh=force_refresh
         )
         
         return sync_status
@@ -135,12 +140,27 @@ async def resolve_conflict(
 @router.get("/server-updates")
 async def get_server_updates(
     last_sync: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = SERVER_UPDATES_PAGE_SIZE,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get server updates since last sync timestamp
+    
+    Results are paged; while updates.next_cursor is set, request again with
+    the same last_sync and cursor=next_cursor for the remaining rows.
     """
+    try:
+        page_cursor = decode_sync_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 1 <= limit <= SERVER_UPDATES_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 1 and {SERVER_UPDATES_PAGE_SIZE}"
+        )
+    
     try:
         last_sync_timestamp = None
         if last_sync:
@@ -149,13 +169,16 @@ async def get_server_updates(
         server_updates = await SyncService._get_server_updates(
             db=db,
             user_id=current_user.id,
-            last_sync_timestamp=last_sync_timestamp or datetime.min
+            last_sync_timestamp=last_sync_timestamp or datetime.min,
+            cursor=page_cursor,
+            limit=limit
         )
         
-        return {
+        # orjson serializes the rows' UUIDs, datetimes and enums directly
+        return ORJSONResponse({
             "updates": server_updates,
             "timestamp": datetime.utcnow().isoformat()
-        }
+        })
         
     except Exception as e:
         raise HTTPException(
@@ -178,7 +201,8 @@ async def force_sync_all_data(
         # For now, return sync status
         sync_status = await SyncService.get_sync_status(
             db=db,
-            user_id=current_user.id
+            user_id=current_user.id,
+            force_refresh=True
         )
         
         # Log force sync operation
@@ -4,15 +4,33 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import MetaData
 from api.core.config import settings
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Any, List, Sequence
+import asyncio
 
 logger = logging.getLogger(__name__)
 
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=settings.ENVIRONMENT == "development",
+    echo=settings.DB_ECHO if settings.DB_ECHO is not None else settings.ENVIRONMENT == "development",
     pool_pre_ping=True,
+    # Headroom for analytics requests that fan out over several connections
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    # Fail fast instead of queueing requests behind an exhausted pool
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    # Reuse the most recently returned connection so a small working set
+    # stays hot and idle extras can be recycled
+    pool_use_lifo=True,
+    connect_args={
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        # A stuck query releases its connection instead of holding it indefinitely
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+    },
+    # Room for every distinct statement shape the API issues
+    query_cache_size=1200,
 )
 
 # Create async session maker
@@ -45,6 +63,21 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def fetch_all_concurrently(db: AsyncSession, *statements: Any) -> List[Sequence[Any]]:
+    """
+    Run independent read-only statements in parallel and return their rows.
+    
+    An AsyncSession cannot execute statements concurrently, so each statement
+    gets its own short-lived session on the same engine as `db`.
+    """
+    async def fetch(statement: Any) -> Sequence[Any]:
+        async with AsyncSession(db.bind) as session:
+            result = await session.execute(statement)
+            return result.all()
+    
+    return list(await asyncio.gather(*(fetch(statement) for statement in statements)))
+
+
 async def create_tables() -> None:
     """
     Create database tables if they don't exist.
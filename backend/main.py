@@ -11,6 +11,10 @@ from api.core.config import settings
 from api.routes import patient, staff, doctor, admin, router as api_router
 from api.routes.sync import router as sync_router
 from api.routes.notifications import router as notifications_router
+from services.notification_service import get_notification_service
+from services.queue_heap import waiting_queue_heaps
+from services.queue_broadcast import queue_broadcaster
+from database import engine
 
 # Configure logging
 logging.basicConfig(
@@ -24,9 +28,19 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     logger.info(f"Starting {settings.API_NAME}...")
+    notification_service = get_notification_service()
+    await notification_service.startup()
+    app.state.notification_service = notification_service
+    # One LISTEN connection feeds both the call-next heaps and WebSocket pushes
+    waiting_queue_heaps.add_change_listener(queue_broadcaster.publish)
+    await waiting_queue_heaps.startup()
     yield
     # Shutdown
     logger.info("Shutting down...")
+    await waiting_queue_heaps.aclose()
+    await notification_service.aclose()
+    # Close pooled connections so PostgreSQL sees clean disconnects
+    await engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, Text, ForeignKey, Enum as SQLEnum, JSON
+from sqlalchemy import Column, String, DateTime, Date, Boolean, Integer, Text, ForeignKey, Enum as SQLEnum, JSON, Index, Computed, BigInteger, FetchedValue
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -87,11 +87,19 @@ class Patient(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by the bump_row_version trigger on every UPDATE; offline sync
+    # compares it to detect edits made since the client last saw the row
+    version = Column(Integer, nullable=False, server_default="0", server_onupdate=FetchedValue())
     
     # Relationships
     appointments = relationship("Appointment", back_populates="patient")
     notifications = relationship("Notification", back_populates="patient")
     notes = relationship("PatientNote", back_populates="patient")
+    
+    __table_args__ = (
+        # Rows changed since a client's last sync (see services/sync_service.py)
+        Index("ix_patients_changed_at", func.coalesce(updated_at, created_at), "id"),
+    )
 
 
 class User(Base):
@@ -151,6 +159,9 @@ class Appointment(Base):
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by the bump_row_version trigger on every UPDATE; offline sync
+    # compares it to detect edits made since the client last saw the row
+    version = Column(Integer, nullable=False, server_default="0", server_onupdate=FetchedValue())
     
     # Relationships
     patient = relationship("Patient", back_populates="appointments")
@@ -158,6 +169,21 @@ class Appointment(Base):
     created_by_user = relationship("User", back_populates="created_appointments")
     queue_entry = relationship("Queue", back_populates="appointment", uselist=False)
     consultation_feedback = relationship("ConsultationFeedback", back_populates="appointment", uselist=False)
+    
+    __table_args__ = (
+        # Range scans for "created today" counts and the one-active-appointment check
+        Index("ix_appointments_created_at", created_at),
+        Index("ix_appointments_patient_created", patient_id, created_at),
+        # Status changes since a point in time (completed in the last 24 h)
+        Index("ix_appointments_status_updated", status, updated_at),
+        # Rows changed since a client's last sync
+        Index("ix_appointments_changed_at", func.coalesce(updated_at, created_at), "id"),
+    )
+
+
+# Queue entries gain one priority point per this many seconds of waiting
+# (10 points an hour), so a time-invariant key orders them by aged priority
+PRIORITY_AGING_SECONDS_PER_POINT = 360
 
 
 class Queue(Base):
@@ -176,9 +202,115 @@ class Queue(Base):
     served_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by the bump_row_version trigger on every UPDATE; offline sync
+    # compares it to detect edits made since the client last saw the row
+    version = Column(Integer, nullable=False, server_default="0", server_onupdate=FetchedValue())
+    # UTC calendar day the entry joined the queue; daily lookups filter on this
+    queue_date = Column(Date, Computed("(created_at AT TIME ZONE 'UTC')::date", persisted=True))
+    # Minutes from joining the queue to being served; NULL until served
+    wait_minutes = Column(
+        Integer,
+        Computed("(EXTRACT(epoch FROM served_at - created_at) / 60)::integer", persisted=True)
+    )
+    # Aged priority (priority_score plus a point per 360 s waited) times 360, minus
+    # the "now" term every row shares: a constant that orders like the aged score
+    priority_key = Column(
+        BigInteger,
+        Computed(
+            f"COALESCE(priority_score, 0)::bigint * {PRIORITY_AGING_SECONDS_PER_POINT}"
+            " - EXTRACT(epoch FROM created_at - TIMESTAMPTZ '2000-01-01 00:00:00+00')::bigint",
+            persisted=True
+        )
+    )
     
     # Relationships
     appointment = relationship("Appointment", back_populates="queue_entry")
+    
+    __table_args__ = (
+        Index(
+            "ix_queue_doctor_status_order",
+            doctor_id, status, priority_key.desc(), id
+        ),
+        # Open entries only: the rows call_next_patient and live queue views scan,
+        # already in call order and carrying the columns listings need
+        Index(
+            "ix_queue_open_by_priority",
+            doctor_id, queue_date, priority_key.desc(), id,
+            postgresql_where=status.in_([QueueStatus.WAITING, QueueStatus.SERVING]),
+            postgresql_include=["patient_id", "appointment_id", "queue_number"]
+        ),
+        # Waiting entries in call order across all doctors (update_queue_positions,
+        # queue listings without a doctor filter)
+        Index("ix_queue_status_order", status, priority_key.desc(), id),
+        # Entries in a status changed since a point in time
+        Index("ix_queue_status_updated", status, updated_at),
+        # Rows changed since a client's last sync
+        Index("ix_queue_changed_at", func.coalesce(updated_at, created_at), "id"),
+        Index("ix_queue_date_number", queue_date, queue_number),
+        # Per-doctor load on a day (get_doctor_with_least_queue)
+        Index(
+            "ix_queue_date_status",
+            queue_date, status,
+            postgresql_include=["wait_minutes", "doctor_id"]
+        ),
+        # Queue rows arrive in created_at order, so a BRIN index covers time-range
+        # scans (analytics windows) at a fraction of a btree's size
+        Index(
+            "ix_queue_created_brin",
+            created_at,
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32}
+        ),
+    )
+
+
+class QueueCounter(Base):
+    """Last queue number handed out per day; one row per day"""
+    __tablename__ = "queue_counters"
+    
+    day = Column(Date, primary_key=True)
+    last_number = Column(Integer, nullable=False, default=0)
+
+
+# queue_daily_stats row for entries without a doctor (primary keys cannot be NULL)
+UNASSIGNED_DOCTOR_ID = uuid.UUID(int=0)
+
+
+class QueueDailyStats(Base):
+    """
+    Per-day, per-doctor queue counts kept current by the queue_daily_stats
+    trigger on queue; dashboards read these instead of scanning the day
+    """
+    __tablename__ = "queue_daily_stats"
+    
+    day = Column(Date, primary_key=True)
+    doctor_id = Column(UUID(as_uuid=True), primary_key=True)  # UNASSIGNED_DOCTOR_ID when none
+    total = Column(Integer, nullable=False, default=0)
+    waiting = Column(Integer, nullable=False, default=0)
+    called = Column(Integer, nullable=False, default=0)
+    serving = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0)
+    no_show = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    wait_minutes_sum = Column(BigInteger, nullable=False, default=0)
+    waits = Column(Integer, nullable=False, default=0)  # entries with a wait_minutes value
+
+
+class QueueEvent(Base):
+    """Append-only history of queue entry transitions and their reasons"""
+    __tablename__ = "queue_events"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    queue_id = Column(UUID(as_uuid=True), ForeignKey("queue.id"), nullable=False)
+    event = Column(String(20), nullable=False)  # skipped, removed
+    reason = Column(Text, nullable=True)
+    actor_id = Column(UUID(as_uuid=True), nullable=True)  # user who made the change
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_queue_events_queue_created", queue_id, created_at),
+    )
 
 
 class Notification(Base):
@@ -202,6 +334,10 @@ class Notification(Base):
     # Relationships
     patient = relationship("Patient", back_populates="notifications", foreign_keys=[patient_id])
     user = relationship("User", foreign_keys=[user_id])
+    
+    __table_args__ = (
+        Index("ix_notifications_patient_created", patient_id, created_at.desc()),
+    )
 
 
 class NotificationTemplate(Base):
@@ -250,6 +386,14 @@ class DeviceToken(Base):
     
     # Relationship
     patient = relationship("Patient")
+    
+    __table_args__ = (
+        Index(
+            "ix_device_tokens_patient_active",
+            patient_id,
+            postgresql_where=is_active.is_(True)
+        ),
+    )
 
 
 class PatientSettings(Base):
@@ -2,12 +2,13 @@ from typing import Optional, List
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, desc, asc, update, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 from uuid import UUID
 import logging
 
 from models import (
-    Patient, User, Doctor, Appointment, Queue, Notification, AuditLog,
+    Patient, User, Doctor, Appointment, Queue, QueueCounter, Notification, AuditLog,
     UserRole, AppointmentStatus, QueueStatus, UrgencyLevel, NotificationType,
     DeviceToken, NotificationTemplate
 )
@@ -20,6 +21,7 @@ from schemas import (
 )
 from api.core.config import settings
 from api.core.security import get_password_hash, verify_password, create_access_token
+from utils.datetime_utils import get_utc_today
 from .doctor_service import DoctorService
 
 # Import analytics services
@@ -146,21 +148,30 @@ class QueueService:
     @staticmethod
     async def get_next_queue_number(db: AsyncSession) -> int:
         """Get next available queue number"""
+        # Per-day counter row shared with queue_service.QueueService; the upsert
+        # is race-free where MAX(queue_number) + 1 handed out duplicates
         result = await db.execute(
-            select(func.max(Queue.queue_number)).where(
-                func.date(Queue.created_at) == func.current_date()
+            pg_insert(QueueCounter)
+            .values(day=get_utc_today(), last_number=1)
+            .on_conflict_do_update(
+                index_elements=[QueueCounter.day],
+                set_={"last_number": QueueCounter.last_number + 1}
             )
+            .returning(QueueCounter.last_number)
         )
-        max_number = result.scalar_one_or_none()
-        return (max_number or 0) + 1
+        return result.scalar_one()
     
     @staticmethod
     async def calculate_priority_score(
         urgency: UrgencyLevel,
-        appointment_time: datetime,
         patient_age: Optional[int] = None
     ) -> int:
-        """Calculate priority score for queue"""
+        """
+        Calculate the stored priority score for a queue entry.
+        
+        Only the time-independent part is stored; waiting time is added by the
+        generated Queue.priority_key, so the score never needs recomputing.
+        """
         base_score = {
             UrgencyLevel.EMERGENCY: 1000,
             UrgencyLevel.HIGH: 100,
@@ -175,14 +186,7 @@ class QueueService:
         elif patient_age and patient_age >= 80:
             age_factor = 100
         
-        # Time factor (earlier appointments get slightly higher priority)
-        now = datetime.utcnow()
-        if appointment_time < now:
-            time_factor = 20  # Late appointments get priority
-        else:
-            time_factor = 0
-        
-        return base_score + age_factor + time_factor
+        return base_score + age_factor
     
     @staticmethod
     async def add_to_queue(
@@ -205,7 +209,7 @@ class QueueService:
         
         # Calculate priority score
         priority_score = await QueueService.calculate_priority_score(
-            urgency, appointment.appointment_date, patient_age
+            urgency, patient_age
         )
         
         # Create queue entry
@@ -245,7 +249,7 @@ class QueueService:
                 and_(
                     Appointment.patient_id == patient_id,
                     Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED]),
-                    func.date(Queue.created_at) == func.current_date()
+                    Queue.queue_date == get_utc_today()
                 )
             )
             .order_by(desc(Queue.created_at))
@@ -262,8 +266,8 @@ class QueueService:
             .where(
                 and_(
                     Queue.status == QueueStatus.WAITING,
-                    Queue.priority_score > queue_entry.priority_score,
-                    func.date(Queue.created_at) == func.current_date()
+                    Queue.priority_key > queue_entry.priority_key,
+                    Queue.queue_date == get_utc_today()
                 )
             )
         )
@@ -287,7 +291,7 @@ class QueueService:
         limit: int = 50
     ) -> List[Queue]:
         """Get queue list with optional status filter"""
-        query = select(Queue).order_by(Queue.priority_score.desc(), Queue.created_at.asc())
+        query = select(Queue).order_by(Queue.priority_key.desc(), Queue.id.asc())
         
         if status:
             query = query.where(Queue.status == status)
@@ -305,10 +309,10 @@ class QueueService:
             .where(
                 and_(
                     Queue.status == QueueStatus.WAITING,
-                    func.date(Queue.created_at) == func.current_date()
+                    Queue.queue_date == get_utc_today()
                 )
             )
-            .order_by(Queue.priority_score.desc(), Queue.created_at.asc())
+            .order_by(Queue.priority_key.desc(), Queue.id.asc())
             .limit(1)
         )
         queue_entry = result.scalar_one_or_none()
@@ -472,10 +476,13 @@ class AppointmentService:
         )
         patient = result.scalar_one()
         
-        # Send notification using new notification service
-        from services.notification_service import notification_service
-        await notification_service.send_appointment_confirmation(
-            db, patient.id, appointment.id, queue_entry.queue_number
+        # Hand the confirmation off to the notification worker
+        from workers.notification_tasks import enqueue_notification
+        await enqueue_notification(
+            "send_appointment_confirmation",
+            patient_id=patient.id,
+            appointment_id=appointment.id,
+            queue_number=queue_entry.queue_number
         )
         
         logger.info(f"Appointment created: {appointment.id}")
@@ -489,7 +496,7 @@ class AppointmentService:
         # Total patients today
         result = await db.execute(
             select(func.count(Queue.id))
-            .where(func.date(Queue.created_at) == today)
+            .where(Queue.queue_date == today)
         )
         total_patients_today = result.scalar_one()
         
@@ -498,7 +505,7 @@ class AppointmentService:
             select(func.count(Queue.id))
             .where(
                 and_(
-                    func.date(Queue.created_at) == today,
+                    Queue.queue_date == today,
                     Queue.status == QueueStatus.COMPLETED
                 )
             )
@@ -510,7 +517,7 @@ class AppointmentService:
             select(func.count(Queue.id))
             .where(
                 and_(
-                    func.date(Queue.created_at) == today,
+                    Queue.queue_date == today,
                     Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED])
                 )
             )
@@ -519,12 +526,10 @@ class AppointmentService:
         
         # Average wait time (for completed appointments)
         result = await db.execute(
-            select(func.avg(
-                func.extract('epoch', Queue.served_at - Queue.created_at) / 60
-            ))
+            select(func.avg(Queue.wait_minutes))
             .where(
                 and_(
-                    func.date(Queue.created_at) == today,
+                    Queue.queue_date == today,
                     Queue.status == QueueStatus.COMPLETED,
                     Queue.served_at.isnot(None)
                 )
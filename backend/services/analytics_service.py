@@ -32,21 +32,19 @@ class AnalyticsService:
         # Get daily queue counts
         daily_queues = await db.execute(
             select(
-                func.date(Queue.created_at).label('date'),
+                Queue.queue_date.label('date'),
                 func.count(Queue.id).label('count')
             )
             .where(Queue.created_at >= start_date)
-            .group_by(func.date(Queue.created_at))
-            .order_by(func.date(Queue.created_at))
+            .group_by(Queue.queue_date)
+            .order_by(Queue.queue_date)
         )
         
         # Get average wait times by day
         daily_wait_times = await db.execute(
             select(
-                func.date(Queue.created_at).label('date'),
-                func.avg(
-                    func.extract('epoch', Queue.served_at - Queue.created_at) / 60
-                ).label('avg_wait_time')
+                Queue.queue_date.label('date'),
+                func.avg(Queue.wait_minutes).label('avg_wait_time')
             )
             .where(
                 and_(
@@ -55,8 +53,8 @@ class AnalyticsService:
                     Queue.served_at.isnot(None)
                 )
             )
-            .group_by(func.date(Queue.created_at))
-            .order_by(func.date(Queue.created_at))
+            .group_by(Queue.queue_date)
+            .order_by(Queue.queue_date)
         )
         
         # Get queue status distribution
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import select, func, and_, desc, case
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from database import fetch_all_concurrently
 from models import (
     Appointment, Doctor, User, ConsultationFeedback, 
     AppointmentStatus, UrgencyLevel
@@ -14,7 +15,7 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
     start_date = end_date - timedelta(days=days)
     
     # Daily appointment counts
-    daily_appointments = await db.execute(
+    daily_appointments_query = (
         select(
             func.date(Appointment.created_at).label('date'),
             func.count(Appointment.id).label('count')
@@ -25,7 +26,7 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
     )
     
     # Appointment status distribution
-    status_distribution = await db.execute(
+    status_distribution_query = (
         select(
             Appointment.status,
             func.count(Appointment.id).label('count')
@@ -35,7 +36,7 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
     )
     
     # Urgency level distribution
-    urgency_distribution = await db.execute(
+    urgency_distribution_query = (
         select(
             Appointment.urgency,
             func.count(Appointment.id).label('count')
@@ -45,7 +46,7 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
     )
     
     # Average consultation time by doctor
-    consultation_times = await db.execute(
+    consultation_times_query = (
         select(
             Doctor.id,
             func.concat(User.first_name, ' ', User.last_name).label('doctor_name'),
@@ -59,7 +60,7 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
     )
     
     # No-show rate by day
-    no_show_rates = await db.execute(
+    no_show_rates_query = (
         select(
             func.date(Appointment.appointment_date).label('date'),
             func.count(Appointment.id).label('total'),
@@ -76,7 +77,7 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
     )
     
     # Appointment wait time (time between creation and actual appointment)
-    appointment_wait_times = await db.execute(
+    appointment_wait_times_query = (
         select(
             func.date(Appointment.created_at).label('date'),
             func.avg(
@@ -93,18 +94,36 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
         .order_by(func.date(Appointment.created_at))
     )
     
+    # Independent aggregations, run in parallel on separate connections
+    (
+        daily_appointments,
+        status_distribution,
+        urgency_distribution,
+        consultation_times,
+        no_show_rates,
+        appointment_wait_times,
+    ) = await fetch_all_concurrently(
+        db,
+        daily_appointments_query,
+        status_distribution_query,
+        urgency_distribution_query,
+        consultation_times_query,
+        no_show_rates_query,
+        appointment_wait_times_query,
+    )
+    
     return {
         "daily_appointments": [
             {"date": str(row.date), "count": row.count}
-            for row in daily_appointments.all()
+            for row in daily_appointments
         ],
         "status_distribution": [
             {"status": row.status.value, "count": row.count}
-            for row in status_distribution.all()
+            for row in status_distribution
         ],
         "urgency_distribution": [
             {"urgency_level": row.urgency.value, "count": row.count}
-            for row in urgency_distribution.all()
+            for row in urgency_distribution
         ],
         "consultation_times": [
             {
@@ -112,7 +131,7 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
                 "doctor_name": row.doctor_name, 
                 "avg_duration": int(row.avg_duration or 0)
             }
-            for row in consultation_times.all()
+            for row in consultation_times
         ],
         "no_show_rates": [
             {
@@ -121,13 +140,13 @@ async def get_appointment_analytics(db: AsyncSession, days: int = 30) -> Dict[st
                 "no_shows": row.no_shows or 0,
                 "rate": round((row.no_shows or 0) / row.total * 100, 2) if row.total > 0 else 0
             }
-            for row in no_show_rates.all()
+            for row in no_show_rates
         ],
         "appointment_wait_times": [
             {
                 "date": str(row.date),
                 "avg_wait_days": round(row.avg_wait_days or 0, 1)
             }
-            for row in appointment_wait_times.all()
+            for row in appointment_wait_times
         ]
     } 
\ No newline at end of file
@@ -1,8 +1,8 @@
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, insert
+from sqlalchemy import select, and_, insert
 from uuid import UUID
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 from models import Appointment, Patient, Doctor, UrgencyLevel, AppointmentStatus
 from schemas import AppointmentCreate, AppointmentUpdate
@@ -39,7 +39,8 @@ class AppointmentService:
             select(Appointment).where(
                 and_(
                     Appointment.patient_id == appointment_data.patient_id,
-                    func.date(Appointment.created_at) == today,
+                    Appointment.created_at >= today,
+                    Appointment.created_at < today + timedelta(days=1),
                     Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.IN_PROGRESS])
                 )
             )
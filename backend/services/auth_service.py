@@ -7,6 +7,7 @@ from uuid import UUID
 from models import Patient, User, Doctor
 from schemas import PatientCreate, UserCreate, DoctorCreate, UserUpdate, DoctorUpdate
 from api.core.security import get_password_hash, verify_password
+from services.doctor_service import invalidate_available_doctors
 
 
 class AuthService:
@@ -249,6 +250,7 @@ class AuthService:
         
         await db.commit()
         await db.refresh(doctor)
+        await invalidate_available_doctors()
         
         return doctor
     
@@ -4,6 +4,7 @@ from sqlalchemy import select, func, and_, desc, extract, distinct
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
+from database import fetch_all_concurrently
 from models import (
     User, Doctor, Appointment, PatientNote, ConsultationFeedback
 )
@@ -19,7 +20,7 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
         base_filter = and_(base_filter, Appointment.doctor_id == doctor_id)
     
     # Most active doctors
-    doctor_activity = await db.execute(
+    doctor_activity_query = (
         select(
             Doctor.id,
             func.concat(User.first_name, ' ', User.last_name).label('doctor_name'),
@@ -34,7 +35,7 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
     )
     
     # Doctor availability stats
-    availability_stats = await db.execute(
+    availability_stats_query = (
         select(
             Doctor.id,
             func.concat(User.first_name, ' ', User.last_name).label('doctor_name'),
@@ -51,7 +52,7 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
     )
     
     # Doctor performance stats
-    performance_stats = await db.execute(
+    performance_stats_query = (
         select(
             Doctor.id,
             func.concat(User.first_name, ' ', User.last_name).label('doctor_name'),
@@ -77,7 +78,7 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
     )
     
     # Department distribution
-    department_distribution = await db.execute(
+    department_distribution_query = (
         select(
             Doctor.department,
             func.count(distinct(Doctor.id)).label('doctor_count'),
@@ -92,6 +93,20 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
         .order_by(desc(func.count(distinct(Appointment.id))))
     )
     
+    # Independent aggregations, run in parallel on separate connections
+    (
+        doctor_activity,
+        availability_stats,
+        performance_stats,
+        department_distribution,
+    ) = await fetch_all_concurrently(
+        db,
+        doctor_activity_query,
+        availability_stats_query,
+        performance_stats_query,
+        department_distribution_query,
+    )
+    
     return {
         "doctor_activity": [
             {
@@ -99,7 +114,7 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
                 "doctor_name": row.doctor_name, 
                 "appointment_count": row.appointment_count
             }
-            for row in doctor_activity.all()
+            for row in doctor_activity
         ],
         "availability_stats": [
             {
@@ -108,7 +123,7 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
                 "is_available": row.is_available,
                 "appointment_count": row.appointment_count
             }
-            for row in availability_stats.all()
+            for row in availability_stats
         ],
         "performance_stats": [
             {
@@ -118,7 +133,7 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
                 "avg_duration": int(row.avg_duration or 0),
                 "notes_count": row.notes_count
             }
-            for row in performance_stats.all()
+            for row in performance_stats
         ],
         "department_distribution": [
             {
@@ -126,6 +141,6 @@ async def get_doctor_analytics(db: AsyncSession, days: int = 30, doctor_id: Opti
                 "doctor_count": row.doctor_count,
                 "appointment_count": row.appointment_count
             }
-            for row in department_distribution.all()
+            for row in department_distribution
         ]
     } 
\ No newline at end of file
@@ -11,6 +11,17 @@ from schemas import (
     ConsultationFeedbackCreate, ConsultationFeedbackUpdate,
     DoctorStatusUpdate
 )
+from utils.cache import SharedTTLCache
+
+# Department rosters change when doctors go on or off shift, which drops the
+# cache; the TTL covers edits made outside this service
+AVAILABLE_DOCTORS_CACHE_TTL_SECONDS = 30
+_available_doctors_cache = SharedTTLCache("available_doctors", ttl=AVAILABLE_DOCTORS_CACHE_TTL_SECONDS)
+
+
+async def invalidate_available_doctors() -> None:
+    """Drop cached department rosters after a doctor's availability or department changes"""
+    await _available_doctors_cache.invalidate()
 
 
 class DoctorService:
@@ -46,6 +57,7 @@ class DoctorService:
         
         await db.commit()
         await db.refresh(doctor)
+        await invalidate_available_doctors()
         
         return doctor
     
@@ -75,9 +87,32 @@ class DoctorService:
         
         await db.commit()
         await db.refresh(doctor)
+        await invalidate_available_doctors()
         
         return doctor
     
+    @staticmethod
+    async def get_available_doctor_ids(
+        db: AsyncSession,
+        department: str
+    ) -> List[UUID]:
+        """Available doctors whose department matches, cached briefly"""
+        async def load() -> List[str]:
+            result = await db.execute(
+                select(Doctor.id)
+                .where(
+                    and_(
+                        Doctor.is_available == True,
+                        Doctor.department.ilike(f"%{department}%")
+                    )
+                )
+                .order_by(Doctor.id)
+            )
+            return [str(doctor_id) for doctor_id in result.scalars()]
+        
+        doctor_ids = await _available_doctors_cache.get_or_load(department.lower(), load)
+        return [UUID(doctor_id) for doctor_id in doctor_ids]
+    
     @staticmethod
     async def create_patient_note(
         db: AsyncSession,
@@ -1,26 +1,52 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, insert, and_
+from sqlalchemy import select, func, insert, update, and_, tuple_
 from uuid import UUID
 from datetime import datetime
 import asyncio
+import json
 import logging
+import time
+from collections import defaultdict
 import aiohttp
 from fastapi import BackgroundTasks
-
-# SMS API imports
-
-try:
-    from pyfcm import FCMNotification  # type: ignore
-except ImportError:
-    FCMNotification = None
+from jose import jwt
 
 from models import Notification, Patient, Queue, Doctor, NotificationType, DeviceToken, User
 from schemas import NotificationCreate
 from api.core.config import settings
+from utils.datetime_utils import get_timezone_aware_now
 
 logger = logging.getLogger(__name__)
 
+FCM_V1_URL = "https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
+FCM_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Shared results for channels that are not configured; treat as read-only
+_DISABLED_SMS_RESULT = {'success': False, 'error': 'SMS API not configured', 'message_id': None}
+_DISABLED_PUSH_RESULT = {'success': False, 'error': 'FCM not configured', 'message_id': None}
+
+# Status of a notification whose channel is not configured; unlike FAILED it
+# is final, so workers do not retry it
+NOTIFICATION_STATUS_DISABLED = "DISABLED"
+
+# Message templates, formatted with str.format_map
+MSG_APPOINTMENT_CONFIRMED = "Hello {first_name}, your appointment has been confirmed. Your queue number is {queue_number}."
+MSG_QUEUE_POSITION_UPDATE = "Hello {first_name}, you are number {queue_position} in queue. Estimated wait time: {estimated_wait_time} minutes."
+MSG_YOUR_TURN = "Hello {first_name}, it's now your turn to see Dr. {doctor}{room}. Please proceed immediately."
+MSG_REMINDER = "Hello {first_name}, your turn is coming up in approximately {minutes_remaining} minutes. Please be ready."
+MSG_APPOINTMENT_CANCELLED = "Hello {first_name}, your appointment has been cancelled.{reason} Please contact us to reschedule."
+MSG_DOCTOR_MESSAGE = "Message from your doctor: {message}"
+
+POSITION_MESSAGES = {
+    10: "Hello {first_name}, you are now at position 10 in the queue{doctor}. Estimated wait time is about 30-45 minutes.",
+    5: "Hello {first_name}, you are now at position 5 in the queue{doctor}. Estimated wait time is about 15-20 minutes.",
+    3: "Hello {first_name}, you are now at position 3 in the queue{doctor}. Please be ready, you'll be called soon.",
+}
+MSG_POSITION_DEFAULT = "Hello {first_name}, you are now at position {position} in the queue{doctor}."
+
 
 class NotificationService:
     def __init__(self):
@@ -31,19 +57,142 @@ class NotificationService:
         if not self.sms_api_key:
             logger.warning("SMS_API_KEY not configured")
         
-        # Initialize FCM client
-        if FCMNotification and getattr(settings, "FIREBASE_SERVER_KEY", None):
-            self.fcm_client = FCMNotification(api_key=getattr(settings, "FIREBASE_SERVER_KEY", ""))
-        else:
-            self.fcm_client = None
-            logger.warning("FCM not configured or pyfcm package not installed")
+        # Shared HTTP session, opened in startup() once an event loop is running
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        self._token_refresh_task: Optional[asyncio.Task] = None
+        
+        # Initialize FCM HTTP v1 credentials from the service account file
+        self.fcm_credentials = self._load_fcm_credentials()
+        self.fcm_project_id = getattr(settings, "FIREBASE_PROJECT_ID", None) or (
+            self.fcm_credentials.get("project_id") if self.fcm_credentials else None
+        )
+        self._fcm_access_token: Optional[str] = None
+        self._fcm_token_expires_at = 0.0
+        
+        if not (self.fcm_credentials and self.fcm_project_id):
+            self.fcm_credentials = None
+            logger.warning("FCM not configured (FIREBASE_CREDENTIALS_PATH / FIREBASE_PROJECT_ID missing)")
+        
+        # Channel availability is fixed for the lifetime of the service
+        self.sms_enabled = settings.SMS_ENABLED and bool(self.sms_api_key)
+        self.push_enabled = settings.PUSH_ENABLED and self.fcm_credentials is not None
         
         # Log settings status
         if settings.SMS_ENABLED and not self.sms_api_key:
             logger.warning("SMS_ENABLED=True but SMS_API_KEY not configured")
             
-        if settings.PUSH_ENABLED and not self.fcm_client:
-            logger.warning("PUSH_ENABLED=True but FCM client not initialized")
+        if settings.PUSH_ENABLED and not self.fcm_credentials:
+            logger.warning("PUSH_ENABLED=True but FCM credentials not loaded")
+    
+    @staticmethod
+    def _load_fcm_credentials() -> Optional[Dict[str, Any]]:
+        """Load the Firebase service account used to mint FCM access tokens"""
+        credentials_path = getattr(settings, "FIREBASE_CREDENTIALS_PATH", None)
+        if not credentials_path:
+            return None
+        try:
+            with open(credentials_path) as credentials_file:
+                credentials = json.load(credentials_file)
+            if not credentials.get("client_email") or not credentials.get("private_key"):
+                logger.warning(f"Invalid Firebase service account file: {credentials_path}")
+                return None
+            return credentials
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load Firebase credentials: {e}")
+            return None
+    
+    async def startup(self):
+        """Open the shared HTTP session and start refreshing the FCM access token"""
+        await self.get_http_session()
+        if self.push_enabled and self._token_refresh_task is None:
+            self._token_refresh_task = asyncio.create_task(self._refresh_fcm_token_periodically())
+    
+    async def aclose(self):
+        """Stop the token refresher and close the shared HTTP session"""
+        if self._token_refresh_task is not None:
+            self._token_refresh_task.cancel()
+            try:
+                await self._token_refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._token_refresh_task = None
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+    
+    async def get_http_session(self) -> aiohttp.ClientSession:
+        """Return the shared aiohttp session, creating it if startup() has not run"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http_session
+    
+    async def _refresh_fcm_token_periodically(self):
+        """Keep the FCM access token warm so sends never wait on the OAuth round-trip"""
+        while True:
+            try:
+                await self._get_fcm_access_token()
+                delay = max(self._fcm_token_expires_at - time.time() - 120, 60)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to refresh FCM access token: {e}")
+                delay = 60
+            await asyncio.sleep(delay)
+    
+    async def _post_with_retry(self, url: str, **kwargs) -> Tuple[int, str]:
+        """POST over the shared session, retrying with exponential backoff on
+        network errors and throttled/5xx responses"""
+        max_retries = settings.NOTIFICATION_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            try:
+                session = await self.get_http_session()
+                async with session.post(url, **kwargs) as response:
+                    response_text = await response.text()
+                    if response.status not in RETRYABLE_STATUSES or attempt == max_retries:
+                        return response.status, response_text
+                    logger.warning(f"POST {url} returned HTTP {response.status}, retrying")
+            except aiohttp.ClientError as e:
+                if attempt == max_retries:
+                    raise
+                logger.warning(f"POST {url} failed: {e}, retrying")
+            await asyncio.sleep(settings.NOTIFICATION_RETRY_BACKOFF * 2 ** attempt)
+    
+    async def _get_fcm_access_token(self) -> str:
+        """Return a cached OAuth2 access token for FCM, refreshing it shortly before expiry"""
+        if self._fcm_access_token and time.time() < self._fcm_token_expires_at - 60:
+            return self._fcm_access_token
+        
+        issued_at = int(time.time())
+        token_uri = self.fcm_credentials.get("token_uri", GOOGLE_TOKEN_URL)
+        assertion = jwt.encode(
+            {
+                "iss": self.fcm_credentials["client_email"],
+                "scope": FCM_SCOPE,
+                "aud": token_uri,
+                "iat": issued_at,
+                "exp": issued_at + 3600,
+            },
+            self.fcm_credentials["private_key"],
+            algorithm="RS256",
+        )
+        
+        session = await self.get_http_session()
+        async with session.post(
+            token_uri,
+            data={
+                "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+                "assertion": assertion,
+            },
+        ) as response:
+            token_data = await response.json(content_type=None)
+            if response.status != 200:
+                raise RuntimeError(f"FCM token request failed: HTTP {response.status} - {token_data}")
+        
+        self._fcm_access_token = token_data["access_token"]
+        self._fcm_token_expires_at = issued_at + int(token_data.get("expires_in", 3600))
+        return self._fcm_access_token
     
     async def create_notification(
         self,
@@ -75,6 +224,37 @@ class NotificationService:
         else:
             return None
     
+    async def create_notifications_bulk(
+        self,
+        db: AsyncSession,
+        notifications: List[NotificationCreate]
+    ) -> List[UUID]:
+        """Create several notification records with one multi-row INSERT"""
+        if not notifications:
+            return []
+        
+        result = await db.execute(
+            insert(Notification)
+            .values([
+                {
+                    "patient_id": notification_data.patient_id,
+                    "user_id": notification_data.user_id,
+                    "type": notification_data.type,
+                    "recipient": notification_data.recipient,
+                    "message": notification_data.message,
+                    "subject": notification_data.subject,
+                    "reference_id": notification_data.reference_id,
+                    "status": "pending"
+                }
+                for notification_data in notifications
+            ])
+            .returning(Notification.id)
+        )
+        notification_ids = list(result.scalars().all())
+        await db.commit()
+        
+        return notification_ids
+    
     async def send_sms(
         self,
         phone_number: str,
@@ -83,55 +263,57 @@ class NotificationService:
         db: Optional[AsyncSession] = None
     ) -> Dict[str, Any]:
         """Send SMS notification via SMS API"""
-        if not self.sms_api_key:
-            result = {
-                'success': False,
-                'error': 'SMS API not configured',
-                'message_id': None
+        if not self.sms_enabled:
+            # The caller has already stored the notification; don't leave it pending
+            if notification_id and db:
+                await self._update_notification_status(
+                    db, notification_id, False, _DISABLED_SMS_RESULT['error'],
+                    status=NOTIFICATION_STATUS_DISABLED
+                )
+            return _DISABLED_SMS_RESULT
+        
+        try:
+            # Prepare payload for SMS API
+            payload = {
+                "recipients": phone_number,
+                "message": message,
+                "apikey": self.sms_api_key
             }
-        else:
-            try:
-                # Prepare payload for SMS API
-                payload = {
-                    "recipients": phone_number,
-                    "message": message,
-                    "apikey": self.sms_api_key
-                }
-                
-                # Send SMS using aiohttp for async HTTP requests
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.sms_api_url, data=payload) as response:
-                        response_text = await response.text()
-                        
-                        if response.status == 200:
-                            result = {
-                                'success': True,
-                                'error': None,
-                                'message_id': f"sms_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-                            }
-                            logger.info(f"SMS sent successfully to {phone_number}, Response: {response_text}")
-                        else:
-                            result = {
-                                'success': False,
-                                'error': f"HTTP {response.status}: {response_text}",
-                                'message_id': None
-                            }
-                            logger.error(f"Failed to send SMS to {phone_number}: HTTP {response.status} - {response_text}")
-                
-            except aiohttp.ClientError as e:
+            
+            # Send SMS over the shared aiohttp session
+            response_status, response_text = await self._post_with_retry(
+                self.sms_api_url, data=payload
+            )
+            
+            if response_status == 200:
                 result = {
-                    'success': False,
-                    'error': f"Network error: {str(e)}",
-                    'message_id': None
+                    'success': True,
+                    'error': None,
+                    'message_id': f"sms_{get_timezone_aware_now().strftime('%Y%m%d%H%M%S')}"
                 }
-                logger.error(f"Network error sending SMS to {phone_number}: {e}")
-            except Exception as e:
+                logger.info(f"SMS sent successfully to {phone_number}, Response: {response_text}")
+            else:
                 result = {
                     'success': False,
-                    'error': f"Unexpected error: {str(e)}",
+                    'error': f"HTTP {response_status}: {response_text}",
                     'message_id': None
                 }
-                logger.error(f"Unexpected error sending SMS to {phone_number}: {e}")
+                logger.error(f"Failed to send SMS to {phone_number}: HTTP {response_status} - {response_text}")
+            
+        except aiohttp.ClientError as e:
+            result = {
+                'success': False,
+                'error': f"Network error: {str(e)}",
+                'message_id': None
+            }
+            logger.error(f"Network error sending SMS to {phone_number}: {e}")
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f"Unexpected error: {str(e)}",
+                'message_id': None
+            }
+            logger.error(f"Unexpected error sending SMS to {phone_number}: {e}")
         
         # Update notification status in database
         if notification_id and db:
@@ -141,31 +323,127 @@ class NotificationService:
         
         return result
     
+    async def send_sms_bulk(
+        self,
+        phone_numbers: List[str],
+        message: str,
+        notification_ids: Optional[List[UUID]] = None,
+        db: Optional[AsyncSession] = None
+    ) -> Dict[str, Any]:
+        """Send the same SMS to several recipients in a single SMS API call"""
+        if not phone_numbers:
+            return {'success': True, 'error': None, 'message_id': None}
+        
+        if not self.sms_enabled:
+            if notification_ids and db:
+                await self._update_notification_statuses(
+                    db, notification_ids, False, _DISABLED_SMS_RESULT['error'],
+                    status=NOTIFICATION_STATUS_DISABLED
+                )
+            return _DISABLED_SMS_RESULT
+        
+        try:
+            # The SMS API accepts a comma-separated recipient list
+            payload = {
+                "recipients": ",".join(phone_numbers),
+                "message": message,
+                "apikey": self.sms_api_key
+            }
+            
+            response_status, response_text = await self._post_with_retry(
+                self.sms_api_url, data=payload
+            )
+            
+            if response_status == 200:
+                result = {
+                    'success': True,
+                    'error': None,
+                    'message_id': f"sms_{get_timezone_aware_now().strftime('%Y%m%d%H%M%S')}"
+                }
+                logger.info(f"Bulk SMS sent successfully to {len(phone_numbers)} recipients, Response: {response_text}")
+            else:
+                result = {
+                    'success': False,
+                    'error': f"HTTP {response_status}: {response_text}",
+                    'message_id': None
+                }
+                logger.error(f"Failed to send bulk SMS to {len(phone_numbers)} recipients: HTTP {response_status} - {response_text}")
+            
+        except aiohttp.ClientError as e:
+            result = {
+                'success': False,
+                'error': f"Network error: {str(e)}",
+                'message_id': None
+            }
+            logger.error(f"Network error sending bulk SMS: {e}")
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f"Unexpected error: {str(e)}",
+                'message_id': None
+            }
+            logger.error(f"Unexpected error sending bulk SMS: {e}")
+        
+        # Update all notification rows in one statement
+        if notification_ids and db:
+            await self._update_notification_statuses(
+                db, notification_ids, result['success'], result.get('error')
+            )
+        
+        return result
+    
     async def _update_notification_status(
         self,
         db: AsyncSession,
         notification_id: UUID,
         success: bool,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        status: Optional[str] = None
     ):
         """Update notification status in database"""
         try:
-            result = await db.execute(
-                select(Notification).where(Notification.id == notification_id)
+            now = get_timezone_aware_now()
+            await db.execute(
+                update(Notification)
+                .where(Notification.id == notification_id)
+                .values(
+                    status=status or ("SENT" if success else "FAILED"),
+                    sent_at=now if success else None,
+                    error_message=error_message,
+                    updated_at=now
+                )
             )
-            notification = result.scalar_one_or_none()
+            await db.commit()
             
-            if notification:
-                notification.status = "SENT" if success else "FAILED"
-                notification.sent_at = datetime.utcnow() if success else None
-                notification.error_message = error_message
-                notification.updated_at = datetime.utcnow()
-                
-                await db.commit()
-                
         except Exception as e:
             logger.error(f"Failed to update notification status: {e}")
     
+    async def _update_notification_statuses(
+        self,
+        db: AsyncSession,
+        notification_ids: List[UUID],
+        success: bool,
+        error_message: Optional[str] = None,
+        status: Optional[str] = None
+    ):
+        """Update the status of several notifications sent by one request"""
+        try:
+            now = get_timezone_aware_now()
+            await db.execute(
+                update(Notification)
+                .where(Notification.id.in_(notification_ids))
+                .values(
+                    status=status or ("SENT" if success else "FAILED"),
+                    sent_at=now if success else None,
+                    error_message=error_message,
+                    updated_at=now
+                )
+            )
+            await db.commit()
+            
+        except Exception as e:
+            logger.error(f"Failed to update bulk notification status: {e}")
+    
     # Background task methods for FastAPI BackgroundTasks
     async def send_appointment_confirmation(
         self,
@@ -175,22 +453,31 @@ class NotificationService:
         queue_number: int
     ):
         """Send appointment booking confirmation"""
+        if not self.sms_enabled:
+            logger.info(f"No notification channel available for patient {patient_id}, skipping")
+            return None
+        
         try:
-            # Get patient details
+            # Get patient contact details
             result = await db.execute(
-                select(Patient).where(Patient.id == patient_id)
+                select(Patient.phone_number, Patient.first_name)
+                .where(Patient.id == patient_id)
             )
-            patient = result.scalar_one_or_none()
+            row = result.first()
             
-            if not patient:
+            if not row:
                 logger.error(f"Patient not found: {patient_id}")
                 return
+            phone_number, first_name = row
             
             # Create notification record
             notification_data = NotificationCreate(
                 type=NotificationType.SMS,
-                recipient=patient.phone_number,
-                message=f"Hello {patient.first_name}, your appointment has been confirmed. Your queue number is {queue_number}.",
+                recipient=phone_number,
+                message=MSG_APPOINTMENT_CONFIRMED.format_map({
+                    "first_name": first_name,
+                    "queue_number": queue_number
+                }),
                 subject="Appointment Confirmed",
                 patient_id=patient_id,
                 reference_id=appointment_id
@@ -200,12 +487,14 @@ class NotificationService:
             
             # Send SMS
             await self.send_sms(
-                phone_number=patient.phone_number,
+                phone_number=phone_number,
                 message=notification.message,
                 notification_id=notification.id,
                 db=db
             )
             
+            return notification
+            
         except Exception as e:
             logger.error(f"Failed to send appointment confirmation: {e}")
     
@@ -217,22 +506,32 @@ class NotificationService:
         estimated_wait_time: int
     ):
         """Send queue position update"""
+        if not self.sms_enabled:
+            logger.info(f"No notification channel available for patient {patient_id}, skipping")
+            return None
+        
         try:
-            # Get patient details
+            # Get patient contact details
             result = await db.execute(
-                select(Patient).where(Patient.id == patient_id)
+                select(Patient.phone_number, Patient.first_name)
+                .where(Patient.id == patient_id)
             )
-            patient = result.scalar_one_or_none()
+            row = result.first()
             
-            if not patient:
+            if not row:
                 logger.error(f"Patient not found: {patient_id}")
                 return
+            phone_number, first_name = row
             
             # Create notification record
             notification_data = NotificationCreate(
                 type=NotificationType.SMS,
-                recipient=patient.phone_number,
-                message=f"Hello {patient.first_name}, you are number {queue_position} in queue. Estimated wait time: {estimated_wait_time} minutes.",
+                recipient=phone_number,
+                message=MSG_QUEUE_POSITION_UPDATE.format_map({
+                    "first_name": first_name,
+                    "queue_position": queue_position,
+                    "estimated_wait_time": estimated_wait_time
+                }),
                 subject="Queue Position Update",
                 patient_id=patient_id
             )
@@ -241,15 +540,89 @@ class NotificationService:
             
             # Send SMS
             await self.send_sms(
-                phone_number=patient.phone_number,
+                phone_number=phone_number,
                 message=notification.message,
                 notification_id=notification.id,
                 db=db
             )
             
+            return notification
+            
         except Exception as e:
             logger.error(f"Failed to send queue position update: {e}")
     
+    async def send_queue_position_updates(
+        self,
+        db: AsyncSession,
+        updates: List[Tuple[UUID, int, int]]
+    ):
+        """
+        Send queue position updates to several patients at once.
+        
+        updates holds (patient_id, queue_position, estimated_wait_time) tuples.
+        Recipients whose message text is identical share one multi-recipient
+        SMS call. The SMS requests run concurrently; the session is only used
+        before and after them, since an AsyncSession cannot run statements
+        concurrently.
+        """
+        if not updates or not self.sms_enabled:
+            return
+        
+        try:
+            result = await db.execute(
+                select(Patient.id, Patient.phone_number, Patient.first_name)
+                .where(Patient.id.in_({patient_id for patient_id, _, _ in updates}))
+            )
+            contacts = {patient_id: (phone_number, first_name) for patient_id, phone_number, first_name in result}
+            
+            recipients = []
+            for patient_id, queue_position, estimated_wait_time in updates:
+                if patient_id not in contacts:
+                    logger.error(f"Patient not found: {patient_id}")
+                    continue
+                phone_number, first_name = contacts[patient_id]
+                recipients.append(NotificationCreate(
+                    type=NotificationType.SMS,
+                    recipient=phone_number,
+                    message=MSG_QUEUE_POSITION_UPDATE.format_map({
+                        "first_name": first_name,
+                        "queue_position": queue_position,
+                        "estimated_wait_time": estimated_wait_time
+                    }),
+                    subject="Queue Position Update",
+                    patient_id=patient_id
+                ))
+            
+            notification_ids = await self.create_notifications_bulk(db, recipients)
+            
+            # Notification ids and phone numbers per distinct message
+            batches: Dict[str, Tuple[List[UUID], List[str]]] = defaultdict(lambda: ([], []))
+            for notification_id, notification in zip(notification_ids, recipients):
+                batch_ids, phone_numbers = batches[notification.message]
+                batch_ids.append(notification_id)
+                phone_numbers.append(notification.recipient)
+            
+            results = await asyncio.gather(
+                *(
+                    self.send_sms(phone_number=phone_numbers[0], message=message)
+                    if len(phone_numbers) == 1
+                    else self.send_sms_bulk(phone_numbers, message)
+                    for message, (_, phone_numbers) in batches.items()
+                ),
+                return_exceptions=True
+            )
+            
+            for (batch_ids, _), sms_result in zip(batches.values(), results):
+                if isinstance(sms_result, Exception):
+                    logger.error(f"Failed to send queue position update: {sms_result}")
+                    sms_result = {'success': False, 'error': str(sms_result)}
+                await self._update_notification_statuses(
+                    db, batch_ids, sms_result['success'], sms_result.get('error')
+                )
+            
+        except Exception as e:
+            logger.error(f"Failed to send queue position updates: {e}")
+    
     async def send_your_turn_notification(
         self,
         db: AsyncSession,
@@ -259,51 +632,93 @@ class NotificationService:
     ):
         """Send notification when it's patient's turn"""
         try:
-            # Get patient details
+            # Get patient contact details together with an active device token
             result = await db.execute(
-                select(Patient).where(Patient.id == patient_id)
+                select(Patient.phone_number, Patient.first_name, DeviceToken.token)
+                .outerjoin(
+                    DeviceToken,
+                    and_(
+                        DeviceToken.patient_id == Patient.id,
+                        DeviceToken.is_active == True
+                    )
+                )
+                .where(Patient.id == patient_id)
             )
-            patient = result.scalar_one_or_none()
+            row = result.first()
             
-            if not patient:
+            if not row:
                 logger.error(f"Patient not found: {patient_id}")
                 return
+            phone_number, first_name, device_token = row
+            
+            # Pick the delivery channels before writing anything
+            use_push = bool(device_token) and self.push_enabled
+            if not use_push and not self.sms_enabled:
+                logger.info(f"No notification channel available for patient {patient_id}, skipping")
+                return None
             
             room_info = f" in room {room_number}" if room_number else ""
             
             # Create notification record
             notification_data = NotificationCreate(
-                type=NotificationType.SMS,
-                recipient=patient.phone_number,
-                message=f"Hello {patient.first_name}, it's now your turn to see Dr. {doctor_name}{room_info}. Please proceed immediately.",
+                type=NotificationType.SMS if self.sms_enabled else NotificationType.SYSTEM,
+                recipient=phone_number,
+                message=MSG_YOUR_TURN.format_map({
+                    "first_name": first_name,
+                    "doctor": doctor_name,
+                    "room": room_info
+                }),
                 subject="It's Your Turn!",
                 patient_id=patient_id
             )
             
             notification = await self.create_notification(db, notification_data)
             
-            # Send SMS
-            await self.send_sms(
-                phone_number=patient.phone_number,
-                message=notification.message,
-                notification_id=notification.id,
-                db=db
+            # Send SMS and push concurrently; the session is only touched afterwards
+            # because an AsyncSession cannot run statements concurrently
+            channels = []
+            sends = []
+            if self.sms_enabled:
+                channels.append("sms")
+                sends.append(
+                    self.send_sms(
+                        phone_number=phone_number,
+                        message=notification.message
+                    )
+                )
+            if use_push:
+                channels.append("push")
+                sends.append(
+                    self.send_push_notification(
+                        fcm_token=device_token,
+                        title="It's Your Turn!",
+                        message=notification.message,
+                        data={
+                            'type': 'your_turn',
+                            'doctor_name': doctor_name,
+                            'room_number': room_number or ''
+                        }
+                    )
+                )
+            
+            results = await asyncio.gather(*sends, return_exceptions=True)
+            
+            errors = []
+            for channel, channel_result in zip(channels, results):
+                if isinstance(channel_result, Exception):
+                    logger.error(f"Your turn {channel} notification failed: {channel_result}")
+                    errors.append(f"{channel}: {channel_result}")
+                elif not channel_result['success']:
+                    errors.append(f"{channel}: {channel_result['error']}")
+            
+            await self._update_notification_status(
+                db,
+                notification.id,
+                len(errors) < len(channels),
+                "; ".join(errors) or None
             )
             
-            # Send push notification if FCM token available
-            if hasattr(patient, 'fcm_token') and patient.fcm_token:
-                await self.send_push_notification(
-                    fcm_token=patient.fcm_token,
-                    title="It's Your Turn!",
-                    message=notification.message,
-                    data={
-                        'type': 'your_turn',
-                        'doctor_name': doctor_name,
-                        'room_number': room_number or ''
-                    },
-                    notification_id=notification.id,
-                    db=db
-                )
+            return notification
             
         except Exception as e:
             logger.error(f"Failed to send your turn notification: {e}")
@@ -315,22 +730,31 @@ class NotificationService:
         minutes_remaining: int
     ):
         """Send reminder notification before patient's turn"""
+        if not self.sms_enabled:
+            logger.info(f"No notification channel available for patient {patient_id}, skipping")
+            return None
+        
         try:
-            # Get patient details
+            # Get patient contact details
             result = await db.execute(
-                select(Patient).where(Patient.id == patient_id)
+                select(Patient.phone_number, Patient.first_name)
+                .where(Patient.id == patient_id)
             )
-            patient = result.scalar_one_or_none()
+            row = result.first()
             
-            if not patient:
+            if not row:
                 logger.error(f"Patient not found: {patient_id}")
                 return
+            phone_number, first_name = row
             
             # Create notification record
             notification_data = NotificationCreate(
                 type=NotificationType.SMS,
-                recipient=patient.phone_number,
-                message=f"Hello {patient.first_name}, your turn is coming up in approximately {minutes_remaining} minutes. Please be ready.",
+                recipient=phone_number,
+                message=MSG_REMINDER.format_map({
+                    "first_name": first_name,
+                    "minutes_remaining": minutes_remaining
+                }),
                 subject="Appointment Reminder",
                 patient_id=patient_id
             )
@@ -339,12 +763,14 @@ class NotificationService:
             
             # Send SMS
             await self.send_sms(
-                phone_number=patient.phone_number,
+                phone_number=phone_number,
                 message=notification.message,
                 notification_id=notification.id,
                 db=db
             )
             
+            return notification
+            
         except Exception as e:
             logger.error(f"Failed to send reminder notification: {e}")
     
@@ -355,24 +781,33 @@ class NotificationService:
         reason: Optional[str] = None
     ):
         """Send appointment cancellation notification"""
+        if not self.sms_enabled:
+            logger.info(f"No notification channel available for patient {patient_id}, skipping")
+            return None
+        
         try:
-            # Get patient details
+            # Get patient contact details
             result = await db.execute(
-                select(Patient).where(Patient.id == patient_id)
+                select(Patient.phone_number, Patient.first_name)
+                .where(Patient.id == patient_id)
             )
-            patient = result.scalar_one_or_none()
+            row = result.first()
             
-            if not patient:
+            if not row:
                 logger.error(f"Patient not found: {patient_id}")
                 return
+            phone_number, first_name = row
             
             reason_text = f" Reason: {reason}" if reason else ""
             
             # Create notification record
             notification_data = NotificationCreate(
                 type=NotificationType.SMS,
-                recipient=patient.phone_number,
-                message=f"Hello {patient.first_name}, your appointment has been cancelled.{reason_text} Please contact us to reschedule.",
+                recipient=phone_number,
+                message=MSG_APPOINTMENT_CANCELLED.format_map({
+                    "first_name": first_name,
+                    "reason": reason_text
+                }),
                 subject="Appointment Cancelled",
                 patient_id=patient_id
             )
@@ -381,12 +816,14 @@ class NotificationService:
             
             # Send SMS
             await self.send_sms(
-                phone_number=patient.phone_number,
+                phone_number=phone_number,
                 message=notification.message,
                 notification_id=notification.id,
                 db=db
             )
             
+            return notification
+            
         except Exception as e:
             logger.error(f"Failed to send cancellation notification: {e}")
     
@@ -399,44 +836,62 @@ class NotificationService:
         notification_id: Optional[UUID] = None,
         db: Optional[AsyncSession] = None
     ) -> Dict[str, Any]:
-        """Send push notification via FCM"""
-        if not self.fcm_client:
-            result = {
-                'success': False,
-                'error': 'FCM not configured',
-                'message_id': None
-            }
-        else:
-            try:
-                response = self.fcm_client.notify_single_device(
-                    registration_id=fcm_token,
-                    message_title=title,
-                    message_body=message,
-                    data_message=data or {}
+        """Send push notification via FCM HTTP v1"""
+        if not self.push_enabled:
+            if notification_id and db:
+                await self._update_notification_status(
+                    db, notification_id, False, _DISABLED_PUSH_RESULT['error'],
+                    status=NOTIFICATION_STATUS_DISABLED
                 )
-                
-                if response.get('success'):
-                    result = {
-                        'success': True,
-                        'error': None,
-                        'message_id': response.get('message_id')
-                    }
-                    logger.info(f"Push notification sent successfully, ID: {response.get('message_id')}")
-                else:
-                    result = {
-                        'success': False,
-                        'error': response.get('failure', 'Unknown FCM error'),
-                        'message_id': None
-                    }
-                    logger.error(f"Failed to send push notification: {response}")
-                
-            except Exception as e:
+            return _DISABLED_PUSH_RESULT
+        
+        try:
+            payload = {
+                "message": {
+                    "token": fcm_token,
+                    "notification": {"title": title, "body": message},
+                    "data": {k: str(v) for k, v in (data or {}).items()}
+                }
+            }
+            access_token = await self._get_fcm_access_token()
+            
+            response_status, response_text = await self._post_with_retry(
+                FCM_V1_URL.format(project_id=self.fcm_project_id),
+                json=payload,
+                headers={"Authorization": f"Bearer {access_token}"}
+            )
+            response_data = json.loads(response_text) if response_text else {}
+            
+            if response_status == 200:
+                result = {
+                    'success': True,
+                    'error': None,
+                    'message_id': response_data.get('name')
+                }
+                logger.info(f"Push notification sent successfully, ID: {response_data.get('name')}")
+            else:
+                error = response_data.get('error', {}) if isinstance(response_data, dict) else {}
                 result = {
                     'success': False,
-                    'error': f"FCM error: {str(e)}",
+                    'error': f"HTTP {response_status}: {error.get('message', 'Unknown FCM error')}",
                     'message_id': None
                 }
-                logger.error(f"FCM error: {e}")
+                logger.error(f"Failed to send push notification: HTTP {response_status} - {response_data}")
+            
+        except aiohttp.ClientError as e:
+            result = {
+                'success': False,
+                'error': f"Network error: {str(e)}",
+                'message_id': None
+            }
+            logger.error(f"Network error sending push notification: {e}")
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f"FCM error: {str(e)}",
+                'message_id': None
+            }
+            logger.error(f"FCM error: {e}")
         
         # Update notification status in database
         if notification_id and db:
@@ -446,6 +901,44 @@ class NotificationService:
         
         return result
     
+    async def resend_notification(self, db: AsyncSession, notification_id: UUID):
+        """Deliver an already recorded notification again without creating a new row"""
+        notification = await db.get(Notification, notification_id)
+        if notification is None or notification.status in ("SENT", NOTIFICATION_STATUS_DISABLED):
+            return notification
+        
+        if notification.type == NotificationType.SMS:
+            await self.send_sms(
+                phone_number=notification.recipient,
+                message=notification.message,
+                notification_id=notification.id,
+                db=db
+            )
+            return notification
+        
+        device_token = await db.scalar(
+            select(DeviceToken.token)
+            .where(
+                DeviceToken.patient_id == notification.patient_id,
+                DeviceToken.is_active == True
+            )
+            .limit(1)
+        )
+        if not device_token:
+            await self._update_notification_status(
+                db, notification.id, False, "No active device token"
+            )
+            return notification
+        
+        await self.send_push_notification(
+            fcm_token=device_token,
+            title=notification.subject or "",
+            message=notification.message,
+            notification_id=notification.id,
+            db=db
+        )
+        return notification
+    
     async def get_patient_notifications(
         self,
         db: AsyncSession,
@@ -469,16 +962,20 @@ class NotificationService:
         notification_id: UUID
     ) -> Optional[Notification]:
         """Mark a notification as read"""
+        now = get_timezone_aware_now()
+        stmt = (
+            update(Notification)
+            .where(Notification.id == notification_id)
+            .values(is_read=True, updated_at=now)
+            .returning(Notification)
+        )
         result = await db.execute(
-            select(Notification).where(Notification.id == notification_id)
+            select(Notification)
+            .from_statement(stmt)
+            .execution_options(populate_existing=True)
         )
         notification = result.scalar_one_or_none()
-        
-        if notification:
-            notification.read_at = datetime.utcnow()
-            notification.updated_at = datetime.utcnow()
-            await db.commit()
-            await db.refresh(notification)
+        await db.commit()
         
         return notification
     
@@ -489,34 +986,38 @@ class NotificationService:
         end_date: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """Get notification statistics"""
-        query = select(Notification)
-        
+        predicates = []
         if start_date:
-            query = query.where(Notification.created_at >= start_date)
+            predicates.append(Notification.created_at >= start_date)
         if end_date:
-            query = query.where(Notification.created_at <= end_date)
+            predicates.append(Notification.created_at <= end_date)
         
-        # Total notifications
-        total_result = await db.execute(
-            select(func.count(Notification.id)).select_from(query.subquery())
+        # Status and type breakdowns in one scan via GROUPING SETS
+        result = await db.execute(
+            select(
+                Notification.status,
+                Notification.type,
+                func.grouping(Notification.status),
+                func.count(Notification.id)
+            )
+            .where(*predicates)
+            .group_by(
+                func.grouping_sets(
+                    tuple_(Notification.status),
+                    tuple_(Notification.type)
+                )
+            )
         )
-        total_notifications = total_result.scalar() or 0
         
-        # Notifications by status
-        status_result = await db.execute(
-            select(Notification.status, func.count(Notification.id))
-            .select_from(query.subquery())
-            .group_by(Notification.status)
-        )
-        status_counts = dict(status_result.all())
+        status_counts = {}
+        type_counts = {}
+        for status, notification_type, status_grouped, count in result.all():
+            if status_grouped:
+                type_counts[notification_type] = count
+            else:
+                status_counts[status] = count
         
-        # Notifications by type
-        type_result = await db.execute(
-            select(Notification.type, func.count(Notification.id))
-            .select_from(query.subquery())
-            .group_by(Notification.type)
-        )
-        type_counts = dict(type_result.all())
+        total_notifications = sum(status_counts.values())
         
         return {
             'total_notifications': total_notifications,
@@ -538,32 +1039,44 @@ class NotificationService:
     ):
         """Send notification to patient about their position in the queue"""
         try:
-            # Get patient details
+            # Get patient contact details together with an active device token
             result = await db.execute(
-                select(Patient).where(Patient.id == patient_id)
+                select(Patient.phone_number, Patient.first_name, DeviceToken.token)
+                .outerjoin(
+                    DeviceToken,
+                    and_(
+                        DeviceToken.patient_id == Patient.id,
+                        DeviceToken.is_active == True
+                    )
+                )
+                .where(Patient.id == patient_id)
             )
-            patient = result.scalar_one_or_none()
+            row = result.first()
             
-            if not patient:
+            if not row:
                 logger.error(f"Patient not found: {patient_id}")
                 return
+            phone_number, first_name, device_token = row
+            
+            # Pick the delivery channel before writing anything
+            use_push = bool(device_token) and self.push_enabled
+            if not use_push and not self.sms_enabled:
+                logger.info(f"No notification channel available for patient {patient_id}, skipping")
+                return None
             
             doctor_info = f" with Dr. {doctor_name}" if doctor_name else ""
             
             # Different messages based on position
-            if position == 10:
-                message = f"Hello {patient.first_name}, you are now at position 10 in the queue{doctor_info}. Estimated wait time is about 30-45 minutes."
-            elif position == 5:
-                message = f"Hello {patient.first_name}, you are now at position 5 in the queue{doctor_info}. Estimated wait time is about 15-20 minutes."
-            elif position == 3:
-                message = f"Hello {patient.first_name}, you are now at position 3 in the queue{doctor_info}. Please be ready, you'll be called soon."
-            else:
-                message = f"Hello {patient.first_name}, you are now at position {position} in the queue{doctor_info}."
+            message = POSITION_MESSAGES.get(position, MSG_POSITION_DEFAULT).format_map({
+                "first_name": first_name,
+                "position": position,
+                "doctor": doctor_info
+            })
             
             # Create notification record
             notification_data = NotificationCreate(
-                type=NotificationType.SYSTEM,
-                recipient=patient.phone_number,
+                type=NotificationType.SYSTEM if use_push else NotificationType.SMS,
+                recipient=phone_number,
                 message=message,
                 subject=f"Queue Update: Position {position}",
                 patient_id=patient_id
@@ -572,28 +1085,18 @@ class NotificationService:
             notification = await self.create_notification(db, notification_data)
             
             # Send push notification if device token is available
-            result = await db.execute(
-                select(DeviceToken).where(
-                    and_(
-                        DeviceToken.patient_id == patient_id,
-                        DeviceToken.is_active == True
-                    )
-                )
-            )
-            device_token = result.scalar_one_or_none()
-            
-            if device_token and settings.PUSH_ENABLED:
+            if use_push:
                 await self.send_push_notification(
-                    fcm_token=device_token.token,
+                    fcm_token=device_token,
                     title=f"Queue Update: Position {position}",
                     message=message,
                     notification_id=notification.id,
                     db=db
                 )
             # Fall back to SMS
-            elif settings.SMS_ENABLED:
+            else:
                 await self.send_sms(
-                    phone_number=patient.phone_number,
+                    phone_number=phone_number,
                     message=message,
                     notification_id=notification.id,
                     db=db
@@ -615,15 +1118,30 @@ class NotificationService:
     ):
         """Send a manual notification from a doctor to a patient"""
         try:
-            # Get patient details
+            # Get patient contact details together with an active device token
             result = await db.execute(
-                select(Patient).where(Patient.id == patient_id)
+                select(Patient.phone_number, Patient.first_name, DeviceToken.token)
+                .outerjoin(
+                    DeviceToken,
+                    and_(
+                        DeviceToken.patient_id == Patient.id,
+                        DeviceToken.is_active == True
+                    )
+                )
+                .where(Patient.id == patient_id)
             )
-            patient = result.scalar_one_or_none()
+            row = result.first()
             
-            if not patient:
+            if not row:
                 logger.error(f"Patient not found: {patient_id}")
                 return None
+            phone_number, first_name, device_token = row
+            
+            # Pick the delivery channel before writing anything
+            use_push = bool(device_token) and self.push_enabled
+            if not use_push and not self.sms_enabled:
+                logger.info(f"No notification channel available for patient {patient_id}, skipping")
+                return None
             
             # Get doctor details
             result = await db.execute(
@@ -640,12 +1158,12 @@ class NotificationService:
             
             # Customize message if not already mentioning the doctor
             if "doctor" not in message.lower():
-                message = f"Message from your doctor: {message}"
+                message = MSG_DOCTOR_MESSAGE.format_map({"message": message})
             
             # Create notification record
             notification_data = NotificationCreate(
-                type=NotificationType.SYSTEM,
-                recipient=patient.phone_number,
+                type=NotificationType.SYSTEM if use_push else NotificationType.SMS,
+                recipient=phone_number,
                 message=message,
                 subject=subject,
                 patient_id=patient_id,
@@ -655,28 +1173,18 @@ class NotificationService:
             notification = await self.create_notification(db, notification_data)
             
             # Send push notification if device token is available
-            result = await db.execute(
-                select(DeviceToken).where(
-                    and_(
-                        DeviceToken.patient_id == patient_id,
-                        DeviceToken.is_active == True
-                    )
-                )
-            )
-            device_token = result.scalar_one_or_none()
-            
-            if device_token and settings.PUSH_ENABLED:
+            if use_push:
                 await self.send_push_notification(
-                    fcm_token=device_token.token,
+                    fcm_token=device_token,
                     title=subject,
                     message=message,
                     notification_id=notification.id,
                     db=db
                 )
             # Fall back to SMS
-            elif settings.SMS_ENABLED:
+            else:
                 await self.send_sms(
-                    phone_number=patient.phone_number,
+                    phone_number=phone_number,
                     message=message,
                     notification_id=notification.id,
                     db=db
@@ -689,7 +1197,16 @@ class NotificationService:
             return None
 
 
-# Global notification service instance
-notification_service = NotificationService()
+# Process-wide instance; the FastAPI lifespan starts and closes it, Celery
+# workers and scripts create it on first use
+_notification_service: Optional[NotificationService] = None
+
+
+def get_notification_service() -> NotificationService:
+    """Return the process-wide NotificationService"""
+    global _notification_service
+    if _notification_service is None:
+        _notification_service = NotificationService()
+    return _notification_service
 
 # The file has been fixed by removing the misplaced function
\ No newline at end of file
@@ -1,122 +1,240 @@
 from typing import Dict, Any
 from datetime import datetime, timedelta
-from sqlalchemy import select, func, and_, extract, case
+from sqlalchemy import (
+    select, func, and_, extract, tuple_, cast, Numeric, Integer, Float, Date,
+    column, literal_column, table, text, union_all
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Queue, QueueStatus
+from utils.cache import AsyncTTLCache
+
+# Dashboards poll analytics frequently; results are shared for a short TTL
+# and dropped whenever the queue is written to
+ANALYTICS_CACHE_TTL_SECONDS = 60
+_analytics_cache = AsyncTTLCache(ttl=ANALYTICS_CACHE_TTL_SECONDS)
+
+# Hourly rollup of closed days, maintained as a materialized view (see the
+# add_queue_hourly_stats_view migration) and refreshed by the worker
+queue_hourly_stats = table(
+    "queue_hourly_stats",
+    column("hour_start", Queue.created_at.type),
+    column("status", Queue.status.type),
+    column("total", Integer),
+    column("served", Integer),
+    column("wait_minutes", Float),
+    column("waits", Integer),
+    column("clamped_wait_minutes", Float),
+    column("clamped_waits", Integer),
+)
+
+# Median wait per closed day; medians cannot be summed from the hourly rollup
+queue_daily_wait_stats = table(
+    "queue_daily_wait_stats",
+    column("day", Date),
+    column("p50_wait_minutes", Float),
+)
+
+# Waits at or above this are left out of the clamped average (must match the
+# add_wait_time_outlier_rollups migration)
+WAIT_OUTLIER_CUTOFF = timedelta(hours=8)
+
+# func.grouping(hour, date, weekday, status) bitmask for each grouping set
+GROUPED_BY_HOUR = 0b0111
+GROUPED_BY_DATE = 0b1011
+GROUPED_BY_WEEKDAY = 0b1101
+GROUPED_BY_STATUS = 0b1110
+
+def invalidate_queue_analytics() -> None:
+    """Discard cached analytics after the queue changes"""
+    _analytics_cache.invalidate()
 
 async def get_queue_analytics(db: AsyncSession, days: int = 30) -> Dict[str, Any]:
     """Get queue analytics for the specified time period"""
+    return await _analytics_cache.get_or_load(
+        days, lambda: _compute_queue_analytics(db, days)
+    )
+
+async def refresh_queue_stats_views(db: AsyncSession) -> None:
+    """Rebuild the analytics rollups with the latest closed days"""
+    await db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY queue_hourly_stats"))
+    await db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY queue_daily_wait_stats"))
+    await db.commit()
+    invalidate_queue_analytics()
+
+async def _compute_queue_analytics(db: AsyncSession, days: int) -> Dict[str, Any]:
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # Get hourly queue distribution
-    hourly_distribution = await db.execute(
+    completed = Queue.status == QueueStatus.COMPLETED
+    waited = and_(completed, Queue.served_at.isnot(None))
+    waited_clamped = and_(completed, Queue.served_at - Queue.created_at < WAIT_OUTLIER_CUTOFF)
+    wait_minutes = Queue.wait_minutes
+    
+    # Rows after the newest rolled-up hour are aggregated from the live table;
+    # everything before comes from the materialized view
+    live_since = (
         select(
-            extract('hour', Queue.created_at).label('hour'),
-            func.count(Queue.id).label('count')
+            func.coalesce(
+                func.max(queue_hourly_stats.c.hour_start) + timedelta(hours=1),
+                start_date
+            )
         )
-        .where(Queue.created_at >= start_date)
-        .group_by(extract('hour', Queue.created_at))
-        .order_by(extract('hour', Queue.created_at))
+        .where(queue_hourly_stats.c.hour_start >= func.date_trunc('hour', start_date))
+        .scalar_subquery()
     )
     
-    # Get daily queue counts
-    daily_queues = await db.execute(
+    rolled_up = select(
+        queue_hourly_stats.c.hour_start,
+        queue_hourly_stats.c.status,
+        queue_hourly_stats.c.total,
+        queue_hourly_stats.c.served,
+        queue_hourly_stats.c.wait_minutes,
+        queue_hourly_stats.c.waits,
+        queue_hourly_stats.c.clamped_wait_minutes,
+        queue_hourly_stats.c.clamped_waits
+    ).where(queue_hourly_stats.c.hour_start >= func.date_trunc('hour', start_date))
+    
+    # Literal unit so the SELECT and GROUP BY expressions are identical to Postgres
+    live_hour = func.date_trunc(literal_column("'hour'"), Queue.created_at)
+    live = (
         select(
-            func.date(Queue.created_at).label('date'),
-            func.count(Queue.id).label('count')
+            live_hour.label('hour_start'),
+            Queue.status,
+            func.count(Queue.id).label('total'),
+            func.count(Queue.id).filter(completed).label('served'),
+            func.sum(wait_minutes).filter(waited).label('wait_minutes'),
+            func.count(Queue.id).filter(waited).label('waits'),
+            func.sum(wait_minutes).filter(waited_clamped).label('clamped_wait_minutes'),
+            func.count(Queue.id).filter(waited_clamped).label('clamped_waits')
         )
-        .where(Queue.created_at >= start_date)
-        .group_by(func.date(Queue.created_at))
-        .order_by(func.date(Queue.created_at))
+        .where(and_(Queue.created_at >= start_date, Queue.created_at >= live_since))
+        .group_by(live_hour, Queue.status)
     )
     
-    # Get average wait times by day
-    daily_wait_times = await db.execute(
+    hourly = union_all(rolled_up, live).subquery()
+    
+    hour = extract('hour', hourly.c.hour_start)
+    day = func.date(hourly.c.hour_start)
+    weekday = extract('dow', hourly.c.hour_start)
+    total = func.sum(hourly.c.total)
+    served = func.sum(hourly.c.served)
+    
+    # One pass over the hourly rows, aggregated per hour, date, weekday and status
+    result = await db.execute(
         select(
-            func.date(Queue.created_at).label('date'),
-            func.avg(
-                func.extract('epoch', Queue.served_at - Queue.created_at) / 60
-            ).label('avg_wait_time')
+            func.grouping(hour, day, weekday, hourly.c.status).label('grouping'),
+            hour.label('hour'),
+            day.label('date'),
+            weekday.label('weekday'),
+            hourly.c.status,
+            total.label('count'),
+            served.label('served'),
+            func.round(
+                cast(100 * served, Numeric) / func.nullif(total, 0), 2
+            ).label('rate'),
+            (
+                func.sum(hourly.c.wait_minutes) / func.nullif(func.sum(hourly.c.waits), 0)
+            ).label('avg_wait_time'),
+            (
+                func.sum(hourly.c.clamped_wait_minutes)
+                / func.nullif(func.sum(hourly.c.clamped_waits), 0)
+            ).label('avg_wait_time_clamped')
         )
-        .where(
-            and_(
-                Queue.status == QueueStatus.COMPLETED,
-                Queue.created_at >= start_date,
-                Queue.served_at.isnot(None)
+        .group_by(
+            func.grouping_sets(
+                tuple_(hour),
+                tuple_(day),
+                tuple_(weekday),
+                tuple_(hourly.c.status)
             )
         )
-        .group_by(func.date(Queue.created_at))
-        .order_by(func.date(Queue.created_at))
     )
     
-    # Get weekday distribution
-    weekday_distribution = await db.execute(
-        select(
-            extract('dow', Queue.created_at).label('weekday'),
-            func.count(Queue.id).label('count')
-        )
-        .where(Queue.created_at >= start_date)
-        .group_by(extract('dow', Queue.created_at))
-        .order_by(extract('dow', Queue.created_at))
-    )
-    
-    # Get queue status distribution
-    queue_status_distribution = await db.execute(
-        select(
-            Queue.status,
-            func.count(Queue.id).label('count')
-        )
-        .where(Queue.created_at >= start_date)
-        .group_by(Queue.status)
+    # Daily median wait: closed days from their rollup, later days from the table
+    live_days_since = (
+        select(func.coalesce(func.max(queue_daily_wait_stats.c.day) + 1, start_date.date()))
+        .where(queue_daily_wait_stats.c.day >= start_date.date())
+        .scalar_subquery()
     )
-    
-    # Get hourly served rate
-    hourly_served_rate = await db.execute(
-        select(
-            extract('hour', Queue.created_at).label('hour'),
-            func.count(Queue.id).label('total'),
-            func.sum(
-                case(
-                    [(Queue.status == QueueStatus.COMPLETED, 1)],
-                    else_=0
+    # Session-time-zone day, as the rollup views group by; queue_date is the UTC
+    # day and would split days differently. The created_at range keeps it sargable
+    live_day = func.date(Queue.created_at)
+    median_result = await db.execute(
+        union_all(
+            select(
+                queue_daily_wait_stats.c.day,
+                queue_daily_wait_stats.c.p50_wait_minutes
+            ).where(queue_daily_wait_stats.c.day >= start_date.date()),
+            select(
+                live_day.label('day'),
+                func.percentile_cont(0.5).within_group(wait_minutes).label('p50_wait_minutes')
+            )
+            .where(
+                and_(
+                    waited,
+                    Queue.created_at >= start_date,
+                    Queue.created_at >= live_days_since
                 )
-            ).label('served')
+            )
+            .group_by(live_day)
         )
-        .where(Queue.created_at >= start_date)
-        .group_by(extract('hour', Queue.created_at))
-        .order_by(extract('hour', Queue.created_at))
     )
+    median_waits = dict(median_result.tuples())
+    
+    # Rows are unpacked positionally as plain tuples; attribute access on Row
+    # objects adds up over long windows
+    hour_rows, day_rows, weekday_rows, status_rows = [], [], [], []
+    for (
+        grouping, hour_of_day, date_, dow, status, count, served_count, rate, avg_wait, avg_wait_clamped
+    ) in result.tuples():
+        if grouping == GROUPED_BY_HOUR:
+            hour_rows.append((int(hour_of_day), int(count), int(served_count or 0), float(rate or 0)))
+        elif grouping == GROUPED_BY_DATE:
+            day_rows.append((date_, int(count), avg_wait, avg_wait_clamped))
+        elif grouping == GROUPED_BY_WEEKDAY:
+            weekday_rows.append((int(dow), int(count)))
+        elif grouping == GROUPED_BY_STATUS:
+            status_rows.append((status, int(count)))
+    
+    hour_rows.sort()
+    day_rows.sort(key=lambda row: row[0])
+    weekday_rows.sort()
     
     return {
         "hourly_distribution": [
-            {"hour": int(row.hour), "count": row.count}
-            for row in hourly_distribution.all()
+            {"hour": h, "count": count}
+            for h, count, _, _ in hour_rows
         ],
         "daily_queues": [
-            {"date": str(row.date), "count": row.count}
-            for row in daily_queues.all()
+            {"date": str(d), "count": count}
+            for d, count, _, _ in day_rows
         ],
         "daily_wait_times": [
-            {"date": str(row.date), "avg_wait_time": int(row.avg_wait_time or 0)}
-            for row in daily_wait_times.all()
+            {
+                "date": str(d),
+                "avg_wait_time": int(avg_wait or 0),
+                "avg_wait_time_clamped": int(avg_wait_clamped or 0),
+                "p50_wait_time": int(median_waits.get(d) or 0)
+            }
+            for d, _, avg_wait, avg_wait_clamped in day_rows
+            if avg_wait is not None
         ],
         "weekday_distribution": [
-            {"weekday": int(row.weekday), "count": row.count}
-            for row in weekday_distribution.all()
+            {"weekday": wd, "count": count}
+            for wd, count in weekday_rows
         ],
         "queue_status_distribution": [
-            {"status": row.status.value, "count": row.count}
-            for row in queue_status_distribution.all()
+            {"status": status.value, "count": count}
+            for status, count in status_rows
         ],
         "hourly_served_rate": [
             {
-                "hour": int(row.hour), 
-                "total": row.total, 
-                "served": row.served or 0,
-                "rate": round((row.served or 0) / row.total * 100, 2) if row.total > 0 else 0
+                "hour": h, 
+                "total": count, 
+                "served": served_count,
+                "rate": rate
             }
-            for row in hourly_served_rate.all()
+            for h, count, served_count, rate in hour_rows
         ]
     } 
\ No newline at end of file
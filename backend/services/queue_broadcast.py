@@ -0,0 +1,140 @@
+"""
+Push queue changes to connected WebSocket clients.
+
+Patients and doctors subscribe to their own queue, so apps update at commit
+time instead of polling the REST status endpoints. Doctors get every change
+the queue_changes NOTIFY listener sees for their queue. A change to any
+entry can move every patient waiting that day, so each change instead makes
+every subscribed patient's status (position, wait estimate, number being
+served) be recomputed and pushed to them when it differs from the last push.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from database import AsyncSessionLocal
+from services.queue_service import QueueService
+
+logger = logging.getLogger(__name__)
+
+# (audience, id): ("patient", patient_id) or ("doctor", doctor_id)
+Subscription = Tuple[str, UUID]
+
+
+class QueueBroadcaster:
+    """Registry of WebSocket subscribers keyed by patient or doctor"""
+
+    def __init__(self):
+        self._subscribers: Dict[Subscription, Set[WebSocket]] = defaultdict(set)
+        self._pending: Set[asyncio.Task] = set()
+        # Last status pushed to each subscribed patient, JSON encoded for comparison
+        self._last_status: Dict[UUID, str] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_again = False
+
+    def subscribe(self, subscription: Subscription, websocket: WebSocket) -> None:
+        """Start forwarding changes for subscription to websocket"""
+        self._subscribers[subscription].add(websocket)
+
+    def unsubscribe(self, subscription: Subscription, websocket: WebSocket) -> None:
+        """Stop forwarding changes to websocket"""
+        sockets = self._subscribers.get(subscription)
+        if sockets is None:
+            return
+        sockets.discard(websocket)
+        if not sockets:
+            del self._subscribers[subscription]
+            self._last_status.pop(subscription[1], None)
+
+    async def serve(self, subscription: Subscription, websocket: WebSocket) -> None:
+        """Accept websocket and keep it subscribed until the client disconnects"""
+        await websocket.accept()
+        self.subscribe(subscription, websocket)
+        try:
+            audience, subscriber_id = subscription
+            if audience == "patient":
+                # Start from the current status rather than waiting for a change
+                async with AsyncSessionLocal() as db:  # type: ignore
+                    queue_status = await QueueService.get_live_queue_status(db, subscriber_id)
+                await websocket.send_json(queue_status)
+            # Clients only listen; reading detects the disconnect
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.unsubscribe(subscription, websocket)
+
+    def publish(self, change: Dict[str, Any]) -> None:
+        """
+        Forward a decoded queue change notification to its subscribers.
+
+        Called from the NOTIFY callback, so sends are scheduled rather than awaited.
+        """
+        doctor_id = _as_uuid(change.get("doctor_id"))
+        if doctor_id is not None:
+            self._send_all(("doctor", doctor_id), change)
+        
+        if any(audience == "patient" for audience, _ in self._subscribers):
+            self._schedule_patient_refresh()
+
+    def _send_all(self, subscription: Subscription, message: Any) -> None:
+        for websocket in list(self._subscribers.get(subscription, ())):
+            task = asyncio.create_task(self._send(subscription, websocket, message))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _schedule_patient_refresh(self) -> None:
+        # A burst of changes (e.g. positions rewritten for a whole queue) is
+        # coalesced: at most one refresh runs, plus one more after it
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_again = True
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_patients())
+
+    async def _refresh_patients(self) -> None:
+        """Recompute every subscribed patient's status and push the ones that changed"""
+        while True:
+            self._refresh_again = False
+            patient_ids = [
+                subscriber_id for audience, subscriber_id in list(self._subscribers)
+                if audience == "patient"
+            ]
+            try:
+                async with AsyncSessionLocal() as db:  # type: ignore
+                    for patient_id in patient_ids:
+                        queue_status = await QueueService.get_live_queue_status(db, patient_id)
+                        encoded = json.dumps(queue_status, sort_keys=True, default=str)
+                        if self._last_status.get(patient_id) == encoded:
+                            continue
+                        if ("patient", patient_id) in self._subscribers:
+                            self._last_status[patient_id] = encoded
+                            self._send_all(("patient", patient_id), queue_status)
+            except Exception as e:
+                logger.error(f"Failed to refresh patient queue statuses: {str(e)}")
+            
+            if not self._refresh_again:
+                return
+
+    async def _send(self, subscription: Subscription, websocket: WebSocket, message: Any) -> None:
+        try:
+            await websocket.send_json(message)
+        except Exception as e:
+            logger.info(f"Dropping queue subscriber after failed send: {str(e)}")
+            self.unsubscribe(subscription, websocket)
+
+
+def _as_uuid(value: Any) -> Optional[UUID]:
+    try:
+        return UUID(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+queue_broadcaster = QueueBroadcaster()
@@ -0,0 +1,221 @@
+"""
+In-process mirror of each doctor's waiting queue.
+
+call_next_patient peeks the head of the doctor's heap instead of sorting the
+waiting rows on every call. The heaps are seeded from the database on startup
+and kept current by the queue_changes NOTIFY trigger; the database stays the
+source of truth, since the caller still claims the entry with a guarded
+UPDATE and reports back when the heap pointed at a row it could not claim.
+
+The same listener connection hands every parsed change to registered change
+listeners (the WebSocket broadcaster), so one LISTEN serves both.
+
+Every worker process keeps its own heaps from its own LISTEN, so nothing has
+to be mirrored between workers. If the listener connection drops, the heaps
+are cleared (changes may have been missed), callers fall back to SQL, and the
+heaps are rebuilt once the connection comes back.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import asyncpg
+from sqlalchemy import select
+
+from api.core.config import settings
+from database import AsyncSessionLocal
+from models import Queue, QueueStatus
+from utils.datetime_utils import get_utc_today
+
+logger = logging.getLogger(__name__)
+
+# Channel the queue_notify_change trigger publishes row changes on
+QUEUE_CHANNEL = "queue_changes"
+
+# Pause between attempts to re-establish a dropped listener connection
+RECONNECT_DELAY_SECONDS = 5
+
+# Same order as the SQL fallback: priority_key DESC, id ASC
+HeapKey = Tuple[int, str]
+
+
+class WaitingQueueHeaps:
+    """
+    Per-doctor min-heaps of today's waiting queue entries.
+
+    Entries are never removed from the middle of a heap. _live maps each
+    waiting entry to its current key; heap items whose key no longer matches
+    (served, cancelled, re-prioritized) are dropped lazily when they surface.
+    """
+
+    def __init__(self):
+        self._heaps: Dict[UUID, List[Tuple[HeapKey, UUID]]] = defaultdict(list)
+        self._live: Dict[UUID, Tuple[UUID, HeapKey, date]] = {}
+        self._connection: Optional[asyncpg.Connection] = None
+        self._change_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the heaps are being kept in sync with the database"""
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def startup(self) -> None:
+        """Start listening for queue changes and load today's waiting entries"""
+        try:
+            self._connection = await asyncpg.connect(
+                settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+            )
+            # Listen before loading so no change committed after the snapshot is missed
+            await self._connection.add_listener(QUEUE_CHANNEL, self._on_notify)
+            self._connection.add_termination_listener(self._on_terminated)
+        except Exception as e:
+            logger.warning(f"Queue heaps disabled, falling back to SQL ordering: {str(e)}")
+            self._connection = None
+            return
+
+        async with AsyncSessionLocal() as session:  # type: ignore
+            result = await session.execute(
+                select(Queue.id, Queue.doctor_id, Queue.priority_key, Queue.queue_date)
+                .where(
+                    Queue.status == QueueStatus.WAITING,
+                    Queue.queue_date == get_utc_today(),
+                    Queue.doctor_id.isnot(None)
+                )
+            )
+            for queue_id, doctor_id, priority_key, queue_date in result.tuples():
+                self._push(queue_id, doctor_id, priority_key, queue_date)
+
+        logger.info(f"Loaded {len(self._live)} waiting queue entries into memory")
+
+    async def aclose(self) -> None:
+        """Stop listening and forget every entry"""
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        await self._drop_connection()
+
+    def peek(self, doctor_id: UUID) -> Optional[UUID]:
+        """
+        Return the next waiting queue entry for a doctor without removing it.
+
+        The entry stays in the heap until the NOTIFY for its status change
+        arrives, so a claim that is rolled back does not lose the patient.
+
+        Args:
+            doctor_id (UUID): Doctor whose queue to look at
+
+        Returns:
+            Optional[UUID]: Queue entry id, or None when nothing is waiting
+        """
+        heap = self._heaps.get(doctor_id)
+        today = get_utc_today()
+        while heap:
+            key, queue_id = heap[0]
+            live = self._live.get(queue_id)
+            if live is not None and live[0] == doctor_id and live[1] == key:
+                if live[2] == today:
+                    return queue_id
+                # Left over from a previous day
+                self.discard(queue_id)
+            heapq.heappop(heap)
+        return None
+
+    def waiting_counts(self) -> Dict[UUID, int]:
+        """Number of today's waiting entries per doctor"""
+        today = get_utc_today()
+        counts: Dict[UUID, int] = defaultdict(int)
+        for doctor_id, _, queue_date in self._live.values():
+            if queue_date == today:
+                counts[doctor_id] += 1
+        return counts
+
+    def add_change_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Also pass every queue change notification (decoded JSON) to listener"""
+        self._change_listeners.append(listener)
+
+    def discard(self, queue_id: UUID) -> None:
+        """Forget an entry that turned out not to be claimable"""
+        self._live.pop(queue_id, None)
+
+    def _push(
+        self,
+        queue_id: UUID,
+        doctor_id: UUID,
+        priority_key: int,
+        queue_date: date
+    ) -> None:
+        key = (-priority_key, str(queue_id))
+        self._live[queue_id] = (doctor_id, key, queue_date)
+        heapq.heappush(self._heaps[doctor_id], (key, queue_id))
+
+    def _on_terminated(self, connection) -> None:
+        if connection is not self._connection:
+            return
+        logger.warning("Queue change listener connection lost, falling back to SQL ordering")
+        self._connection = None
+        self._heaps.clear()
+        self._live.clear()
+        if self._reconnect_task is None:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        try:
+            while not self.ready:
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.warning(f"Reloading queue heaps failed: {str(e)}")
+                    await self._drop_connection()
+        finally:
+            self._reconnect_task = None
+
+    async def _drop_connection(self) -> None:
+        # Cleared first so the termination listener sees a deliberate close
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+        self._heaps.clear()
+        self._live.clear()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+        except ValueError as e:
+            logger.error(f"Ignoring malformed queue change notification: {str(e)}")
+            return
+
+        for listener in self._change_listeners:
+            try:
+                listener(change)
+            except Exception as e:
+                logger.error(f"Queue change listener failed: {str(e)}")
+
+        try:
+            queue_id = UUID(change["id"])
+            if (
+                change["op"] == "DELETE"
+                or change["status"] != QueueStatus.WAITING.name
+                or not change["doctor_id"]
+            ):
+                self.discard(queue_id)
+                return
+
+            self._push(
+                queue_id,
+                UUID(change["doctor_id"]),
+                change["priority_key"],
+                date.fromisoformat(change["queue_date"])
+            )
+        except Exception as e:
+            logger.error(f"Ignoring malformed queue change notification: {str(e)}")
+
+
+waiting_queue_heaps = WaitingQueueHeaps()
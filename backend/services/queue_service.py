@@ -1,21 +1,281 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, or_, insert, column, asc, desc, update
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, func, or_, insert, column, asc, update, literal, values, bindparam, true, case, cast, event, Integer
+from sqlalchemy.orm import selectinload, joinedload, aliased, defer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from uuid import UUID
 from datetime import datetime, date, timedelta, timezone
 import asyncio
+import hashlib
 import logging
 import random
+import re
 import string
+import uuid
+import warnings
 
-from models import Queue, Appointment, Patient, Doctor, User, UrgencyLevel, QueueStatus
+from models import Queue, QueueCounter, QueueEvent, QueueDailyStats, Appointment, Patient, Doctor, User, UrgencyLevel, QueueStatus
 from schemas import QueueCreate, QueueUpdate, QueueResponse
-from .notification_service import NotificationService
-from utils.datetime_utils import get_timezone_aware_now
+from .doctor_service import DoctorService
+from .notification_service import NotificationService, get_notification_service
+from .queue_analytics import invalidate_queue_analytics
+from .queue_heap import waiting_queue_heaps
+from utils.cache import SharedTTLCache, get_redis
+from utils.datetime_utils import get_utc_today
 
 logger = logging.getLogger(__name__)
 
+# Same-day counts are polled by dashboards and kiosks; a few seconds of
+# staleness is fine and status transitions drop the cache anyway
+STATISTICS_CACHE_TTL_SECONDS = 10
+_statistics_cache = SharedTTLCache("queue_stats", ttl=STATISTICS_CACHE_TTL_SECONDS)
+
+# Patient apps poll their queue status every few seconds. Positions only move
+# on queue transitions, which drop the cache; the TTL covers writes made
+# outside this service
+PATIENT_STATUS_CACHE_TTL_SECONDS = 30
+_patient_status_cache = SharedTTLCache("patient_queue_status", ttl=PATIENT_STATUS_CACHE_TTL_SECONDS)
+
+# Staff and waiting-room screens poll today's full board. Changes made through
+# this service drop it; the TTL covers writes made elsewhere
+QUEUE_BOARD_CACHE_TTL_SECONDS = 10
+_queue_board_cache = SharedTTLCache("queue_board", ttl=QUEUE_BOARD_CACHE_TTL_SECONDS)
+
+
+async def _invalidate_queue_caches() -> None:
+    """Drop cached statistics, patient statuses, the queue board and analytics after a queue entry changes"""
+    invalidate_queue_analytics()
+    await _statistics_cache.invalidate()
+    await _patient_status_cache.invalidate()
+    await _queue_board_cache.invalidate()
+
+
+# Invalidations started from after_commit hooks, referenced until they finish
+_pending_invalidations: Set[asyncio.Task] = set()
+
+
+def _invalidate_queue_caches_on_commit(db: AsyncSession) -> None:
+    """
+    Drop the queue caches once db's current transaction commits.
+    
+    Methods that leave the commit to their caller use this; invalidating
+    before the commit would let a poll in between cache the old rows again
+    for a full TTL.
+    """
+    sync_session = db.sync_session
+    if sync_session.info.get("queue_caches_stale"):
+        return
+    sync_session.info["queue_caches_stale"] = True
+    
+    def after_commit(session) -> None:
+        session.info.pop("queue_caches_stale", None)
+        task = asyncio.get_running_loop().create_task(_invalidate_queue_caches())
+        _pending_invalidations.add(task)
+        task.add_done_callback(_pending_invalidations.discard)
+    
+    event.listen(sync_session, "after_commit", after_commit, once=True)
+
+
+# Fingerprint of the position updates last sent for each queue. A re-rank that
+# leaves every notified patient where they were sends nothing; the TTL lets a
+# fingerprint from a previous day expire
+POSITION_DIGEST_TTL_SECONDS = 24 * 60 * 60
+_position_digests: Dict[str, str] = {}
+
+
+def _position_digest(updates: List[Tuple[UUID, int, int]]) -> str:
+    """Order-independent fingerprint of (patient_id, position, wait) updates"""
+    payload = b"".join(
+        patient_id.bytes + position.to_bytes(4, "big")
+        for patient_id, position, _ in sorted(updates)
+    )
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+async def _swap_position_digest(queue_key: str, digest: str) -> Optional[str]:
+    """Store the digest last sent for queue_key and return the one it replaces"""
+    redis = get_redis()
+    if redis is not None:
+        try:
+            # SET ... GET swaps atomically, so every worker sees the same history
+            return await redis.set(
+                f"queue_position_digest:{queue_key}", digest,
+                ex=POSITION_DIGEST_TTL_SECONDS, get=True
+            )
+        except Exception as e:
+            logger.warning(f"Redis unavailable for queue position digests: {str(e)}")
+    previous = _position_digests.get(queue_key)
+    _position_digests[queue_key] = digest
+    return previous
+
+
+# Minutes budgeted per waiting patient when estimating wait times
+AVERAGE_CONSULTATION_MINUTES = 15
+
+# Priority score of a queue entry by appointment urgency (BASE + bonus);
+# _enqueue computes the same score in SQL
+BASE_PRIORITY_SCORE = 100
+URGENCY_PRIORITY_BONUS = {
+    UrgencyLevel.EMERGENCY: 3000,  # Highest priority for emergencies
+    UrgencyLevel.HIGH: 1000,
+    UrgencyLevel.NORMAL: 0,
+    UrgencyLevel.LOW: -200,
+}
+
+# Department preference from keywords in the appointment reason; a simple
+# stand-in for a real classification, matched in one pass over the text
+_DEPARTMENT_KEYWORDS = re.compile(r"cardio|ortho|pediatric|child|emergency|urgent", re.IGNORECASE)
+_KEYWORD_DEPARTMENTS = {
+    "cardio": "Cardiology",
+    "ortho": "Orthopedics",
+    "pediatric": "Pediatrics",
+    "child": "Pediatrics",
+    "emergency": "Emergency",
+    "urgent": "Emergency",
+}
+
+
+def _department_from_reason(reason: Optional[str]) -> Optional[str]:
+    """Department suggested by the first keyword found in reason, if any"""
+    match = _DEPARTMENT_KEYWORDS.search(reason) if reason else None
+    return _KEYWORD_DEPARTMENTS[match.group(0).lower()] if match else None
+
+
+# Rows fetched per round trip when streaming queue listings
+STREAM_BATCH_SIZE = 500
+
+
+def _typed_values(name: str, columns: List[Any], rows: List[Tuple]) -> Any:
+    """
+    Build a VALUES list whose parameters are cast to their column types.
+    
+    The asyncpg dialect binds VALUES parameters without types, so PostgreSQL
+    would read them as text and reject uuid = text comparisons and text
+    written into uuid/integer columns.
+    """
+    return values(*columns, name=name).data([
+        tuple(cast(literal(value, col.type), col.type) for col, value in zip(columns, row))
+        for row in rows
+    ])
+
+
+def _queued_on(day: date):
+    """Predicate for queue entries created on the given day (indexed queue_date)"""
+    return Queue.queue_date == day
+
+
+# Hot read statements, built once so each call only supplies bind values and
+# hits SQLAlchemy's compiled-statement cache directly
+_ACTIVE_STATUSES = [QueueStatus.WAITING, QueueStatus.SERVING]
+_QUEUED_ON_DAY = Queue.queue_date == bindparam("queue_date")
+
+def _queue_details(entity=Queue) -> Tuple:
+    """
+    Loader options for the relationships queue responses serialize: the
+    appointment, its patient and its doctor's user, joined into the same query
+    
+    entity may be an alias of Queue over a data-modifying CTE, which is how
+    INSERT/UPDATE ... RETURNING gets its details without a second round trip.
+    """
+    return (
+        joinedload(entity.appointment).joinedload(Appointment.patient),
+        joinedload(entity.appointment).joinedload(Appointment.doctor).joinedload(Doctor.user),
+        # Any other relationship of a listed appointment raises instead of being
+        # lazy-loaded one row at a time
+        joinedload(entity.appointment).raiseload("*"),
+    )
+
+
+_QUEUE_DETAILS_JOINED = _queue_details()
+
+# Listings only serialize QueueSchema, so the appointment graph leaves out
+# credentials and the doctor's free-text profile; touching them raises
+_QUEUE_LISTING_DETAILS = (
+    joinedload(Queue.appointment).joinedload(Appointment.patient).defer(Patient.password_hash, raiseload=True),
+    joinedload(Queue.appointment).joinedload(Appointment.doctor).options(
+        defer(Doctor.bio, raiseload=True),
+        defer(Doctor.education, raiseload=True),
+        defer(Doctor.experience, raiseload=True),
+        joinedload(Doctor.user).defer(User.password_hash, raiseload=True)
+    ),
+    joinedload(Queue.appointment).raiseload("*"),
+)
+# Same graph loaded with IN queries, for fetching many entries by id
+_QUEUE_DETAILS_SELECTIN = (
+    selectinload(Queue.appointment).selectinload(Appointment.patient),
+    selectinload(Queue.appointment).selectinload(Appointment.doctor).selectinload(Doctor.user),
+    selectinload(Queue.appointment).raiseload("*"),
+)
+
+_SELECT_QUEUE_BY_ID = select(Queue).where(Queue.id == bindparam("queue_id"))
+
+_SELECT_ACTIVE_BY_PATIENT = select(Queue).options(*_QUEUE_DETAILS_JOINED).where(
+    and_(
+        Queue.patient_id == bindparam("patient_id"),
+        Queue.status.in_(_ACTIVE_STATUSES),
+        _QUEUED_ON_DAY
+    )
+)
+
+_SELECT_ACTIVE_BY_APPOINTMENT_PATIENT = select(Queue).options(*_QUEUE_DETAILS_JOINED).join(Appointment).where(
+    and_(
+        Appointment.patient_id == bindparam("patient_id"),
+        Queue.status.in_(_ACTIVE_STATUSES),
+        _QUEUED_ON_DAY
+    )
+)
+
+# Queue display and call order: aged priority, oldest first on ties; id keeps
+# keyset cursors unambiguous
+_QUEUE_ORDER = (Queue.priority_key.desc(), Queue.id.asc())
+
+# Entries strictly after the (priority_key, id) cursor in _QUEUE_ORDER
+_AFTER_CURSOR = or_(
+    Queue.priority_key < bindparam("after_priority_key"),
+    and_(
+        Queue.priority_key == bindparam("after_priority_key"),
+        Queue.id > bindparam("after_id")
+    )
+)
+
+_SELECT_DOCTOR_QUEUE = (
+    select(Queue)
+    .options(*_QUEUE_LISTING_DETAILS)
+    .where(
+        and_(
+            Queue.doctor_id == bindparam("doctor_id"),
+            _QUEUED_ON_DAY,
+            Queue.status.in_(_ACTIVE_STATUSES)
+        )
+    )
+    .order_by(*_QUEUE_ORDER)
+    .limit(bindparam("limit"))
+)
+_SELECT_DOCTOR_QUEUE_PAGE = _SELECT_DOCTOR_QUEUE.offset(bindparam("skip"))
+_SELECT_DOCTOR_QUEUE_AFTER = _SELECT_DOCTOR_QUEUE.where(_AFTER_CURSOR)
+
+QueueCursor = Tuple[int, UUID]
+
+
+def _cursor_params(after: QueueCursor) -> Dict[str, Any]:
+    """Bind values for _AFTER_CURSOR from the last entry of the previous page"""
+    priority_key, queue_id = after
+    return {"after_priority_key": priority_key, "after_id": queue_id}
+
+
+def _warn_offset_paging() -> None:
+    warnings.warn(
+        "Paging queue listings with skip is deprecated; pass after=queue_cursor(last_entry)",
+        DeprecationWarning,
+        stacklevel=3
+    )
+
+
+def queue_cursor(entry: Queue) -> QueueCursor:
+    """Cursor to pass as `after` to fetch the page following this entry"""
+    return entry.priority_key, entry.id
+
+
 class QueueService:
     @staticmethod
     def generate_queue_identifier() -> str:
@@ -34,57 +294,22 @@ class QueueService:
     ) -> Queue:
         """Add an appointment to the queue"""
         try:
-            # Verify appointment exists
-            result = await db.execute(
-                select(Appointment).where(Appointment.id == appointment_id)
-            )
-            appointment = result.scalar_one_or_none()
-            if not appointment:
-                raise ValueError("Appointment not found")
-            
-            print(f"Found appointment: {appointment.id}")
-            
-            # Check if already in queue
-            result = await db.execute(
-                select(Queue).where(
-                    and_(
-                        Queue.appointment_id == appointment_id,
-                        Queue.status.in_([QueueStatus.WAITING, QueueStatus.SERVING])
-                    )
-                )
-            )
-            existing_queue = result.scalar_one_or_none()
-            if existing_queue:
-                raise ValueError("Appointment already in queue")
-            
-            # Get next queue number for the day
-            today = date.today()
-            result = await db.execute(
-                select(func.max(Queue.queue_number)).select_from(Queue).where(
-                    func.date(Queue.created_at) == today
-                )
+            # Common case: the appointment already has (or is given) a doctor, and
+            # one statement validates, numbers, estimates and inserts the entry
+            queue_entry = await QueueService._enqueue(
+                db, appointment_id, doctor_id, priority_override, require_doctor=True
             )
-            max_queue_number = result.scalar() or 0
-            next_queue_number = max_queue_number + 1
-            print(f"Next queue number: {next_queue_number}")
             
-            # If doctor_id is not provided, automatically assign an available doctor
-            assigned_doctor_id = doctor_id or appointment.doctor_id
-            if not assigned_doctor_id:
+            if queue_entry is None:
+                # Nothing inserted: find out why, and assign a doctor if that was it
+                appointment = await db.get(Appointment, appointment_id)
+                if not appointment:
+                    raise ValueError("Appointment not found")
+                if doctor_id or appointment.doctor_id:
+                    raise ValueError("Appointment already in queue")
+                
                 # Extract department preference from appointment reason if available
-                preferred_department = None
-                if appointment.reason and len(appointment.reason) > 0:
-                    # Simple logic to extract potential department from reason
-                    # In a real app, you might have a more sophisticated classification
-                    if "cardio" in appointment.reason.lower():
-                        preferred_department = "Cardiology"
-                    elif "ortho" in appointment.reason.lower():
-                        preferred_department = "Orthopedics"
-                    elif "pediatric" in appointment.reason.lower() or "child" in appointment.reason.lower():
-                        preferred_department = "Pediatrics"
-                    elif "emergency" in appointment.reason.lower() or "urgent" in appointment.reason.lower():
-                        preferred_department = "Emergency"
-                    # Add more department mappings as needed
+                preferred_department = _department_from_reason(appointment.reason)
                 
                 # Use the new robust doctor assignment method
                 assigned_doctor_id = await QueueService.assign_available_doctor(
@@ -98,168 +323,357 @@ class QueueService:
                     logger.info(f"Automatically assigned doctor with ID: {assigned_doctor_id} to appointment {appointment.id}")
                 else:
                     logger.warning("No available doctors found for appointment assignment")
+                
+                queue_entry = await QueueService._enqueue(
+                    db, appointment_id, assigned_doctor_id, priority_override, require_doctor=False
+                )
+                if queue_entry is None:
+                    raise ValueError("Appointment already in queue")
             
-            # Calculate priority score
-            priority_score = await QueueService._calculate_priority_score(
-                db, appointment, priority_override
-            )
-            print(f"Priority score: {priority_score}")
+            logger.debug("Queue entry created with ID: %s", queue_entry.id)
+            await db.commit()
+            await _invalidate_queue_caches()
             
-            # Create queue entry
-            estimated_wait_time = await QueueService._calculate_estimated_wait_time(
-                db, assigned_doctor_id
+            return queue_entry
+        except Exception as e:
+            logger.exception("Error in add_to_queue: %s", e)
+            await db.rollback()
+            raise
+    
+    @staticmethod
+    async def _enqueue(
+        db: AsyncSession,
+        appointment_id: UUID,
+        doctor_id: Optional[UUID],
+        priority_override: Optional[int],
+        require_doctor: bool
+    ) -> Optional[Queue]:
+        """
+        Insert the queue entry for an appointment in a single statement
+        
+        Returns the new entry with its details loaded, or None when the
+        appointment does not exist, is already queued, or has no doctor while
+        `require_doctor` is set. No queue number is used up in those cases.
+        """
+        assigned_doctor = func.coalesce(
+            literal(doctor_id, Queue.doctor_id.type), Appointment.doctor_id
+        )
+        if priority_override is not None:
+            priority_score = literal(priority_override, Queue.priority_score.type)
+        else:
+            priority_score = case(
+                {
+                    urgency: BASE_PRIORITY_SCORE + bonus
+                    for urgency, bonus in URGENCY_PRIORITY_BONUS.items()
+                },
+                value=Appointment.urgency,
+                else_=BASE_PRIORITY_SCORE
             )
-            print(f"Estimated wait time: {estimated_wait_time}")
-            
-            # Generate queue identifier
-            queue_identifier = QueueService.generate_queue_identifier()
-            print(f"Generated queue identifier: {queue_identifier}")
-            
-            # Prepare values for insert, handling the case where doctor_id might be None
-            queue_values = {
-                "appointment_id": appointment_id,
-                "patient_id": appointment.patient_id,
-                "queue_number": next_queue_number,
-                "queue_identifier": queue_identifier,
-                "priority_score": priority_score,
-                "status": QueueStatus.WAITING,
-                "estimated_wait_time": estimated_wait_time
-            }
-            
-            # Only add doctor_id if it's not None
-            if assigned_doctor_id:
-                queue_values["doctor_id"] = assigned_doctor_id
-            
-            print(f"Queue values: {queue_values}")
-            
-            stmt = insert(Queue).values(**queue_values).returning(Queue.id)
+        
+        eligible = (
+            select(
+                Appointment.id.label("appointment_id"),
+                Appointment.patient_id,
+                assigned_doctor.label("doctor_id"),
+                priority_score.label("priority_score")
+            )
+            .where(
+                and_(
+                    Appointment.id == appointment_id,
+                    ~select(Queue.id).where(Queue.appointment_id == appointment_id).exists()
+                )
+            )
+        )
+        if require_doctor:
+            eligible = eligible.where(assigned_doctor.isnot(None))
+        eligible = eligible.cte("eligible")
+        
+        # Next queue number for the day from the per-day counter row, taken only
+        # when there is something to insert; the row lock serializes concurrent
+        # inserters until this transaction commits
+        today = get_utc_today()
+        counter = (
+            pg_insert(QueueCounter)
+            .from_select(
+                [QueueCounter.day, QueueCounter.last_number],
+                select(literal(today, QueueCounter.day.type), literal(1)).where(
+                    select(eligible.c.appointment_id).exists()
+                )
+            )
+            .on_conflict_do_update(
+                index_elements=[QueueCounter.day],
+                set_={"last_number": QueueCounter.last_number + 1}
+            )
+            .returning(QueueCounter.last_number)
+            .cte("counter")
+        )
+        # Waiting entries ahead for the same doctor (all doctors when unassigned)
+        estimated_wait_time = (
+            select(func.count(Queue.id) * AVERAGE_CONSULTATION_MINUTES)
+            .where(
+                and_(
+                    Queue.status == QueueStatus.WAITING,
+                    _queued_on(today),
+                    or_(eligible.c.doctor_id.is_(None), Queue.doctor_id == eligible.c.doctor_id)
+                )
+            )
+            .scalar_subquery()
+        )
+        
+        # The unique constraint on appointment_id still rejects a concurrent
+        # duplicate atomically; ON CONFLICT turns that into "no row returned"
+        inserted = pg_insert(Queue).from_select(
+            [
+                Queue.id,
+                Queue.appointment_id,
+                Queue.patient_id,
+                Queue.doctor_id,
+                Queue.queue_number,
+                Queue.queue_identifier,
+                Queue.priority_score,
+                Queue.status,
+                Queue.estimated_wait_time,
+            ],
+            select(
+                literal(uuid.uuid4(), Queue.id.type),
+                eligible.c.appointment_id,
+                eligible.c.patient_id,
+                eligible.c.doctor_id,
+                counter.c.last_number,
+                literal(QueueService.generate_queue_identifier(), Queue.queue_identifier.type),
+                eligible.c.priority_score,
+                literal(QueueStatus.WAITING, Queue.status.type),
+                estimated_wait_time,
+            ).select_from(eligible).join(counter, true())
+        ).on_conflict_do_nothing(
+            index_elements=[Queue.appointment_id]
+        ).returning(*Queue.__table__.c).cte("inserted")
+        
+        # Select the inserted row joined to its appointment, patient and doctor,
+        # so the details come back with the insert instead of a re-fetch
+        inserted_queue = aliased(Queue, inserted)
+        result = await db.execute(
+            select(inserted_queue).options(*_queue_details(inserted_queue))
+        )
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def add_many_to_queue(
+        db: AsyncSession,
+        appointment_ids: List[UUID]
+    ) -> List[Queue]:
+        """
+        Add several appointments to the queue in one transaction
+        
+        Appointments that already have a doctor are numbered, estimated and
+        inserted by a single statement and committed once. Appointments without
+        a doctor go through add_to_queue so they get one assigned. Unknown or
+        already queued appointments are skipped.
+        """
+        try:
+            result = await db.execute(
+                select(Appointment, Queue.id)
+                .outerjoin(Queue, Queue.appointment_id == Appointment.id)
+                .where(Appointment.id.in_(set(appointment_ids)))
+            )
+            pending = [appointment for appointment, queue_id in result.all() if queue_id is None]
+            batch = [appointment for appointment in pending if appointment.doctor_id]
+            unassigned = [appointment for appointment in pending if not appointment.doctor_id]
             
-            try:
-                result = await db.execute(stmt)
-                queue_id = result.scalar_one()
-                print(f"Queue entry created with ID: {queue_id}")
-                await db.commit()
+            today = get_utc_today()
+            queue_ids = []
+            if batch:
+                new_entries = _typed_values(
+                    "new_entries",
+                    [
+                        column("id", Queue.id.type),
+                        column("appointment_id", Queue.appointment_id.type),
+                        column("queue_identifier", Queue.queue_identifier.type),
+                        column("priority_score", Queue.priority_score.type),
+                        column("position", Integer)
+                    ],
+                    [
+                        (
+                            uuid.uuid4(),
+                            appointment.id,
+                            QueueService.generate_queue_identifier(),
+                            QueueService._calculate_priority_score(appointment),
+                            position
+                        )
+                        for position, appointment in enumerate(batch, start=1)
+                    ]
+                )
                 
-                # Re-fetch the queue entry with relationships loaded
-                result = await db.execute(
-                    select(Queue)
-                    .options(
-                        selectinload(Queue.appointment).selectinload(Appointment.patient),
-                        selectinload(Queue.appointment).selectinload(Appointment.doctor).selectinload(Doctor.user)
+                # Reserve the whole block of queue numbers with one counter update
+                counter = (
+                    pg_insert(QueueCounter)
+                    .values(day=today, last_number=len(batch))
+                    .on_conflict_do_update(
+                        index_elements=[QueueCounter.day],
+                        set_={"last_number": QueueCounter.last_number + len(batch)}
+                    )
+                    .returning(QueueCounter.last_number)
+                    .cte("counter")
+                )
+                already_waiting = (
+                    select(func.count(Queue.id))
+                    .where(
+                        and_(
+                            Queue.doctor_id == Appointment.doctor_id,
+                            Queue.status == QueueStatus.WAITING,
+                            _queued_on(today)
+                        )
                     )
-                    .where(Queue.id == queue_id)
+                    .correlate(Appointment)
+                    .scalar_subquery()
                 )
-                queue_entry = result.scalar_one()
+                # Entries ahead of this one from the same batch also count toward its wait
+                ahead_in_batch = func.row_number().over(
+                    partition_by=Appointment.doctor_id,
+                    order_by=new_entries.c.position
+                ) - 1
+                
+                stmt = pg_insert(Queue).from_select(
+                    [
+                        Queue.id,
+                        Queue.appointment_id,
+                        Queue.patient_id,
+                        Queue.doctor_id,
+                        Queue.queue_number,
+                        Queue.queue_identifier,
+                        Queue.priority_score,
+                        Queue.status,
+                        Queue.estimated_wait_time,
+                    ],
+                    select(
+                        new_entries.c.id,
+                        new_entries.c.appointment_id,
+                        Appointment.patient_id,
+                        Appointment.doctor_id,
+                        counter.c.last_number - len(batch) + new_entries.c.position,
+                        new_entries.c.queue_identifier,
+                        new_entries.c.priority_score,
+                        cast(literal(QueueStatus.WAITING, Queue.status.type), Queue.status.type),
+                        (already_waiting + ahead_in_batch) * AVERAGE_CONSULTATION_MINUTES,
+                    )
+                    .select_from(new_entries)
+                    .join(Appointment, Appointment.id == new_entries.c.appointment_id)
+                    .join(counter, true())
+                ).on_conflict_do_nothing(
+                    index_elements=[Queue.appointment_id]
+                ).returning(Queue.id).add_cte(counter)
                 
-                return queue_entry
-            except Exception as insert_error:
-                print(f"Error during queue insert: {str(insert_error)}")
-                await db.rollback()
-                # Try a simplified insert as a fallback
-                simplified_values = {
-                    "appointment_id": appointment_id,
-                    "patient_id": appointment.patient_id,
-                    "queue_number": next_queue_number,
-                    "queue_identifier": queue_identifier,
-                    "priority_score": priority_score,
-                    "status": "waiting",
-                    "estimated_wait_time": estimated_wait_time
-                }
-                print(f"Trying simplified insert: {simplified_values}")
-                # Only return the ID, then fetch the model instance
-                stmt = insert(Queue).values(**simplified_values).returning(Queue.id)
                 result = await db.execute(stmt)
-                queue_id = result.scalar_one()
+                queue_ids = result.scalars().all()
                 await db.commit()
-                # Re-fetch the queue entry with relationships loaded
-                result = await db.execute(
-                    select(Queue)
-                    .options(
-                        selectinload(Queue.appointment).selectinload(Appointment.patient),
-                        selectinload(Queue.appointment).selectinload(Appointment.doctor).selectinload(Doctor.user)
-                    )
-                    .where(Queue.id == queue_id)
-                )
-                queue_entry = result.scalar_one()
-                return queue_entry
+            
+            # These need a doctor assigned first; add_to_queue does that and commits
+            for appointment in unassigned:
+                queue_entry = await QueueService.add_to_queue(db, appointment.id)
+                queue_ids.append(queue_entry.id)
+            
+            if not queue_ids:
+                return []
+            
+            result = await db.execute(
+                select(Queue)
+                .options(*_QUEUE_DETAILS_SELECTIN)
+                .where(Queue.id.in_(queue_ids))
+                .order_by(Queue.queue_number)
+            )
+            await _invalidate_queue_caches()
+            return result.scalars().all()
         except Exception as e:
-            print(f"Error in add_to_queue: {str(e)}")
+            logger.error(f"Error in add_many_to_queue: {str(e)}")
             await db.rollback()
             raise
     
     @staticmethod
-    async def _calculate_priority_score(
-        db: AsyncSession,
+    def _calculate_priority_score(
         appointment: Appointment,
         priority_override: Optional[int] = None
     ) -> int:
-        """Calculate priority score for queue ordering"""
+        """Calculate the time-invariant priority score for queue ordering"""
         if priority_override is not None:
             return priority_override
         
-        base_score = 100
-        
-        # Urgency level adjustment - higher weights for priority
-        if appointment.urgency == UrgencyLevel.EMERGENCY:
-            base_score += 3000  # Highest priority for emergencies
-        elif appointment.urgency == UrgencyLevel.HIGH:
-            base_score += 1000  # High priority
-        elif appointment.urgency == UrgencyLevel.NORMAL:
-            base_score += 0     # Default priority
-        elif appointment.urgency == UrgencyLevel.LOW:
-            base_score -= 200   # Lower priority
-        
-        # Time-based adjustment (waiting time) - FIFO component
-        # Use timezone-aware datetime to avoid timezone issues
-        now = get_timezone_aware_now()
-        time_diff = now - appointment.created_at
-        hours_waiting = time_diff.total_seconds() / 3600
-        
-        # Gradually increase priority based on wait time
-        # Weight waiting time more heavily for lower priority appointments
-        if appointment.urgency == UrgencyLevel.LOW:
-            wait_score = int(hours_waiting * 25)  # Give more weight to waiting time for low priority
-        elif appointment.urgency == UrgencyLevel.NORMAL:
-            wait_score = int(hours_waiting * 15)  # Standard weight
-        else:
-            wait_score = int(hours_waiting * 10)  # Less weight for already high priority cases
-            
-        base_score += wait_score
+        base_score = BASE_PRIORITY_SCORE + URGENCY_PRIORITY_BONUS.get(appointment.urgency, 0)
+        
+        # Waiting time is not added here: Queue.priority_key ages every entry by
+        # the same rate (see PRIORITY_AGING_SECONDS_PER_POINT), so the stored
+        # score stays valid without periodic updates
         
         return base_score
     
+    @staticmethod
+    def _estimated_wait_time_query(doctor_id: Optional[UUID] = None):
+        """SELECT of the estimated wait in minutes for a doctor, or all doctors"""
+        # Get current queue for doctor or all doctors
+        predicates = [Queue.status == QueueStatus.WAITING, _queued_on(get_utc_today())]
+        if doctor_id:
+            predicates.append(Queue.doctor_id == doctor_id)
+        
+        # Estimate 15 minutes per patient (configurable)
+        return select(func.count(Queue.id) * AVERAGE_CONSULTATION_MINUTES).where(and_(*predicates))
+    
     @staticmethod
     async def _calculate_estimated_wait_time(
         db: AsyncSession,
         doctor_id: Optional[UUID] = None
     ) -> int:
         """Calculate estimated wait time in minutes"""
-        # Get current queue for doctor or all doctors
-        query = select(Queue).where(
-            and_(
-                Queue.status == QueueStatus.WAITING,
-                func.date(Queue.created_at) == date.today()
-            )
-        )
+        result = await db.execute(QueueService._estimated_wait_time_query(doctor_id))
+        estimated_time = result.scalar() or 0
         
-        if doctor_id:
-            query = query.where(Queue.doctor_id == doctor_id)
-        
-        result = await db.execute(query.order_by(Queue.priority_score.desc()))
-        waiting_queue = result.scalars().all()
+        return estimated_time
+    
+    @staticmethod
+    async def _update_returning(db: AsyncSession, stmt, with_details: bool = False) -> Optional[Queue]:
+        """
+        Run a single-row UPDATE on Queue and return the updated entry
         
-        # Estimate 15 minutes per patient (configurable)
-        average_consultation_time = 15
-        estimated_time = len(waiting_queue) * average_consultation_time
+        With with_details the UPDATE runs as a CTE joined to the entry's
+        appointment, patient and doctor, so they load in the same statement.
+        """
+        if with_details:
+            updated = aliased(Queue, stmt.returning(*Queue.__table__.c).cte("updated"))
+            query = select(updated).options(*_queue_details(updated))
+        else:
+            query = select(Queue).from_statement(stmt.returning(Queue))
         
-        return estimated_time
+        result = await db.execute(query.execution_options(populate_existing=True))
+        return result.scalar_one_or_none()
     
     @staticmethod
-    async def get_queue_by_id(db: AsyncSession, queue_id: UUID) -> Optional[Queue]:
-        """Get queue entry by ID"""
+    async def _record_event(
+        db: AsyncSession,
+        queue_id: UUID,
+        event: str,
+        reason: Optional[str],
+        actor_id: Optional[UUID] = None
+    ) -> None:
+        """Append a transition to the entry's history (queue_events)"""
+        await db.execute(
+            insert(QueueEvent).values(
+                queue_id=queue_id, event=event, reason=reason, actor_id=actor_id
+            )
+        )
+    
+    @staticmethod
+    async def _get_current_status(db: AsyncSession, queue_id: UUID) -> QueueStatus:
+        """Look up an entry's status after a guarded update matched nothing"""
         result = await db.execute(
-            select(Queue).where(Queue.id == queue_id)
+            select(Queue.id, Queue.status).where(Queue.id == queue_id)
         )
+        row = result.first()
+        if not row:
+            raise ValueError("Queue entry not found")
+        return row.status
+    
+    @staticmethod
+    async def get_queue_by_id(db: AsyncSession, queue_id: UUID) -> Optional[Queue]:
+        """Get queue entry by ID"""
+        result = await db.execute(_SELECT_QUEUE_BY_ID, {"queue_id": queue_id})
         return result.scalar_one_or_none()
     
     @staticmethod
@@ -269,37 +683,25 @@ class QueueService:
     ) -> Optional[Queue]:
         """Get current queue status for a patient"""
         try:
-            logger.info(f"Getting patient queue status for patient: {patient_id}")
+            logger.debug("Getting patient queue status for patient: %s", patient_id)
             # First try to find by patient_id
-            result = await db.execute(
-                select(Queue).where(
-                    and_(
-                        Queue.patient_id == patient_id,
-                        Queue.status.in_([QueueStatus.WAITING, QueueStatus.SERVING]),
-                        func.date(Queue.created_at) == date.today()
-                    )
-                )
-            )
+            params = {"patient_id": patient_id, "queue_date": get_utc_today()}
+            result = await db.execute(_SELECT_ACTIVE_BY_PATIENT, params)
             queue_entry = result.scalars().first()
             
             # If not found by patient_id, try to find by appointment_id
             if not queue_entry:
-                logger.info(f"No queue entry found by patient_id {patient_id}, trying by appointment_id")
-                result = await db.execute(
-                    select(Queue).join(Appointment).where(
-                        and_(
-                            Appointment.patient_id == patient_id,
-                            Queue.status.in_([QueueStatus.WAITING, QueueStatus.SERVING]),
-                            func.date(Queue.created_at) == date.today()
-                        )
-                    )
-                )
+                logger.debug("No queue entry found by patient_id %s, trying by appointment_id", patient_id)
+                result = await db.execute(_SELECT_ACTIVE_BY_APPOINTMENT_PATIENT, params)
                 queue_entry = result.scalars().first()
-            logger.info(f"Patient queue entry found: {queue_entry is not None}")
+            logger.debug("Patient queue entry found: %s", queue_entry is not None)
             if queue_entry:
-                logger.info(f"Queue entry details: id={queue_entry.id}, status={queue_entry.status}, queue_number={queue_entry.queue_number}, queue_identifier={queue_entry.queue_identifier}")
+                logger.debug(
+                    "Queue entry details: id=%s, status=%s, queue_number=%s, queue_identifier=%s",
+                    queue_entry.id, queue_entry.status, queue_entry.queue_number, queue_entry.queue_identifier
+                )
             else:
-                logger.warning(f"No queue entry found for patient {patient_id}")
+                logger.debug("No active queue entry for patient %s", patient_id)
             return queue_entry
         except Exception as e:
             logger.error(f"Error in get_patient_queue_status for patient {patient_id}: {str(e)}", exc_info=True)
@@ -311,95 +713,108 @@ class QueueService:
         patient_id: UUID
     ) -> Optional[Dict[str, Any]]:
         """Get current queue status for a patient and return in QueueStatusResponse format"""
+        return await _patient_status_cache.get_or_load(
+            str(patient_id),
+            lambda: QueueService._compute_queue_status(db, patient_id)
+        )
+    
+    @staticmethod
+    async def get_live_queue_status(
+        db: AsyncSession,
+        patient_id: UUID
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build the patient's queue status from the database, bypassing the cache
+        
+        Used for pushes right after a queue change, when the cached status may
+        not have been invalidated yet. Sends no position notifications.
+        """
+        return await QueueService._compute_queue_status(db, patient_id, notify=False)
+    
+    @staticmethod
+    async def _compute_queue_status(
+        db: AsyncSession,
+        patient_id: UUID,
+        notify: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build the patient's queue status from the database
+        
+        Position notifications are sent from here (unless notify is False), so
+        a cached status does not notify the patient again on every poll.
+        """
         try:
-            logger.info(f"Getting queue status for patient: {patient_id}")
+            logger.debug("Getting queue status for patient: %s", patient_id)
             
             queue_entry = await QueueService.get_patient_queue_status(db, patient_id)
-            logger.info(f"Queue entry found: {queue_entry is not None}")
+            logger.debug("Queue entry found: %s", queue_entry is not None)
             
             if not queue_entry:
-                logger.info(f"No queue entry found for patient: {patient_id}")
+                logger.debug("No queue entry found for patient: %s", patient_id)
                 return None
                 
-            logger.info(f"Queue entry details: id={queue_entry.id}, status={queue_entry.status}, queue_number={queue_entry.queue_number}")
-            
-            # Get position in queue
-            logger.info("Calculating queue position...")
-            result = await db.execute(
-                select(func.count(Queue.id)).where(
-                    and_(
-                        Queue.status == QueueStatus.WAITING,
-                        or_(
-                            Queue.priority_score > queue_entry.priority_score,
-                            and_(
-                                Queue.priority_score == queue_entry.priority_score,
-                                Queue.queue_number < queue_entry.queue_number
-                            )
-                        ),
-                        func.date(Queue.created_at) == func.date(queue_entry.created_at)
-                    )
-                )
+            logger.debug(
+                "Queue entry details: id=%s, status=%s, queue_number=%s",
+                queue_entry.id, queue_entry.status, queue_entry.queue_number
             )
-            queue_position = result.scalar() or 0
-            queue_position += 1  # Add one for current position
-            logger.info(f"Queue position calculated: {queue_position}")
             
-            # Get total in queue
-            logger.info("Calculating total in queue...")
-            result = await db.execute(
-                select(func.count(Queue.id)).where(
-                    and_(
-                        Queue.status == QueueStatus.WAITING,
-                        func.date(Queue.created_at) == func.date(queue_entry.created_at)
-                    )
+            # Position, queue length and the number being served in one round trip
+            same_day = Queue.queue_date == queue_entry.queue_date
+            waiting = Queue.status == QueueStatus.WAITING
+            ahead = or_(
+                Queue.priority_key > queue_entry.priority_key,
+                and_(
+                    Queue.priority_key == queue_entry.priority_key,
+                    Queue.id < queue_entry.id
                 )
             )
-            total_in_queue = result.scalar() or 0
-            logger.info(f"Total in queue: {total_in_queue}")
-            
-            # Get current serving number
-            logger.info("Getting current serving number...")
+            current_serving_query = (
+                select(Queue.queue_number)
+                .where(and_(Queue.status == QueueStatus.SERVING, same_day))
+                .order_by(Queue.served_at.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
             result = await db.execute(
-                select(Queue.queue_number).where(
-                    and_(
-                        Queue.status == QueueStatus.SERVING,
-                        func.date(Queue.created_at) == func.date(queue_entry.created_at)
-                    )
-                ).order_by(Queue.served_at.desc()).limit(1)
+                select(
+                    func.count(Queue.id).filter(ahead).label("ahead"),
+                    func.count(Queue.id).label("total_in_queue"),
+                    current_serving_query.label("current_serving")
+                ).where(and_(waiting, same_day))
+            )
+            counts = result.one()
+            queue_position = (counts.ahead or 0) + 1  # Add one for current position
+            total_in_queue = counts.total_in_queue or 0
+            current_serving = counts.current_serving
+            logger.debug(
+                "Queue position: %s, total in queue: %s, current serving: %s",
+                queue_position, total_in_queue, current_serving
             )
-            current_serving = result.scalar()
-            logger.info(f"Current serving: {current_serving}")
             
-            # Get doctor information for the appointment
+            # Doctor information was loaded with the queue entry
             doctor_name = None
-            if queue_entry.appointment_id:
-                result = await db.execute(
-                    select(Appointment).options(
-                        selectinload(Appointment.doctor).selectinload(Doctor.user)
-                    ).where(Appointment.id == queue_entry.appointment_id)
-                )
-                appointment = result.scalar_one_or_none()
-                if appointment and appointment.doctor and appointment.doctor.user:
-                    doctor_name = f"{appointment.doctor.user.first_name} {appointment.doctor.user.last_name}"
+            appointment = queue_entry.appointment
+            if appointment and appointment.doctor and appointment.doctor.user:
+                doctor_name = f"{appointment.doctor.user.first_name} {appointment.doctor.user.last_name}"
             
             # Send position-based notifications
-            await QueueService._send_position_notifications(db, patient_id, queue_position, doctor_name)
+            if notify:
+                await QueueService._send_position_notifications(db, patient_id, queue_position, doctor_name)
             
-            # Format as QueueStatusResponse
+            # Format as QueueStatusResponse; ids as strings so the dict caches as JSON
             response = {
-                "queue_id": queue_entry.id,
+                "queue_id": str(queue_entry.id),
                 "queue_position": queue_position,
                 "your_number": queue_entry.queue_number,
                 "queue_identifier": queue_entry.queue_identifier,
                 "estimated_wait_time": queue_entry.estimated_wait_time,
                 "status": queue_entry.status,
-                "appointment_id": queue_entry.appointment_id,
+                "appointment_id": str(queue_entry.appointment_id),
                 "total_in_queue": total_in_queue,
                 "current_serving": current_serving,
                 "doctor_name": doctor_name
             }
-            logger.info(f"Queue status response: {response}")
-            logger.info(f"Queue entry details - queue_number: {queue_entry.queue_number}, queue_identifier: {queue_entry.queue_identifier}")
+            logger.debug("Queue status response: %s", response)
             return response
             
         except Exception as e:
@@ -471,7 +886,7 @@ class QueueService:
             )
             
             # Use the notification service to create and send the notification
-            notification_service = NotificationService()
+            notification_service = get_notification_service()
             notification = await notification_service.create_notification(db, notification_data)
             
             # Try to send push notification if device token exists
@@ -508,23 +923,24 @@ class QueueService:
         doctor_id: UUID,
         queue_date: Optional[date] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[QueueCursor] = None
     ) -> List[Queue]:
-        """Get queue for a specific doctor"""
-        target_date = queue_date or date.today()
+        """
+        Get queue for a specific doctor
         
-        result = await db.execute(
-            select(Queue).where(
-                and_(
-                    Queue.doctor_id == doctor_id,
-                    func.date(Queue.created_at) == target_date,
-                    Queue.status.in_([QueueStatus.WAITING, QueueStatus.SERVING])
-                )
-            )
-            .order_by(Queue.priority_score.desc(), Queue.created_at.asc())
-            .offset(skip)
-            .limit(limit)
-        )
+        Pass `after=queue_cursor(last_entry)` to page with a keyset cursor;
+        `skip` is deprecated and only applied when no cursor is given.
+        """
+        if skip and after is None:
+            _warn_offset_paging()
+        target_date = queue_date or get_utc_today()
+        params = {"doctor_id": doctor_id, "limit": limit, "queue_date": target_date}
+        
+        if after is not None:
+            result = await db.execute(_SELECT_DOCTOR_QUEUE_AFTER, {**params, **_cursor_params(after)})
+        else:
+            result = await db.execute(_SELECT_DOCTOR_QUEUE_PAGE, {**params, "skip": skip})
         return result.scalars().all()
     
     @staticmethod
@@ -533,22 +949,132 @@ class QueueService:
         queue_date: Optional[date] = None,
         status: Optional[QueueStatus] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[QueueCursor] = None
     ) -> List[Queue]:
-        """Get all queue entries"""
-        target_date = queue_date or date.today()
+        """
+        Get all queue entries
+        
+        Pass `after=queue_cursor(last_entry)` to page with a keyset cursor;
+        `skip` is deprecated and only applied when no cursor is given.
+        """
+        if skip and after is None:
+            _warn_offset_paging()
+        query = QueueService._all_queue_query(queue_date, status).limit(limit)
+        if after is not None:
+            result = await db.execute(query.where(_AFTER_CURSOR), _cursor_params(after))
+        else:
+            result = await db.execute(query.offset(skip))
+        return result.scalars().all()
+    
+    @staticmethod
+    async def get_queue_board(db: AsyncSession) -> List[Dict[str, Any]]:
+        """
+        Get today's queue with appointment and patient details, in call order
+        
+        Served from a short-lived cache shared by all pollers; any queue change
+        made through this service drops it.
+        """
+        today = get_utc_today()
+        return await _queue_board_cache.get_or_load(
+            today.isoformat(),
+            lambda: QueueService._compute_queue_board(db, today)
+        )
+    
+    @staticmethod
+    async def _compute_queue_board(db: AsyncSession, day: date) -> List[Dict[str, Any]]:
+        """Build the queue board for a day as JSON-ready dicts"""
+        # Get all queue entries for the day with relationships
+        result = await db.execute(
+            select(Queue, Appointment, Patient)
+            .join(Appointment, Queue.appointment_id == Appointment.id)
+            .join(Patient, Appointment.patient_id == Patient.id)
+            .where(_queued_on(day))
+            .order_by(*_QUEUE_ORDER)
+        )
+        
+        queue_entries = []
+        all_results = result.all()
+        
+        for queue, appointment, patient in all_results:
+            # Manually construct the queue entry with relationships
+            queue_entry = {
+                "id": str(queue.id),
+                "appointment_id": str(queue.appointment_id),
+                "queue_number": queue.queue_number,
+                "priority_score": queue.priority_score,
+                "status": queue.status.value if hasattr(queue.status, 'value') else str(queue.status),
+                "estimated_wait_time": queue.estimated_wait_time,
+                "called_at": queue.called_at.isoformat() if queue.called_at else None,
+                "served_at": queue.served_at.isoformat() if queue.served_at else None,
+                "created_at": queue.created_at.isoformat() if queue.created_at else None,
+                "updated_at": queue.updated_at.isoformat() if queue.updated_at else None,
+                "appointment": {
+                    "id": str(appointment.id),
+                    "patient_id": str(appointment.patient_id),
+                    "doctor_id": str(appointment.doctor_id) if appointment.doctor_id else None,
+                    "appointment_date": appointment.appointment_date.isoformat() if appointment.appointment_date else None,
+                    "urgency": appointment.urgency.value if hasattr(appointment.urgency, 'value') else str(appointment.urgency),
+                    "reason": appointment.reason,
+                    "status": appointment.status.value if hasattr(appointment.status, 'value') else str(appointment.status),
+                    "created_at": appointment.created_at.isoformat() if appointment.created_at else None,
+                    "updated_at": appointment.updated_at.isoformat() if appointment.updated_at else None,
+                    "patient": {
+                        "id": str(patient.id),
+                        "first_name": patient.first_name,
+                        "last_name": patient.last_name,
+                        "phone_number": patient.phone_number,
+                        "email": patient.email,
+                        "gender": patient.gender,
+                        "date_of_birth": patient.date_of_birth.isoformat() if patient.date_of_birth else None,
+                        "address": patient.address,
+                        "emergency_contact": patient.emergency_contact,
+                        "emergency_contact_name": patient.emergency_contact_name,
+                        "emergency_contact_relationship": patient.emergency_contact_relationship,
+                        "is_active": patient.is_active,
+                        "created_at": patient.created_at.isoformat() if patient.created_at else None,
+                        "updated_at": patient.updated_at.isoformat() if patient.updated_at else None
+                    }
+                }
+            }
+            queue_entries.append(queue_entry)
+        
+        return queue_entries
+    
+    @staticmethod
+    async def stream_all_queue(
+        db: AsyncSession,
+        queue_date: Optional[date] = None,
+        status: Optional[QueueStatus] = None
+    ) -> AsyncIterator[Queue]:
+        """
+        Yield a day's queue entries in queue order without buffering the result
         
-        query = select(Queue).where(func.date(Queue.created_at) == target_date)
+        Rows are fetched from a server-side cursor STREAM_BATCH_SIZE at a time,
+        so memory stays flat however long the list is.
+        """
+        result = await db.stream_scalars(
+            QueueService._all_queue_query(queue_date, status)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for entry in result:
+            yield entry
+    
+    @staticmethod
+    def _all_queue_query(queue_date: Optional[date], status: Optional[QueueStatus]):
+        """SELECT of a day's queue entries with details, in _QUEUE_ORDER"""
+        query = (
+            select(Queue)
+            .options(*_QUEUE_LISTING_DETAILS)
+            .where(_queued_on(queue_date or get_utc_today()))
+        )
         
         if status:
             query = query.where(Queue.status == status)
         else:
-            query = query.where(Queue.status.in_([QueueStatus.WAITING, QueueStatus.SERVING]))
+            query = query.where(Queue.status.in_(_ACTIVE_STATUSES))
         
-        query = query.order_by(Queue.priority_score.desc(), Queue.created_at.asc()).offset(skip).limit(limit)
-        
-        result = await db.execute(query)
-        return result.scalars().all()
+        return query.order_by(*_QUEUE_ORDER)
     
     @staticmethod
     async def update_queue_status(
@@ -559,30 +1085,23 @@ class QueueService:
     ) -> Queue:
         """Update queue status"""
         try:
-            result = await db.execute(
-                select(Queue).where(Queue.id == queue_id)
-            )
-            queue_entry = result.scalar_one_or_none()
-            
-            if not queue_entry:
-                raise ValueError("Queue entry not found")
-            
-            queue_entry.status = status
             # Note: Queue model doesn't have a notes field, so we skip setting it
-            
-            now = get_timezone_aware_now()
-            if status == QueueStatus.SERVING:
-                queue_entry.served_at = now
-            elif status == QueueStatus.COMPLETED:
+            # Timestamps come from the database's transaction clock
+            now = func.now()
+            changes = {"status": status, "updated_at": now}
+            if status in (QueueStatus.SERVING, QueueStatus.COMPLETED):
                 # Use served_at for completion time since completed_at doesn't exist
-                queue_entry.served_at = now
-            
-            queue_entry.updated_at = now
+                changes["served_at"] = now
             
             # Don't commit here - let the calling code handle the transaction
-            # await db.commit()
-            # await db.refresh(queue_entry)
+            queue_entry = await QueueService._update_returning(
+                db, update(Queue).where(Queue.id == queue_id).values(**changes)
+            )
             
+            if not queue_entry:
+                raise ValueError("Queue entry not found")
+            
+            _invalidate_queue_caches_on_commit(db)
             return queue_entry
             
         except Exception as e:
@@ -590,6 +1109,31 @@ class QueueService:
             logger.error(f"Error updating queue status for queue_id {queue_id}: {str(e)}")
             raise ValueError(f"Failed to update queue status: {str(e)}")
     
+    @staticmethod
+    async def update_queue_entry(
+        db: AsyncSession,
+        appointment_id: UUID,
+        changes: Dict[str, Any]
+    ) -> Optional[Queue]:
+        """
+        Apply field changes to an appointment's queue entry in one UPDATE
+        
+        Returns the updated entry with its details loaded, or None when the
+        appointment is not queued.
+        """
+        queue_entry = await QueueService._update_returning(
+            db,
+            update(Queue)
+            .where(Queue.appointment_id == appointment_id)
+            .values(**changes, updated_at=func.now()),
+            with_details=True
+        )
+        
+        # Don't commit here - let the calling code handle the transaction
+        if queue_entry:
+            _invalidate_queue_caches_on_commit(db)
+        return queue_entry
+    
     @staticmethod
     async def call_next_patient(
         db: AsyncSession,
@@ -597,33 +1141,64 @@ class QueueService:
     ) -> Optional[Queue]:
         """Call the next patient in queue for a doctor"""
         try:
-            # Get next patient in queue
-            result = await db.execute(
-                select(Queue).where(
-                    and_(
-                        Queue.doctor_id == doctor_id,
-                        Queue.status == QueueStatus.WAITING,
-                        func.date(Queue.created_at) == date.today()
+            # One clock for served_at/updated_at and one day for the whole call
+            now = func.now()
+            today = get_utc_today()
+            
+            # Claim the head of the in-memory heap; the guard re-checks it in the
+            # database, and a stale head is dropped before trying the next one
+            next_patient = None
+            while waiting_queue_heaps.ready:
+                candidate_id = waiting_queue_heaps.peek(doctor_id)
+                if candidate_id is None:
+                    break
+                next_patient = await QueueService._update_returning(
+                    db,
+                    update(Queue)
+                    .where(
+                        and_(
+                            Queue.id == candidate_id,
+                            Queue.doctor_id == doctor_id,
+                            Queue.status == QueueStatus.WAITING,
+                            _queued_on(today)
+                        )
                     )
+                    .values(status=QueueStatus.SERVING, served_at=now, updated_at=now),
+                    with_details=True
                 )
-                .order_by(Queue.priority_score.desc(), Queue.created_at.asc())
-                .limit(1)
-            )
-            next_patient = result.scalar_one_or_none()
+                if next_patient:
+                    break
+                waiting_queue_heaps.discard(candidate_id)
             
-            if not next_patient:
-                return None
-            
-            # Update status to in progress
-            now = get_timezone_aware_now()
-            next_patient.status = QueueStatus.SERVING
-            next_patient.served_at = now
-            next_patient.updated_at = now
+            if next_patient is None:
+                # Pick the next waiting patient and mark them as being served in one
+                # statement; SKIP LOCKED keeps concurrent callers from taking the same row
+                next_patient_id = (
+                    select(Queue.id)
+                    .where(
+                        and_(
+                            Queue.doctor_id == doctor_id,
+                            Queue.status == QueueStatus.WAITING,
+                            _queued_on(today)
+                        )
+                    )
+                    .order_by(*_QUEUE_ORDER)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                    .scalar_subquery()
+                )
+                
+                next_patient = await QueueService._update_returning(
+                    db,
+                    update(Queue)
+                    .where(Queue.id == next_patient_id)
+                    .values(status=QueueStatus.SERVING, served_at=now, updated_at=now),
+                    with_details=True
+                )
             
             # Don't commit here - let the calling code handle the transaction
-            # await db.commit()
-            # await db.refresh(next_patient)
-            
+            if next_patient:
+                _invalidate_queue_caches_on_commit(db)
             return next_patient
             
         except Exception as e:
@@ -635,30 +1210,33 @@ class QueueService:
     async def skip_patient(
         db: AsyncSession,
         queue_id: UUID,
-        reason: str = "Patient not available"
+        reason: str = "Patient not available",
+        actor_id: Optional[UUID] = None
     ) -> Queue:
         """Skip a patient in queue"""
         try:
-            result = await db.execute(
-                select(Queue).where(Queue.id == queue_id)
+            # Allow skipping patients who are waiting, called, or currently being served;
+            # the guard is part of the UPDATE so it cannot race with other writers
+            queue_entry = await QueueService._update_returning(
+                db,
+                update(Queue)
+                .where(
+                    and_(
+                        Queue.id == queue_id,
+                        Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED, QueueStatus.SERVING])
+                    )
+                )
+                .values(status=QueueStatus.NO_SHOW, updated_at=func.now())
             )
-            queue_entry = result.scalar_one_or_none()
             
             if not queue_entry:
-                raise ValueError("Queue entry not found")
-            
-            # Allow skipping patients who are waiting, called, or currently being served
-            if queue_entry.status not in [QueueStatus.WAITING, QueueStatus.CALLED, QueueStatus.SERVING]:
-                raise ValueError(f"Cannot skip patient with status: {queue_entry.status}")
+                current_status = await QueueService._get_current_status(db, queue_id)
+                raise ValueError(f"Cannot skip patient with status: {current_status}")
             
-            queue_entry.status = QueueStatus.NO_SHOW
-            # Note: Queue model doesn't have a notes field, so we skip setting it
-            queue_entry.updated_at = get_timezone_aware_now()
+            await QueueService._record_event(db, queue_id, "skipped", reason, actor_id)
             
             # Don't commit here - let the calling code handle the transaction
-            # await db.commit()
-            # await db.refresh(queue_entry)
-            
+            _invalidate_queue_caches_on_commit(db)
             return queue_entry
             
         except Exception as e:
@@ -673,31 +1251,50 @@ class QueueService:
     ) -> List[Queue]:
         """Manually reorder queue entries"""
         try:
-            updated_entries = []
+            # Later updates for the same entry win, as they did when applied one by one;
+            # UPDATE ... FROM would otherwise pick an arbitrary duplicate
+            new_scores = {
+                item['queue_id']: item['priority_score']
+                for item in queue_updates
+                if item.get('queue_id') and item.get('priority_score') is not None
+            }
+            if not new_scores:
+                return []
             
-            for update in queue_updates:
-                queue_id = update.get('queue_id')
-                new_priority = update.get('priority_score')
-                
-                if not queue_id or new_priority is None:
-                    continue
-                
-                result = await db.execute(
-                    select(Queue).where(Queue.id == queue_id)
+            # Apply every new priority in one UPDATE ... FROM (VALUES ...)
+            new_priorities = _typed_values(
+                "new_priorities",
+                [
+                    column("queue_id", Queue.id.type),
+                    column("priority_score", Queue.priority_score.type)
+                ],
+                list(new_scores.items())
+            )
+            
+            stmt = (
+                update(Queue)
+                .where(
+                    and_(
+                        Queue.id == new_priorities.c.queue_id,
+                        Queue.status == QueueStatus.WAITING
+                    )
                 )
-                queue_entry = result.scalar_one_or_none()
-                
-                if queue_entry and queue_entry.status == QueueStatus.WAITING:
-                    queue_entry.priority_score = new_priority
-                    queue_entry.updated_at = get_timezone_aware_now()
-                    updated_entries.append(queue_entry)
+                .values(
+                    priority_score=new_priorities.c.priority_score,
+                    updated_at=func.now()
+                )
+                .returning(Queue)
+            )
+            result = await db.execute(
+                select(Queue).from_statement(stmt).execution_options(populate_existing=True)
+            )
+            updated_entries = result.scalars().all()
             
-            # Don't commit here - let the calling code handle the transaction
-            # if updated_entries:
-            #     await db.commit()
-            #     for entry in updated_entries:
-            #         await db.refresh(entry)
+            # New priorities move positions, so cached statuses are stale
+            if updated_entries:
+                _invalidate_queue_caches_on_commit(db)
             
+            # Don't commit here - let the calling code handle the transaction
             return updated_entries
             
         except Exception as e:
@@ -712,37 +1309,88 @@ class QueueService:
         doctor_id: Optional[UUID] = None
     ) -> Dict[str, Any]:
         """Get queue statistics"""
-        target_date = queue_date or date.today()
-        
-        # Base query
-        base_query = select(Queue).where(func.date(Queue.created_at) == target_date)
+        target_date = queue_date or get_utc_today()
         
+        return await _statistics_cache.get_or_load(
+            f"{target_date.isoformat()}:{doctor_id or 'all'}",
+            lambda: QueueService._compute_queue_statistics(db, target_date, doctor_id)
+        )
+    
+    @staticmethod
+    async def _compute_queue_statistics(
+        db: AsyncSession,
+        target_date: date,
+        doctor_id: Optional[UUID]
+    ) -> Dict[str, Any]:
+        """Read one day's per-status counts and average wait from queue_daily_stats"""
+        predicates = [QueueDailyStats.day == target_date]
         if doctor_id:
-            base_query = base_query.where(Queue.doctor_id == doctor_id)
+            predicates.append(QueueDailyStats.doctor_id == doctor_id)
         
-        # Total patients
+        # Trigger-maintained counters: one row per doctor, summed for all doctors
         result = await db.execute(
-            select(func.count(Queue.id)).select_from(base_query.subquery())
+            select(
+                func.coalesce(func.sum(QueueDailyStats.total), 0),
+                func.coalesce(func.sum(QueueDailyStats.waiting), 0),
+                func.coalesce(func.sum(QueueDailyStats.serving), 0),
+                func.coalesce(func.sum(QueueDailyStats.completed), 0),
+                func.coalesce(func.sum(QueueDailyStats.no_show), 0),
+                func.coalesce(func.sum(QueueDailyStats.cancelled), 0),
+                func.sum(QueueDailyStats.wait_minutes_sum) / func.nullif(func.sum(QueueDailyStats.waits), 0),
+                func.count()
+            ).where(*predicates)
         )
-        total_patients = result.scalar() or 0
+        total_patients, waiting, serving, completed, no_show, cancelled, avg_wait, rows = result.one()
         
-        # Patients by status
-        result = await db.execute(
-            select(Queue.status, func.count(Queue.id))
-            .select_from(base_query.subquery())
-            .group_by(Queue.status)
-        )
-        status_counts = dict(result.all())
+        # No counter rows: either nothing was queued or the schema was built by
+        # create_all, which does not install the trigger that fills the table
+        if not rows:
+            return await QueueService._aggregate_queue_statistics(db, target_date, doctor_id)
+        
+        return {
+            'date': target_date.isoformat(),
+            'total_patients': int(total_patients),
+            'waiting': int(waiting),
+            'in_progress': int(serving),
+            'completed': int(completed),
+            'skipped': int(no_show),
+            'cancelled': int(cancelled),
+            'average_wait_time_minutes': round(float(avg_wait or 0), 2)
+        }
+    
+    @staticmethod
+    async def _aggregate_queue_statistics(
+        db: AsyncSession,
+        target_date: date,
+        doctor_id: Optional[UUID]
+    ) -> Dict[str, Any]:
+        """Count one day's queue entries per status and average their wait"""
+        predicates = [_queued_on(target_date)]
+        if doctor_id:
+            predicates.append(Queue.doctor_id == doctor_id)
         
-        # Average wait time for completed patients
+        # Per-status counts plus the grand total and average wait in one scan;
+        # ROLLUP adds the overall row, flagged by grouping(status)
         result = await db.execute(
-            select(func.avg(
-                func.extract('epoch', Queue.served_at - Queue.created_at) / 60
-            )).select_from(
-                base_query.where(Queue.served_at.isnot(None)).subquery()
+            select(
+                Queue.status,
+                func.grouping(Queue.status),
+                func.count(Queue.id),
+                func.avg(Queue.wait_minutes)
             )
+            .where(*predicates)
+            .group_by(func.rollup(Queue.status))
         )
-        avg_wait_time = result.scalar() or 0
+        
+        status_counts = {}
+        total_patients = 0
+        avg_wait_time = 0
+        for status, status_grouped, count, avg_wait in result.all():
+            if status_grouped:
+                total_patients = count
+                avg_wait_time = float(avg_wait or 0)
+            else:
+                status_counts[status] = count
         
         return {
             'date': target_date.isoformat(),
@@ -759,29 +1407,34 @@ class QueueService:
     async def remove_from_queue(
         db: AsyncSession,
         queue_id: UUID,
-        reason: str = "Removed by staff"
+        reason: str = "Removed by staff",
+        actor_id: Optional[UUID] = None
     ) -> Queue:
         """Remove a patient from queue"""
         try:
-            result = await db.execute(
-                select(Queue).where(Queue.id == queue_id)
+            queue_entry = await QueueService._update_returning(
+                db,
+                update(Queue)
+                .where(
+                    and_(
+                        Queue.id == queue_id,
+                        or_(
+                            Queue.status.is_(None),
+                            Queue.status.notin_([QueueStatus.COMPLETED, QueueStatus.CANCELLED])
+                        )
+                    )
+                )
+                .values(status=QueueStatus.CANCELLED, updated_at=func.now())
             )
-            queue_entry = result.scalar_one_or_none()
             
             if not queue_entry:
-                raise ValueError("Queue entry not found")
+                current_status = await QueueService._get_current_status(db, queue_id)
+                raise ValueError(f"Cannot remove queue entry with status: {current_status}")
             
-            if queue_entry.status in [QueueStatus.COMPLETED, QueueStatus.CANCELLED]:
-                raise ValueError(f"Cannot remove queue entry with status: {queue_entry.status}")
-            
-            queue_entry.status = QueueStatus.CANCELLED
-            # Note: Queue model doesn't have a notes field, so we skip setting it
-            queue_entry.updated_at = get_timezone_aware_now()
+            await QueueService._record_event(db, queue_id, "removed", reason, actor_id)
             
             # Don't commit here - let the calling code handle the transaction
-            # await db.commit()
-            # await db.refresh(queue_entry)
-            
+            _invalidate_queue_caches_on_commit(db)
             return queue_entry
             
         except Exception as e:
@@ -795,21 +1448,23 @@ class QueueService:
         Find the doctor with the least number of patients in queue
         Returns the doctor's ID
         """
-        # Count the number of active queue entries for each doctor
+        # Count the number of active queue entries for each doctor; queue rows
+        # carry doctor_id, so no join to appointments is needed
         result = await db.execute(
             select(
-                Appointment.doctor_id,
+                Queue.doctor_id,
                 func.count(Queue.id).label("queue_count")
             )
-            .join(Queue, Queue.appointment_id == Appointment.id)
             .where(
                 and_(
                     Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED]),
-                    func.date(Queue.created_at) == func.current_date()
+                    _queued_on(get_utc_today()),
+                    Queue.doctor_id.isnot(None)
                 )
             )
-            .group_by(Appointment.doctor_id)
-            .order_by(asc("queue_count"))
+            .group_by(Queue.doctor_id)
+            .order_by(asc("queue_count"), asc(Queue.doctor_id))
+            .limit(1)
         )
         doctor_with_count = result.first()
         
@@ -839,31 +1494,40 @@ class QueueService:
         """
         try:
             # First, try to find a doctor with the least queue in the preferred department
-            if preferred_department:
-                result = await db.execute(
-                    select(
-                        Doctor.id,
-                        func.count(Queue.id).label("queue_count")
-                    )
-                    .join(User, Doctor.user_id == User.id)
-                    .outerjoin(
-                        Appointment, 
+            if preferred_department and waiting_queue_heaps.ready:
+                # The department roster is cached and the heaps already count
+                # each doctor's waiting patients, so no query is needed
+                doctor_ids = await DoctorService.get_available_doctor_ids(db, preferred_department)
+                if doctor_ids:
+                    waiting = waiting_queue_heaps.waiting_counts()
+                    doctor_id = min(doctor_ids, key=lambda d: (waiting.get(d, 0), d))
+                    logger.info(f"Assigned doctor {doctor_id} from preferred department {preferred_department}")
+                    return doctor_id
+            elif preferred_department:
+                # Today's open entries counted per candidate doctor through the
+                # queue index, instead of joining every historic appointment
+                queue_count = (
+                    select(func.count(Queue.id).label("queue_count"))
+                    .where(
                         and_(
-                            Doctor.id == Appointment.doctor_id,
-                            Appointment.id == Queue.appointment_id,
+                            Queue.doctor_id == Doctor.id,
                             Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED]),
-                            func.date(Queue.created_at) == func.current_date()
+                            _queued_on(get_utc_today())
                         )
                     )
-                    .outerjoin(Queue, Appointment.id == Queue.appointment_id)
+                    .lateral("doctor_queue")
+                )
+                result = await db.execute(
+                    select(Doctor.id, queue_count.c.queue_count)
+                    .outerjoin(queue_count, true())
                     .where(
                         and_(
                             Doctor.is_available == True,
                             Doctor.department.ilike(f"%{preferred_department}%")
                         )
                     )
-                    .group_by(Doctor.id)
-                    .order_by(asc("queue_count"), asc(Doctor.id))
+                    .order_by(asc(queue_count.c.queue_count), asc(Doctor.id))
+                    .limit(1)
                 )
                 doctor_with_count = result.first()
                 
@@ -894,47 +1558,153 @@ class QueueService:
         """
         Update queue positions after a patient is served or removed
         Optionally send notifications to waiting patients
+        
+        Each waiting entry's estimated_wait_time is rewritten from its position
+        in its doctor's queue by one set-based UPDATE; rows whose estimate is
+        unchanged are not written.
+        
+        Concurrent calls for the same queue would notify the same patients
+        twice, so each call takes a transaction-level advisory lock and a call
+        that cannot get it returns 0; the call holding it re-ranks the queue.
+        A call for one doctor only excludes calls for that doctor or for all
+        doctors. Notifications are skipped when the patients to notify and
+        their positions are the same as in the last update sent for the queue.
+        
+        Returns:
+            int: Number of entries whose estimate changed
         """
-        # Build the base query for waiting patients
-        query = (
-            select(Queue)
+        # hashtext gives every worker the same lock keys; per-doctor calls share
+        # the all-doctors key, which a call without doctor_id holds exclusively
+        all_doctors_key = func.hashtext("queue_positions")
+        if doctor_id:
+            lock = and_(
+                func.pg_try_advisory_xact_lock_shared(all_doctors_key),
+                func.pg_try_advisory_xact_lock(func.hashtext(f"queue_positions:{doctor_id}"))
+            )
+        else:
+            lock = func.pg_try_advisory_xact_lock(all_doctors_key)
+        # Tried inside a savepoint: rolling it back releases a lock taken by
+        # half of a failed attempt without touching the caller's transaction
+        savepoint = await db.begin_nested()
+        if not await db.scalar(select(lock)):
+            await savepoint.rollback()
+            return 0
+        await savepoint.commit()
+        
+        # Position of every waiting entry today within its doctor's queue; the
+        # appointment's patient comes back with it, so notifying needs no
+        # further lookups
+        ranked = (
+            select(
+                Queue.id,
+                Appointment.patient_id,
+                func.row_number().over(
+                    partition_by=Queue.doctor_id,
+                    order_by=_QUEUE_ORDER
+                ).label("position")
+            )
             .join(Appointment, Queue.appointment_id == Appointment.id)
-            .where(Queue.status == QueueStatus.WAITING)
-            .order_by(desc(Queue.priority_score), asc(Queue.queue_number))
+            .where(
+                Queue.status == QueueStatus.WAITING,
+                _queued_on(get_utc_today())
+            )
         )
         
         # Filter by doctor if specified
         if doctor_id:
-            query = query.where(Appointment.doctor_id == doctor_id)
+            ranked = ranked.where(Appointment.doctor_id == doctor_id)
+        ranked = ranked.cte("ranked")
+        
+        # Estimated wait time (5-10 min per position)
+        estimated_wait = ranked.c.position * 8
+        updated = (
+            update(Queue)
+            .values(estimated_wait_time=estimated_wait)
+            .where(
+                Queue.id == ranked.c.id,
+                Queue.estimated_wait_time.is_distinct_from(estimated_wait)
+            )
+            .returning(Queue.id)
+            .cte("updated")
+        )
+        
+        # Only notify the next few patients in each queue
+        result = await db.execute(
+            select(
+                ranked.c.patient_id,
+                ranked.c.position,
+                select(func.count()).select_from(updated).scalar_subquery()
+            )
+            .where(ranked.c.position <= 3)
+            .order_by(ranked.c.position)
+        )
+        rows = result.all()
+        await db.commit()
+        
+        if notification_service and rows:
+            updates = [(patient_id, position, position * 8) for patient_id, position, _ in rows]
+            digest = _position_digest(updates)
+            if await _swap_position_digest(str(doctor_id or "all"), digest) != digest:
+                await notification_service.send_queue_position_updates(db, updates)
+        
+        return rows[0][2] if rows else 0
+    
+    @staticmethod
+    async def broadcast_queue_message(
+        db: AsyncSession,
+        message: str,
+        doctor_id: Optional[UUID] = None,
+        subject: str = "Queue Update",
+        notification_service: Optional[NotificationService] = None
+    ) -> int:
+        """
+        Send the same SMS to every patient waiting in today's queue
+        Uses a single multi-recipient SMS call instead of one request per patient
+        Returns the number of patients notified
+        """
+        from schemas import NotificationCreate
+        from models import NotificationType
+        
+        query = (
+            select(Patient.id, Patient.phone_number)
+            .join(Queue, Queue.patient_id == Patient.id)
+            .where(
+                and_(
+                    Queue.status == QueueStatus.WAITING,
+                    _queued_on(get_utc_today())
+                )
+            )
+        )
+        if doctor_id:
+            query = query.where(Queue.doctor_id == doctor_id)
         
-        # Get all waiting queue entries
         result = await db.execute(query)
-        queue_entries = result.scalars().all()
-        
-        # Update positions and send notifications if service provided
-        for position, entry in enumerate(queue_entries, 1):
-            # Estimated wait time (5-10 min per position)
-            estimated_wait = position * 8  # minutes
-            
-            if notification_service and position <= 3:
-                # Only notify the next few patients
-                try:
-                    # Get patient ID from appointment
-                    appointment_result = await db.execute(
-                        select(Appointment)
-                        .where(Appointment.id == entry.appointment_id)
-                    )
-                    appointment = appointment_result.scalar_one_or_none()
-                    
-                    if appointment:
-                        # Send queue position update notification
-                        await notification_service.send_queue_position_update(
-                            db=db,
-                            patient_id=appointment.patient_id,
-                            queue_position=position,
-                            estimated_wait_time=estimated_wait
-                        )
-                except Exception as e:
-                    logger.error(f"Failed to send queue position update: {str(e)}")
+        recipients = result.all()
+        if not recipients:
+            return 0
+        
+        service = notification_service or get_notification_service()
+        
+        # Create all notification records in one INSERT
+        notification_ids = await service.create_notifications_bulk(
+            db,
+            [
+                NotificationCreate(
+                    type=NotificationType.SMS,
+                    recipient=phone_number,
+                    message=message,
+                    subject=subject,
+                    patient_id=patient_id
+                )
+                for patient_id, phone_number in recipients
+            ]
+        )
+        
+        await service.send_sms_bulk(
+            phone_numbers=[phone_number for _, phone_number in recipients],
+            message=message,
+            notification_ids=notification_ids,
+            db=db
+        )
         
-        return queue_entries
\ No newline at end of file
+        return len(recipients)
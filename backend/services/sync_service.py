@@ -1,22 +1,139 @@
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, update, bindparam, and_, func, null, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import base64
 import json
 import logging
-from models import Patient, Appointment, Queue, User, Doctor
+import uuid
+import ciso8601
+from models import Patient, Appointment, Queue, User, Doctor, AppointmentStatus, QueueStatus
+from api.core.security import get_password_hash
 from schemas import (
     PatientCreate, PatientUpdate, 
     AppointmentCreate, AppointmentUpdate,
     QueueUpdate
 )
-from services.auth_service import AuthService
 from services.appointment_service import AppointmentService
 from services.queue_service import QueueService
+from utils.cache import SharedTTLCache
+from utils.datetime_utils import get_utc_today, make_timezone_aware
 
 logger = logging.getLogger(__name__)
 
+# Online clients poll their sync status; the counts may lag by a few seconds
+SYNC_STATUS_CACHE_TTL_SECONDS = 10
+_sync_status_cache = SharedTTLCache("sync_status", ttl=SYNC_STATUS_CACHE_TTL_SECONDS)
+
+
+def _as_uuid(value: Any) -> Optional[UUID]:
+    try:
+        return UUID(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+# Most values bound into one IN (...) lookup; large offline batches are
+# looked up in several statements of this size
+SYNC_LOOKUP_CHUNK_SIZE = 500
+
+
+async def _load_keyed_by(db: AsyncSession, column: Any, values: Iterable[Any]) -> Dict[Any, Any]:
+    """
+    Load the rows of column's model whose column value is in values.
+    
+    Returns:
+        Dict[Any, Any]: Loaded objects keyed by their value of column
+    """
+    values = list(values)
+    loaded = {}
+    for start in range(0, len(values), SYNC_LOOKUP_CHUNK_SIZE):
+        result = await db.execute(
+            select(column.class_).where(column.in_(values[start:start + SYNC_LOOKUP_CHUNK_SIZE]))
+        )
+        for row in result.scalars():
+            loaded[getattr(row, column.key)] = row
+    return loaded
+
+
+# Patient columns a sync may overwrite on an existing patient
+_PATIENT_SYNC_COLUMNS = tuple(PatientUpdate.model_fields)
+
+# Of those, the ones the patients table does not allow to be NULL
+_PATIENT_REQUIRED_COLUMNS = frozenset(
+    column for column in _PATIENT_SYNC_COLUMNS
+    if not Patient.__table__.c[column].nullable
+)
+
+
+def _changed_at(model: Any) -> Any:
+    """Last change time of a row (indexed as an expression on each synced table)"""
+    return func.coalesce(model.updated_at, model.created_at)
+
+
+# Client records without a timestamp compare as older than any server change
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_timestamp(value: Optional[str]) -> datetime:
+    """
+    Parse an ISO 8601 timestamp from a sync payload (ciso8601 is a C parser)
+    
+    Timestamps without an offset are taken as UTC, so the result always
+    compares with the timezone-aware columns.
+    """
+    return make_timezone_aware(ciso8601.parse_datetime(value)) if value else _EPOCH
+
+
+def _is_stale(client_data: Dict[str, Any], server_row: Any) -> bool:
+    """
+    Whether the server row was changed after the copy the client edited.
+    
+    Clients send back the version they last received; clients that only send
+    updated_at fall back to comparing timestamps, which clock skew can fool.
+    """
+    client_version = client_data.get('version')
+    if client_version is not None:
+        return int(client_version) < server_row.version
+    client_updated = _parse_timestamp(client_data.get('updated_at'))
+    return client_updated < make_timezone_aware(server_row.updated_at or server_row.created_at)
+
+
+# Most rows of each table returned by one server-updates page
+SERVER_UPDATES_PAGE_SIZE = 500
+
+# Keyset position per table: change time and id of the last row already sent
+SyncCursor = Dict[str, Tuple[datetime, UUID]]
+
+
+def encode_sync_cursor(cursor: SyncCursor) -> str:
+    """Serialize a keyset position into the opaque token handed to clients"""
+    payload = {
+        table: [changed_at.isoformat(), str(row_id)]
+        for table, (changed_at, row_id) in cursor.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_sync_cursor(token: str) -> SyncCursor:
+    """
+    Parse a token produced by encode_sync_cursor.
+    
+    Raises:
+        ValueError: If the token is not a valid cursor
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return {
+            table: (ciso8601.parse_datetime(changed_at), UUID(row_id))
+            for table, (changed_at, row_id) in payload.items()
+        }
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ValueError("Invalid sync cursor") from e
+
+
 class SyncService:
     @staticmethod
     async def sync_offline_data(
@@ -92,20 +209,20 @@ class SyncService:
         """Sync patient data with conflict resolution"""
         results = {'processed': 0, 'errors': [], 'conflicts': []}
         
+        # Look up every patient the batch refers to in one query
+        phone_numbers = {patient_data.get('phone_number') for patient_data in patients_data}
+        existing_patients = await _load_keyed_by(db, Patient.phone_number, phone_numbers)
+        new_patients: Dict[str, PatientCreate] = {}
+        patient_updates: List[Dict[str, Any]] = []
+        
         for patient_data in patients_data:
             try:
                 # Check if patient exists by phone number
-                existing_patient = await db.execute(
-                    select(Patient).where(Patient.phone_number == patient_data['phone_number'])
-                )
-                existing_patient = existing_patient.scalar_one_or_none()
+                existing_patient = existing_patients.get(patient_data['phone_number'])
                 
                 if existing_patient:
-                    # Check for conflicts based on updated_at timestamp
-                    client_updated = datetime.fromisoformat(patient_data.get('updated_at', '1970-01-01'))
-                    server_updated = existing_patient.updated_at or existing_patient.created_at
-                    
-                    if client_updated < server_updated:
+                    # Check for conflicts based on the row version
+                    if _is_stale(patient_data, existing_patient):
                         results['conflicts'].append({
                             'type': 'patient',
                             'id': str(existing_patient.id),
@@ -115,21 +232,38 @@ class SyncService:
                                 'id': str(existing_patient.id),
                                 'phone_number': existing_patient.phone_number,
                                 'full_name': f"{existing_patient.first_name} {existing_patient.last_name}",
-                                'updated_at': existing_patient.updated_at.isoformat() if existing_patient.updated_at else None
+                                'updated_at': existing_patient.updated_at.isoformat() if existing_patient.updated_at else None,
+                                'version': existing_patient.version
                             }
                         })
                         continue
                     
-                    # Update existing patient (staff override)
-                    for key, value in patient_data.items():
-                        if hasattr(existing_patient, key) and key not in ['id', 'created_at']:
-                            setattr(existing_patient, key, value)
-                    existing_patient.updated_at = datetime.utcnow()
-                    existing_patient.updated_by = user_id
+                    # Update existing patient (staff override); fields the client
+                    # did not send keep their current value. Written together below
+                    changes = PatientUpdate.model_validate(patient_data).model_dump(exclude_unset=True)
+                    # An explicit null for a required column would fail the
+                    # whole batched UPDATE, so the row is rejected on its own
+                    nulled = sorted(
+                        column for column in _PATIENT_REQUIRED_COLUMNS
+                        if column in changes and changes[column] is None
+                    )
+                    if nulled:
+                        raise ValueError(f"Fields cannot be null: {', '.join(nulled)}")
+                    patient_updates.append({
+                        'patient_id': existing_patient.id,
+                        **{
+                            column: changes.get(column, getattr(existing_patient, column))
+                            for column in _PATIENT_SYNC_COLUMNS
+                        }
+                    })
+                    continue
                 else:
-                    # Create new patient
-                    patient_create = PatientCreate(**patient_data)
-                    new_patient = await AuthService.register_patient(db, patient_create)
+                    # New patients are validated now and inserted together below
+                    patient_create = PatientCreate.model_validate(patient_data)
+                    if patient_create.phone_number in new_patients:
+                        raise ValueError("Phone number already registered")
+                    new_patients[patient_create.phone_number] = patient_create
+                    continue
                 
                 results['processed'] += 1
                 
@@ -137,6 +271,54 @@ class SyncService:
                 logger.error(f"Error syncing patient {patient_data.get('phone_number')}: {str(e)}")
                 results['errors'].append(f"Patient sync error: {str(e)}")
         
+        if patient_updates:
+            try:
+                # One executemany UPDATE for every changed patient
+                patients = Patient.__table__
+                await db.execute(
+                    update(patients).where(patients.c.id == bindparam('patient_id')),
+                    patient_updates
+                )
+                results['processed'] += len(patient_updates)
+            except Exception as e:
+                logger.error(f"Error updating {len(patient_updates)} synced patients: {str(e)}")
+                results['errors'].append(f"Patient sync error: {str(e)}")
+        
+        if new_patients:
+            try:
+                # A patient registered concurrently under the same phone
+                # number gets the synced details, as existing patients do
+                insert_patients = pg_insert(Patient).values([
+                    {
+                        'phone_number': patient_create.phone_number,
+                        'password_hash': get_password_hash(patient_create.password),
+                        'first_name': patient_create.first_name,
+                        'last_name': patient_create.last_name,
+                        'email': patient_create.email,
+                        'date_of_birth': patient_create.date_of_birth,
+                        'gender': patient_create.gender,
+                        'address': patient_create.address,
+                        'emergency_contact': patient_create.emergency_contact
+                    }
+                    for patient_create in new_patients.values()
+                ])
+                await db.execute(
+                    insert_patients.on_conflict_do_update(
+                        index_elements=[Patient.phone_number],
+                        set_={
+                            column: insert_patients.excluded[column]
+                            for column in (
+                                'first_name', 'last_name', 'email', 'date_of_birth',
+                                'gender', 'address', 'emergency_contact'
+                            )
+                        } | {'updated_at': func.now()}
+                    )
+                )
+                results['processed'] += len(new_patients)
+            except Exception as e:
+                logger.error(f"Error registering {len(new_patients)} synced patients: {str(e)}")
+                results['errors'].append(f"Patient sync error: {str(e)}")
+        
         return results
 
     @staticmethod
@@ -148,45 +330,53 @@ class SyncService:
         """Sync appointment data with conflict resolution"""
         results = {'processed': 0, 'errors': [], 'conflicts': []}
         
+        # Load every appointment the batch refers to in one query
+        appointment_ids = {
+            appointment_id for appointment_id in (
+                _as_uuid(appointment_data.get('id')) for appointment_data in appointments_data
+            )
+            if appointment_id
+        }
+        existing_appointments = await _load_keyed_by(db, Appointment.id, appointment_ids)
+        new_appointments: List[Tuple[UUID, AppointmentCreate]] = []
+        
         for appointment_data in appointments_data:
             try:
                 appointment_id = appointment_data.get('id')
-                if appointment_id:
-                    # Update existing appointment
-                    existing_appointment = await db.get(Appointment, UUID(appointment_id))
-                    if existing_appointment:
-                        # Check for conflicts
-                        client_updated = datetime.fromisoformat(appointment_data.get('updated_at', '1970-01-01'))
-                        server_updated = existing_appointment.updated_at or existing_appointment.created_at
-                        
-                        if client_updated < server_updated:
-                            results['conflicts'].append({
-                                'type': 'appointment',
-                                'id': appointment_id,
-                                'reason': 'Server version is newer',
-                                'client_data': appointment_data,
-                                'server_data': {
-                                    'id': str(existing_appointment.id),
-                                    'status': existing_appointment.status,
-                                    'updated_at': existing_appointment.updated_at.isoformat() if existing_appointment.updated_at else None
-                                }
-                            })
-                            continue
-                        
-                        # Update appointment
-                        appointment_update = AppointmentUpdate(**{
-                            k: v for k, v in appointment_data.items() 
-                            if k not in ['id', 'created_at', 'patient_id']
+                existing_appointment = (
+                    existing_appointments.get(UUID(appointment_id)) if appointment_id else None
+                )
+                if existing_appointment:
+                    # Check for conflicts
+                    if _is_stale(appointment_data, existing_appointment):
+                        results['conflicts'].append({
+                            'type': 'appointment',
+                            'id': appointment_id,
+                            'reason': 'Server version is newer',
+                            'client_data': appointment_data,
+                            'server_data': {
+                                'id': str(existing_appointment.id),
+                                'status': existing_appointment.status,
+                                'updated_at': existing_appointment.updated_at.isoformat() if existing_appointment.updated_at else None,
+                                'version': existing_appointment.version
+                            }
                         })
-                        updated_appointment = await AppointmentService.update_appointment(
-                            db, UUID(appointment_id), appointment_update
-                        )
+                        continue
+                    
+                    # Update appointment; keys that are not AppointmentUpdate
+                    # fields (id, created_at, patient_id, ...) are ignored
+                    appointment_update = AppointmentUpdate.model_validate(appointment_data)
+                    updated_appointment = await AppointmentService.update_appointment(
+                        db, UUID(appointment_id), appointment_update
+                    )
                 else:
-                    # Create new appointment
-                    appointment_create = AppointmentCreate(**appointment_data)
-                    new_appointment = await AppointmentService.create_appointment(
-                        db, appointment_create, user_id
+                    # New appointments (keeping a client-assigned id) are
+                    # validated now and inserted together below
+                    appointment_create = AppointmentCreate.model_validate(appointment_data)
+                    new_appointments.append(
+                        (UUID(appointment_id) if appointment_id else uuid.uuid4(), appointment_create)
                     )
+                    continue
                 
                 results['processed'] += 1
                 
@@ -194,8 +384,92 @@ class SyncService:
                 logger.error(f"Error syncing appointment {appointment_data.get('id')}: {str(e)}")
                 results['errors'].append(f"Appointment sync error: {str(e)}")
         
+        if new_appointments:
+            try:
+                results['processed'] += await SyncService._insert_appointments(
+                    db, user_id, new_appointments, results['errors']
+                )
+            except Exception as e:
+                logger.error(f"Error creating {len(new_appointments)} synced appointments: {str(e)}")
+                results['errors'].append(f"Appointment sync error: {str(e)}")
+        
         return results
 
+    @staticmethod
+    async def _insert_appointments(
+        db: AsyncSession,
+        user_id: UUID,
+        new_appointments: List[Tuple[UUID, AppointmentCreate]],
+        errors: List[str]
+    ) -> int:
+        """
+        Insert synced appointments with one INSERT ... ON CONFLICT (id) DO NOTHING.
+        
+        Applies create_appointment's checks to the whole batch with one query
+        each; rejected appointments are reported in errors. Returns the number
+        of appointments inserted.
+        """
+        patient_ids = {appointment.patient_id for _, appointment in new_appointments}
+        doctor_ids = {appointment.doctor_id for _, appointment in new_appointments if appointment.doctor_id}
+        
+        known_patients = set((await db.execute(
+            select(Patient.id).where(Patient.id.in_(patient_ids))
+        )).scalars())
+        known_doctors = set()
+        if doctor_ids:
+            known_doctors = set((await db.execute(
+                select(Doctor.id).where(Doctor.id.in_(doctor_ids))
+            )).scalars())
+        
+        # Patients who already have an active appointment today
+        today = datetime.combine(get_utc_today(), datetime.min.time(), tzinfo=timezone.utc)
+        busy_patients = set((await db.execute(
+            select(Appointment.patient_id).where(
+                and_(
+                    Appointment.patient_id.in_(patient_ids),
+                    Appointment.created_at >= today,
+                    Appointment.created_at < today + timedelta(days=1),
+                    Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.IN_PROGRESS])
+                )
+            )
+        )).scalars())
+        
+        rows = []
+        for appointment_id, appointment in new_appointments:
+            if appointment.patient_id not in known_patients:
+                error = "Patient not found"
+            elif appointment.doctor_id and appointment.doctor_id not in known_doctors:
+                error = "Doctor not found"
+            elif appointment.patient_id in busy_patients:
+                error = "Patient already has an active appointment today"
+            else:
+                busy_patients.add(appointment.patient_id)
+                rows.append({
+                    "id": appointment_id,
+                    "patient_id": appointment.patient_id,
+                    "doctor_id": appointment.doctor_id,
+                    "appointment_date": appointment.appointment_date,
+                    "urgency": appointment.urgency,
+                    "reason": appointment.reason,
+                    "created_by": user_id,
+                    "status": AppointmentStatus.SCHEDULED
+                })
+                continue
+            logger.error(f"Error syncing appointment {appointment_id}: {error}")
+            errors.append(f"Appointment sync error: {error}")
+        
+        if not rows:
+            return 0
+        
+        # Appointments already on the server (a retried sync) are left alone
+        result = await db.execute(
+            pg_insert(Appointment)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Appointment.id])
+            .returning(Appointment.id)
+        )
+        return len(result.all())
+
     @staticmethod
     async def _sync_queue_updates(
         db: AsyncSession,
@@ -205,17 +479,26 @@ class SyncService:
         """Sync queue status updates"""
         results = {'processed': 0, 'errors': [], 'conflicts': []}
         
+        # Load every queue entry the batch refers to up front
+        existing_queues = await _load_keyed_by(
+            db,
+            Queue.id,
+            {
+                queue_id for queue_id in (
+                    _as_uuid(queue_data.get('id')) for queue_data in queue_updates_data
+                )
+                if queue_id
+            }
+        )
+        
         for queue_data in queue_updates_data:
             try:
                 queue_id = queue_data.get('id')
                 if queue_id:
-                    existing_queue = await db.get(Queue, UUID(queue_id))
+                    existing_queue = existing_queues.get(UUID(queue_id))
                     if existing_queue:
                         # Check for conflicts
-                        client_updated = datetime.fromisoformat(queue_data.get('updated_at', '1970-01-01'))
-                        server_updated = existing_queue.updated_at or existing_queue.created_at
-                        
-                        if client_updated < server_updated:
+                        if _is_stale(queue_data, existing_queue):
                             results['conflicts'].append({
                                 'type': 'queue',
                                 'id': queue_id,
@@ -224,17 +507,16 @@ class SyncService:
                                 'server_data': {
                                     'id': str(existing_queue.id),
                                     'status': existing_queue.status,
-                                    'priority': existing_queue.priority,
-                                    'updated_at': existing_queue.updated_at.isoformat() if existing_queue.updated_at else None
+                                    'priority': existing_queue.priority_score,
+                                    'updated_at': existing_queue.updated_at.isoformat() if existing_queue.updated_at else None,
+                                    'version': existing_queue.version
                                 }
                             })
                             continue
                         
-                        # Update queue
-                        queue_update = QueueUpdate(**{
-                            k: v for k, v in queue_data.items() 
-                            if k not in ['id', 'created_at', 'appointment_id']
-                        })
+                        # Update queue; keys that are not QueueUpdate fields
+                        # (id, created_at, appointment_id, ...) are ignored
+                        queue_update = QueueUpdate.model_validate(queue_data)
                         
                         # Check if status is provided, otherwise use a default
                         if queue_update.status is not None:
@@ -254,85 +536,91 @@ class SyncService:
     async def _get_server_updates(
         db: AsyncSession,
         user_id: UUID,
-        last_sync_timestamp: datetime
+        last_sync_timestamp: datetime,
+        cursor: Optional[SyncCursor] = None,
+        limit: int = SERVER_UPDATES_PAGE_SIZE
     ) -> Dict[str, Any]:
-        """Get server updates since last sync timestamp"""
+        """
+        Get server updates since last sync timestamp
+        
+        Each table returns at most limit rows, oldest change first. When any
+        table has more, 'next_cursor' holds a token to request the next page
+        with the same last_sync_timestamp; tables missing from a cursor have
+        nothing left to send.
+        """
         server_updates = {
             'patients': [],
             'appointments': [],
-            'queue': []
+            'queue': [],
+            'next_cursor': None
+        }
+        
+        # Rows are selected in their payload shape and returned as plain
+        # dicts of UUIDs, datetimes and enums, which the JSON response
+        # serializes natively; no per-field conversion happens here
+        queries = {
+            'patients': (Patient, select(
+                Patient.id,
+                Patient.phone_number,
+                (Patient.first_name + " " + Patient.last_name).label('full_name'),
+                Patient.date_of_birth,
+                Patient.gender,
+                Patient.address,
+                Patient.emergency_contact,
+                # Not stored on Patient
+                null().label('medical_history'),
+                Patient.created_at,
+                Patient.updated_at,
+                Patient.version
+            )),
+            'appointments': (Appointment, select(
+                Appointment.id,
+                Appointment.patient_id,
+                Appointment.doctor_id,
+                Appointment.appointment_date,
+                Appointment.reason,
+                Appointment.urgency.label('urgency_level'),
+                Appointment.status,
+                Appointment.notes,
+                Appointment.created_at,
+                Appointment.updated_at,
+                Appointment.version
+            )),
+            'queue': (Queue, select(
+                Queue.id,
+                Queue.appointment_id,
+                Queue.queue_number,
+                Queue.priority_score.label('priority'),
+                Queue.status,
+                Queue.estimated_wait_time,
+                Queue.created_at,
+                Queue.updated_at,
+                Queue.version
+            ))
         }
+        next_cursor: SyncCursor = {}
         
         try:
-            # Get updated patients
-            patients_query = select(Patient).where(
-                or_(
-                    Patient.updated_at > last_sync_timestamp,
-                    and_(Patient.updated_at.is_(None), Patient.created_at > last_sync_timestamp)
-                )
-            )
-            patients_result = await db.execute(patients_query)
-            patients = patients_result.scalars().all()
-            
-            for patient in patients:
-                server_updates['patients'].append({
-                    'id': str(patient.id),
-                    'phone_number': patient.phone_number,
-                    'full_name': f"{patient.first_name} {patient.last_name}",
-                    'date_of_birth': patient.date_of_birth.isoformat() if patient.date_of_birth else None,
-                    'gender': patient.gender,
-                    'address': patient.address,
-                    'emergency_contact': patient.emergency_contact,
-                    'medical_history': patient.medical_history,
-                    'created_at': patient.created_at.isoformat(),
-                    'updated_at': patient.updated_at.isoformat() if patient.updated_at else None
-                })
-
-            # Get updated appointments
-            appointments_query = select(Appointment).where(
-                or_(
-                    Appointment.updated_at > last_sync_timestamp,
-                    and_(Appointment.updated_at.is_(None), Appointment.created_at > last_sync_timestamp)
-                )
-            )
-            appointments_result = await db.execute(appointments_query)
-            appointments = appointments_result.scalars().all()
-            
-            for appointment in appointments:
-                server_updates['appointments'].append({
-                    'id': str(appointment.id),
-                    'patient_id': str(appointment.patient_id),
-                    'doctor_id': str(appointment.doctor_id) if appointment.doctor_id else None,
-                    'appointment_date': appointment.appointment_date.isoformat(),
-                    'reason': appointment.reason,
-                    'urgency_level': appointment.urgency_level,
-                    'status': appointment.status,
-                    'notes': appointment.notes,
-                    'created_at': appointment.created_at.isoformat(),
-                    'updated_at': appointment.updated_at.isoformat() if appointment.updated_at else None
-                })
-
-            # Get updated queue items
-            queue_query = select(Queue).where(
-                or_(
-                    Queue.updated_at > last_sync_timestamp,
-                    and_(Queue.updated_at.is_(None), Queue.created_at > last_sync_timestamp)
-                )
-            )
-            queue_result = await db.execute(queue_query)
-            queue_items = queue_result.scalars().all()
+            for table, (model, query) in queries.items():
+                if cursor is not None and table not in cursor:
+                    continue
+                
+                # Walks the (changed_at, id) expression index in order
+                changed_at = _changed_at(model)
+                query = query.where(changed_at > last_sync_timestamp)
+                if cursor is not None:
+                    query = query.where(tuple_(changed_at, model.id) > tuple_(*cursor[table]))
+                result = await db.execute(query.order_by(changed_at, model.id).limit(limit))
+                rows = [dict(row) for row in result.mappings()]
+                server_updates[table] = rows
+                
+                # A full page may have more rows behind it
+                if len(rows) == limit:
+                    last = rows[-1]
+                    next_cursor[table] = (last['updated_at'] or last['created_at'], last['id'])
             
-            for queue_item in queue_items:
-                server_updates['queue'].append({
-                    'id': str(queue_item.id),
-                    'appointment_id': str(queue_item.appointment_id),
-                    'queue_number': queue_item.queue_number,
-                    'priority': queue_item.priority,
-                    'status': queue_item.status,
-                    'estimated_wait_time': queue_item.estimated_wait_time,
-                    'created_at': queue_item.created_at.isoformat(),
-                    'updated_at': queue_item.updated_at.isoformat() if queue_item.updated_at else None
-                })
+            if next_cursor:
+                server_updates['next_cursor'] = encode_sync_cursor(next_cursor)
                 
         except Exception as e:
             logger.error(f"Error getting server updates: {str(e)}")
@@ -342,30 +630,41 @@ class SyncService:
     @staticmethod
     async def get_sync_status(
         db: AsyncSession,
-        user_id: UUID
+        user_id: UUID,
+        force_refresh: bool = False
     ) -> Dict[str, Any]:
-        """Get current sync status for a user"""
-        try:
-            # Get counts of pending items
-            pending_appointments = await db.execute(
-                select(func.count(Appointment.id)).where(
-                    and_(
-                        Appointment.created_by == user_id,
-                        Appointment.status.in_(['pending', 'confirmed'])
-                    )
-                )
-            )
-            
-            pending_queue = await db.execute(
-                select(func.count(Queue.id)).where(
-                    Queue.status.in_(['waiting', 'in_progress'])
+        """
+        Get current sync status for a user
+        
+        The pending counts are cached briefly per user; force_refresh reads
+        them from the database and refreshes the cached copy.
+        """
+        async def load_counts() -> Dict[str, int]:
+            # Get counts of pending items, both in one round trip
+            result = await db.execute(
+                select(
+                    select(func.count(Appointment.id)).where(
+                        and_(
+                            Appointment.created_by == user_id,
+                            Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.WAITING])
+                        )
+                    ).scalar_subquery().label('pending_appointments'),
+                    select(func.count(Queue.id)).where(
+                        Queue.status.in_([QueueStatus.WAITING, QueueStatus.SERVING])
+                    ).scalar_subquery().label('pending_queue_items')
                 )
             )
+            return dict(result.one()._mapping)
+        
+        try:
+            if force_refresh:
+                await _sync_status_cache.invalidate_key(str(user_id))
+            counts = await _sync_status_cache.get_or_load(str(user_id), load_counts)
             
             return {
                 'last_sync': datetime.utcnow().isoformat(),
-                'pending_appointments': pending_appointments.scalar(),
-                'pending_queue_items': pending_queue.scalar(),
+                'pending_appointments': counts['pending_appointments'],
+                'pending_queue_items': counts['pending_queue_items'],
                 'sync_available': True
             }
             
@@ -409,13 +708,13 @@ class SyncService:
                         await db.commit()
                 
                 elif conflict_type == 'appointment':
-                    appointment_update = AppointmentUpdate(**resolution_data['client_data'])
+                    appointment_update = AppointmentUpdate.model_validate(resolution_data['client_data'])
                     await AppointmentService.update_appointment(
                         db, UUID(conflict_id), appointment_update
                     )
                 
                 elif conflict_type == 'queue':
-                    queue_update = QueueUpdate(**resolution_data['client_data'])
+                    queue_update = QueueUpdate.model_validate(resolution_data['client_data'])
                     
                     # Check if status is provided, otherwise skip update
                     if queue_update.status is not None:
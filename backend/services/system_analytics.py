@@ -1,6 +1,6 @@
 from typing import Dict, Any
 from datetime import datetime, timedelta
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, true
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import (
@@ -10,59 +10,71 @@ from models import (
 
 async def get_system_overview(db: AsyncSession) -> Dict[str, Any]:
     """Get system overview statistics"""
-    # Total stats
-    total_users = await db.execute(select(func.count(User.id)).where(User.is_active == True))
-    total_doctors = await db.execute(select(func.count(Doctor.id)))
-    total_patients = await db.execute(select(func.count(Patient.id)))
-    total_appointments = await db.execute(select(func.count(Appointment.id)))
-    total_queues = await db.execute(select(func.count(Queue.id)))
-    
-    # Active queue stats
-    active_queues = await db.execute(
-        select(func.count(Queue.id))
-        .where(Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED]))
-    )
-    
-    # System stats for last 24 hours
     last_24h = datetime.utcnow() - timedelta(hours=24)
-    new_patients_24h = await db.execute(
-        select(func.count(Patient.id)).where(Patient.created_at >= last_24h)
-    )
-    new_appointments_24h = await db.execute(
-        select(func.count(Appointment.id)).where(Appointment.created_at >= last_24h)
-    )
-    completed_appointments_24h = await db.execute(
-        select(func.count(Appointment.id))
-        .where(
+    
+    # One scan per table computing all of that table's counts with FILTER;
+    # the single-row results are joined so the overview is one round trip
+    user_stats = select(
+        # Total stats
+        func.count(User.id).filter(User.is_active == True).label("users"),
+        # System uptime (days since first user created)
+        func.min(User.created_at).label("first_user_date")
+    ).subquery()
+    doctor_stats = select(func.count(Doctor.id).label("doctors")).subquery()
+    patient_stats = select(
+        func.count(Patient.id).label("patients"),
+        # System stats for last 24 hours
+        func.count(Patient.id).filter(Patient.created_at >= last_24h).label("new_patients")
+    ).subquery()
+    appointment_stats = select(
+        func.count(Appointment.id).label("appointments"),
+        func.count(Appointment.id).filter(Appointment.created_at >= last_24h).label("new_appointments"),
+        func.count(Appointment.id).filter(
             and_(
                 Appointment.updated_at >= last_24h,
                 Appointment.status == AppointmentStatus.COMPLETED
             )
+        ).label("completed_appointments")
+    ).subquery()
+    queue_stats = select(
+        func.count(Queue.id).label("queues"),
+        # Active queue stats
+        func.count(Queue.id).filter(
+            Queue.status.in_([QueueStatus.WAITING, QueueStatus.CALLED])
+        ).label("active_queues")
+    ).subquery()
+    
+    result = await db.execute(
+        select(user_stats, doctor_stats, patient_stats, appointment_stats, queue_stats)
+        .select_from(
+            user_stats
+            .join(doctor_stats, true())
+            .join(patient_stats, true())
+            .join(appointment_stats, true())
+            .join(queue_stats, true())
         )
     )
+    stats = result.one()
     
-    # System uptime (days since first user created)
-    first_user = await db.execute(select(func.min(User.created_at)))
-    first_user_date = first_user.scalar()
     system_uptime_days = 0
-    if first_user_date:
-        system_uptime_days = (datetime.utcnow() - first_user_date).days
+    if stats.first_user_date:
+        system_uptime_days = (datetime.utcnow() - stats.first_user_date).days
     
     return {
         "total_stats": {
-            "users": total_users.scalar() or 0,
-            "doctors": total_doctors.scalar() or 0,
-            "patients": total_patients.scalar() or 0,
-            "appointments": total_appointments.scalar() or 0,
-            "queues": total_queues.scalar() or 0,
+            "users": stats.users or 0,
+            "doctors": stats.doctors or 0,
+            "patients": stats.patients or 0,
+            "appointments": stats.appointments or 0,
+            "queues": stats.queues or 0,
         },
         "active_stats": {
-            "active_queues": active_queues.scalar() or 0,
+            "active_queues": stats.active_queues or 0,
         },
         "last_24h_stats": {
-            "new_patients": new_patients_24h.scalar() or 0,
-            "new_appointments": new_appointments_24h.scalar() or 0,
-            "completed_appointments": completed_appointments_24h.scalar() or 0,
+            "new_patients": stats.new_patients or 0,
+            "new_appointments": stats.new_appointments or 0,
+            "completed_appointments": stats.completed_appointments or 0,
         },
         "system_uptime_days": system_uptime_days,
     } 
\ No newline at end of file
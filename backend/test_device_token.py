@@ -1,4 +1,5 @@
-import requests
+import asyncio
+import httpx
 import json
 import os
 import sys
@@ -14,11 +15,11 @@ TEST_CREDENTIALS = {
     "password": "Password123"        # Replace with the correct password
 }
 
-def login_and_get_token():
+async def login_and_get_token(client):
     """Login to get authentication token"""
     print(f"Logging in with phone number: {TEST_CREDENTIALS['phone_number']}")
-    response = requests.post(
-        f"{API_URL}{LOGIN_ENDPOINT}",
+    response = await client.post(
+        LOGIN_ENDPOINT,
         json=TEST_CREDENTIALS
     )
     
@@ -31,7 +32,7 @@ def login_and_get_token():
     token_data = response.json()
     return token_data["access_token"]
 
-def test_register_device_token(access_token):
+async def test_register_device_token(client, access_token):
     """Test registering a device token"""
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -48,8 +49,8 @@ def test_register_device_token(access_token):
     print(f"Headers: {headers}")
     print(f"Payload: {json.dumps(payload, indent=2)}")
     
-    response = requests.post(
-        f"{API_URL}{TOKEN_ENDPOINT}",
+    response = await client.post(
+        TOKEN_ENDPOINT,
         headers=headers,
         json=payload
     )
@@ -64,16 +65,18 @@ def test_register_device_token(access_token):
         
     return response.status_code == 200
 
-if __name__ == "__main__":
+async def main():
     print("Device Token Registration Test")
     print("=============================")
     print(f"API URL: {API_URL}")
     
     try:
-        access_token = login_and_get_token()
-        print(f"Successfully logged in and got access token")
-        
-        success = test_register_device_token(access_token)
+        # One client for both requests, so the login connection is reused
+        async with httpx.AsyncClient(base_url=API_URL, timeout=10) as client:
+            access_token = await login_and_get_token(client)
+            print(f"Successfully logged in and got access token")
+            
+            success = await test_register_device_token(client, access_token)
         
         if success:
             print("\n✅ Device token registration successful!")
@@ -81,4 +84,7 @@ if __name__ == "__main__":
             print("\n❌ Device token registration failed!")
             
     except Exception as e:
-        print(f"\n❌ Error occurred during test: {str(e)}") 
\ No newline at end of file
+        print(f"\n❌ Error occurred during test: {str(e)}")
+
+if __name__ == "__main__":
+    asyncio.run(main()) 
\ No newline at end of file
@@ -1,11 +1,14 @@
-import requests
+import asyncio
+import httpx
 import json
 
+API_URL = "http://localhost:8000"
+
 # Test the queue update endpoint
-def test_queue_update():
+async def test_queue_update(client):
     # First, let's get the current queue to see what appointments are available
     try:
-        response = requests.get('http://localhost:8000/api/v1/staff/queue')
+        response = await client.get('/api/v1/staff/queue')
         print("Queue response status:", response.status_code)
         if response.status_code == 200:
             queue_data = response.json()
@@ -22,8 +25,8 @@ def test_queue_update():
                     "status": "waiting"
                 }
                 
-                update_response = requests.put(
-                    f'http://localhost:8000/api/v1/staff/queue/{appointment_id}',
+                update_response = await client.put(
+                    f'/api/v1/staff/queue/{appointment_id}',
                     json=update_data,
                     headers={'Content-Type': 'application/json'}
                 )
@@ -42,5 +45,10 @@ def test_queue_update():
     except Exception as e:
         print(f"Error testing queue update: {e}")
 
+async def main():
+    # One client for every request, so the connection is kept alive between them
+    async with httpx.AsyncClient(base_url=API_URL, timeout=10) as client:
+        await test_queue_update(client)
+
 if __name__ == "__main__":
-    test_queue_update() 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file
@@ -1,8 +1,10 @@
 import pytest
 import asyncio
-from typing import AsyncGenerator, Generator
-from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import os
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 
@@ -12,11 +14,30 @@ from core.config import settings
 from models import User, Patient, Doctor, Appointment, Queue, Notification, AuditLog
 from core.security import get_password_hash
 from services.auth_service import create_access_token
+from utils.datetime_utils import get_timezone_aware_now
 import uuid
-from datetime import datetime, date
+from datetime import date
+from functools import lru_cache
 
-# Test database URL
-TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    from blockbuster import BlockBuster, blockbuster_ctx
+except ImportError:
+    blockbuster_ctx = None
+
+# created_at/updated_at of every seeded row; the rows are inserted once per
+# session, so one aware timestamp serves them all
+SEED_TIMESTAMP = get_timezone_aware_now()
+
+# Test database URL; an in-memory database that lives as long as the
+# StaticPool connection below, so nothing touches the disk. Named per
+# pytest-xdist worker so parallel runs (pytest -n auto) never share one
+TEST_WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "master")
+TEST_DATABASE_URL = f"sqlite+aiosqlite:///file:{TEST_WORKER_ID}?mode=memory&cache=shared&uri=true"
 
 # Create test engine
 test_engine = create_async_engine(
@@ -25,179 +46,245 @@ test_engine = create_async_engine(
     poolclass=StaticPool,
 )
 
-TestingSessionLocal = async_sessionmaker(
-    test_engine, class_=AsyncSession, expire_on_commit=False
-)
+# bcrypt is deliberately slow; seed fixtures reuse one hash per password.
+# TestPasswordHashing imports the real function and is unaffected
+cached_password_hash = lru_cache(maxsize=None)(get_password_hash)
+
+# pysqlite starts transactions lazily and mishandles SAVEPOINT; let
+# SQLAlchemy emit BEGIN itself so each test can run in a savepoint
+@event.listens_for(test_engine.sync_engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(test_engine.sync_engine, "begin")
+def _begin_sqlite_transaction(connection):
+    connection.exec_driver_sql("BEGIN")
+
+# Session of the running test, served to the app by the get_db override.
+# Not a ContextVar: pytest-asyncio sets up each async fixture in its own
+# task, so a value set in db_session would never reach the test's requests
+_current_db_session: Dict[str, AsyncSession] = {}
+
+def _get_test_db() -> AsyncSession:
+    return _current_db_session["session"]
 
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
+    """Create an instance of the default event loop for the test session.
+    
+    Uses uvloop when it is installed (not available on Windows).
+    """
+    loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
     yield loop
     loop.close()
 
-@pytest.fixture(scope="function")
-async def db_session() -> AsyncGenerator[AsyncSession, None]:
-    """Create a test database session."""
-    async with test_engine.begin() as connection:
+@pytest.fixture(scope="session", autouse=True)
+def blockbuster() -> Generator[Optional["BlockBuster"], None, None]:
+    """Fail any test that makes a blocking call on the event loop.
+    
+    bcrypt hashing is CPU-bound rather than blocking I/O, so it is not flagged.
+    Does nothing when blockbuster is not installed.
+    """
+    if blockbuster_ctx is None:
+        yield None
+        return
+    with blockbuster_ctx() as bb:
+        yield bb
+
+@pytest.fixture(scope="session")
+async def connection() -> AsyncGenerator[AsyncConnection, None]:
+    """Create the schema once and share its connection across the session.
+    
+    Nothing is dropped afterwards; the in-memory database goes away with
+    the engine.
+    """
+    async with test_engine.connect() as connection:
         await connection.run_sync(Base.metadata.create_all)
+        await connection.commit()
         
-        async with TestingSessionLocal() as session:
-            yield session
-            
-        await connection.run_sync(Base.metadata.drop_all)
+        yield connection
+    
+    await test_engine.dispose()
+
+@pytest.fixture(scope="session")
+async def seed_session(connection: AsyncConnection) -> AsyncGenerator[AsyncSession, None]:
+    """Create a session for test data shared by the whole test session.
+    
+    Seed fixtures must end with a commit so no transaction is left open on
+    the shared connection when a test begins.
+    """
+    async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+        yield session
 
 @pytest.fixture(scope="function")
-async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
-    """Create a test client."""
-    def get_test_db():
-        return db_session
+async def db_session(connection: AsyncConnection) -> AsyncGenerator[AsyncSession, None]:
+    """Create a test database session rolled back after the test.
     
-    app.dependency_overrides[get_db] = get_test_db
+    Commits inside the test only release a savepoint, so every test starts
+    from the shared seed data.
+    """
+    transaction = await connection.begin()
+    await connection.begin_nested()
+    async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+        # SQLAlchemy 1.4 recipe: a commit in the test ends the savepoint, so
+        # open a new one and keep the outer transaction for the rollback
+        @event.listens_for(session.sync_session, "after_transaction_end")
+        def _restart_savepoint(sync_session, sync_transaction):
+            if not connection.sync_connection.in_nested_transaction():
+                connection.sync_connection.begin_nested()
+        
+        _current_db_session["session"] = session
+        yield session
+        del _current_db_session["session"]
+    await transaction.rollback()
+
+@pytest.fixture(scope="session")
+async def _client() -> AsyncGenerator[AsyncClient, None]:
+    """Create the ASGI test client shared by every test.
     
-    async with AsyncClient(app=app, base_url="http://test") as ac:
+    get_db is overridden once for the session and serves the running
+    test's db_session.
+    """
+    app.dependency_overrides[get_db] = _get_test_db
+    
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
     
     app.dependency_overrides.clear()
 
-@pytest.fixture
+@pytest.fixture(scope="function")
+def client(_client: AsyncClient, db_session: AsyncSession) -> AsyncClient:
+    """Create a test client."""
+    return _client
+
+@pytest.fixture(scope="session")
 def test_client() -> TestClient:
     """Create a sync test client for simple tests."""
     return TestClient(app)
 
 # Test data fixtures
-@pytest.fixture
-async def test_patient(db_session: AsyncSession):
-    """Create a test patient."""
+@pytest.fixture(scope="session")
+def make_user() -> Callable[..., User]:
+    """Return a factory building (not inserting) a staff-side user."""
+    def _make(role: str, username: str, password: str, first_name: str, last_name: str) -> User:
+        return User(
+            id=uuid.uuid4(),
+            username=username,
+            password_hash=cached_password_hash(password),
+            role=role,
+            first_name=first_name,
+            last_name=last_name,
+            email=f"{username}@example.com",
+            created_at=SEED_TIMESTAMP,
+            updated_at=SEED_TIMESTAMP
+        )
+    return _make
+
+@pytest.fixture(scope="session")
+async def seeded_db(seed_session: AsyncSession, make_user: Callable[..., User]) -> Dict[str, Any]:
+    """Insert the standard test rows in one transaction.
+    
+    Ids and every column with a server-side default are set up front, so
+    nothing is read back (no refresh) after the commit.
+    """
     patient = Patient(
         id=uuid.uuid4(),
         phone_number="+1234567890",
-        password_hash=get_password_hash("testpassword"),
+        password_hash=cached_password_hash("testpassword"),
         first_name="John",
         last_name="Doe",
         date_of_birth=date(1990, 1, 1),
         gender="male",
         email="john.doe@example.com",
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        version=0,
+        created_at=SEED_TIMESTAMP,
+        updated_at=SEED_TIMESTAMP
     )
-    db_session.add(patient)
-    await db_session.commit()
-    await db_session.refresh(patient)
-    return patient
-
-@pytest.fixture
-async def test_admin_user(db_session: AsyncSession):
-    """Create a test admin user."""
-    user = User(
-        id=uuid.uuid4(),
-        username="admin",
-        password_hash=get_password_hash("adminpassword"),
-        role="admin",
-        first_name="Admin",
-        last_name="User",
-        email="admin@example.com",
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
-    )
-    db_session.add(user)
-    await db_session.commit()
-    await db_session.refresh(user)
-    return user
-
-@pytest.fixture
-async def test_staff_user(db_session: AsyncSession):
-    """Create a test staff user."""
-    user = User(
-        id=uuid.uuid4(),
-        username="staff",
-        password_hash=get_password_hash("staffpassword"),
-        role="staff",
-        first_name="Staff",
-        last_name="User",
-        email="staff@example.com",
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
-    )
-    db_session.add(user)
-    await db_session.commit()
-    await db_session.refresh(user)
-    return user
-
-@pytest.fixture
-async def test_doctor_user(db_session: AsyncSession):
-    """Create a test doctor user."""
-    user = User(
-        id=uuid.uuid4(),
-        username="doctor",
-        password_hash=get_password_hash("doctorpassword"),
-        role="doctor",
-        first_name="Doctor",
-        last_name="Smith",
-        email="doctor@example.com",
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
-    )
-    db_session.add(user)
-    await db_session.commit()
-    await db_session.refresh(user)
-    
+    admin_user = make_user("admin", "admin", "adminpassword", "Admin", "User")
+    staff_user = make_user("staff", "staff", "staffpassword", "Staff", "User")
+    doctor_user = make_user("doctor", "doctor", "doctorpassword", "Doctor", "Smith")
     doctor = Doctor(
         id=uuid.uuid4(),
-        user_id=user.id,
+        user_id=doctor_user.id,
         specialization="General Medicine",
         license_number="DOC123456",
         consultation_fee=100.00,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        created_at=SEED_TIMESTAMP,
+        updated_at=SEED_TIMESTAMP
     )
-    db_session.add(doctor)
-    await db_session.commit()
-    await db_session.refresh(doctor)
-    
-    return user, doctor
-
-@pytest.fixture
-async def test_appointment(db_session: AsyncSession, test_patient, test_staff_user):
-    """Create a test appointment."""
     appointment = Appointment(
         id=uuid.uuid4(),
-        patient_id=test_patient.id,
-        created_by=test_staff_user.id,
+        patient_id=patient.id,
+        created_by=staff_user.id,
         appointment_date=date.today(),
         urgency_level="normal",
         reason="Regular checkup",
         status="scheduled",
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        version=0,
+        created_at=SEED_TIMESTAMP,
+        updated_at=SEED_TIMESTAMP
     )
-    db_session.add(appointment)
-    await db_session.commit()
-    await db_session.refresh(appointment)
-    return appointment
+    
+    # The unit of work orders the INSERTs by foreign key
+    seed_session.add_all([patient, admin_user, staff_user, doctor_user, doctor, appointment])
+    await seed_session.commit()
+    
+    return {
+        "patient": patient,
+        "admin_user": admin_user,
+        "staff_user": staff_user,
+        "doctor_user": doctor_user,
+        "doctor": doctor,
+        "appointment": appointment,
+    }
+
+@pytest.fixture(scope="session")
+def test_patient(seeded_db):
+    """Create a test patient."""
+    return seeded_db["patient"]
+
+@pytest.fixture(scope="session")
+def test_admin_user(seeded_db):
+    """Create a test admin user."""
+    return seeded_db["admin_user"]
+
+@pytest.fixture(scope="session")
+def test_staff_user(seeded_db):
+    """Create a test staff user."""
+    return seeded_db["staff_user"]
+
+@pytest.fixture(scope="session")
+def test_doctor_user(seeded_db):
+    """Create a test doctor user."""
+    return seeded_db["doctor_user"], seeded_db["doctor"]
+
+@pytest.fixture(scope="session")
+def test_appointment(seeded_db):
+    """Create a test appointment."""
+    return seeded_db["appointment"]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def patient_token(test_patient):
     """Create a JWT token for patient."""
     return create_access_token(
         data={"sub": str(test_patient.id), "type": "patient"}
     )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def admin_token(test_admin_user):
     """Create a JWT token for admin."""
     return create_access_token(
         data={"sub": str(test_admin_user.id), "type": "user", "role": "admin"}
     )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def staff_token(test_staff_user):
     """Create a JWT token for staff."""
     return create_access_token(
         data={"sub": str(test_staff_user.id), "type": "user", "role": "staff"}
     )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def doctor_token(test_doctor_user):
     """Create a JWT token for doctor."""
     user, doctor = test_doctor_user
@@ -205,22 +292,22 @@ def doctor_token(test_doctor_user):
         data={"sub": str(user.id), "type": "user", "role": "doctor"}
     )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def auth_headers_patient(patient_token):
     """Create authorization headers for patient."""
     return {"Authorization": f"Bearer {patient_token}"}
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def auth_headers_admin(admin_token):
     """Create authorization headers for admin."""
     return {"Authorization": f"Bearer {admin_token}"}
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def auth_headers_staff(staff_token):
     """Create authorization headers for staff."""
     return {"Authorization": f"Bearer {staff_token}"}
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def auth_headers_doctor(doctor_token):
     """Create authorization headers for doctor."""
     return {"Authorization": f"Bearer {doctor_token}"}
\ No newline at end of file
@@ -34,19 +34,21 @@ class TestPasswordHashing:
         
         assert verify_password(wrong_password, hashed) is False
 
+@pytest.fixture(scope="module")
+def sample_token():
+    """Create one patient token shared by the JWT tests."""
+    return create_access_token({"sub": "user123", "type": "patient"})
+
 class TestJWTTokens:
     """Test JWT token creation and verification."""
     
-    def test_create_access_token(self):
+    def test_create_access_token(self, sample_token):
         """Test JWT token creation."""
-        data = {"sub": "user123", "type": "patient"}
-        token = create_access_token(data)
-        
-        assert isinstance(token, str)
-        assert len(token) > 0
+        assert isinstance(sample_token, str)
+        assert len(sample_token) > 0
         
         # Decode token to verify content
-        decoded = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        decoded = jwt.decode(sample_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         assert decoded["sub"] == "user123"
         assert decoded["type"] == "patient"
         assert "exp" in decoded
@@ -64,12 +66,9 @@ class TestJWTTokens:
         # Allow 1 minute tolerance
         assert abs((exp_time - expected_time).total_seconds()) < 60
     
-    def test_verify_token_valid(self):
+    def test_verify_token_valid(self, sample_token):
         """Test token verification with valid token."""
-        data = {"sub": "user123", "type": "patient"}
-        token = create_access_token(data)
-        
-        payload = verify_token(token)
+        payload = verify_token(sample_token)
         assert payload["sub"] == "user123"
         assert payload["type"] == "patient"
     
@@ -0,0 +1,81 @@
+import asyncio
+
+from utils.cache import AsyncTTLCache
+
+class TestAsyncTTLCache:
+    """Test the in-process TTL cache."""
+    
+    async def test_concurrent_misses_load_once(self):
+        """Test concurrent callers for one missing key share a single load."""
+        cache = AsyncTTLCache(ttl=60)
+        calls = 0
+        
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+        
+        results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+        
+        assert results == ["value"] * 10
+        assert calls == 1
+    
+    async def test_expired_entry_reloads(self):
+        """Test an entry past its TTL is loaded again."""
+        cache = AsyncTTLCache(ttl=0)
+        values = iter([1, 2])
+        
+        async def loader():
+            return next(values)
+        
+        assert await cache.get_or_load("key", loader) == 1
+        assert await cache.get_or_load("key", loader) == 2
+    
+    async def test_invalidate_drops_entries(self):
+        """Test invalidate() forces the next call to load again."""
+        cache = AsyncTTLCache(ttl=60)
+        values = iter([1, 2])
+        
+        async def loader():
+            return next(values)
+        
+        assert await cache.get_or_load("key", loader) == 1
+        cache.invalidate()
+        assert await cache.get_or_load("key", loader) == 2
+    
+    async def test_invalidate_discards_running_load(self):
+        """Test a load running when the cache is invalidated is not stored."""
+        cache = AsyncTTLCache(ttl=60)
+        started = asyncio.Event()
+        release = asyncio.Event()
+        values = iter(["stale", "fresh"])
+        
+        async def slow_loader():
+            started.set()
+            await release.wait()
+            return next(values)
+        
+        pending = asyncio.create_task(cache.get_or_load("key", slow_loader))
+        await started.wait()
+        cache.invalidate()
+        release.set()
+        
+        # The caller that started the load still gets its result
+        assert await pending == "stale"
+        assert await cache.get_or_load("key", slow_loader) == "fresh"
+    
+    async def test_invalidate_key(self):
+        """Test invalidate_key() only drops the given key."""
+        cache = AsyncTTLCache(ttl=60)
+        values = iter([1, 2, 3])
+        
+        async def loader():
+            return next(values)
+        
+        assert await cache.get_or_load("a", loader) == 1
+        assert await cache.get_or_load("b", loader) == 2
+        cache.invalidate_key("a")
+        
+        assert await cache.get_or_load("a", loader) == 3
+        assert await cache.get_or_load("b", loader) == 2
@@ -7,14 +7,15 @@ class TestPatientRegistration:
     
     async def test_register_patient_success(self, client: AsyncClient):
         """Test successful patient registration."""
+        # Must not collide with the session-wide test_patient
         patient_data = {
-            "phone_number": "+1234567890",
+            "phone_number": "+1234567891",
             "password": "testpassword123",
             "first_name": "John",
             "last_name": "Doe",
             "date_of_birth": "1990-01-01",
             "gender": "male",
-            "email": "john.doe@example.com"
+            "email": "john.doe.new@example.com"
         }
         
         response = await client.post("/api/patients/register", json=patient_data)
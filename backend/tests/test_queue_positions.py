@@ -0,0 +1,34 @@
+from uuid import uuid4
+
+from services.queue_service import _position_digest
+
+class TestPositionDigest:
+    """Test the fingerprint used to skip repeated queue position notifications."""
+    
+    def test_digest_ignores_order(self):
+        """Test the digest does not depend on the order of the updates."""
+        updates = [(uuid4(), position, position * 10) for position in range(1, 6)]
+        
+        assert _position_digest(updates) == _position_digest(list(reversed(updates)))
+    
+    def test_digest_ignores_wait_time(self):
+        """Test a changed wait estimate alone does not change the digest."""
+        patient_id = uuid4()
+        
+        assert _position_digest([(patient_id, 1, 10)]) == _position_digest([(patient_id, 1, 25)])
+    
+    def test_digest_changes_with_position(self):
+        """Test moving a patient changes the digest."""
+        first, second = uuid4(), uuid4()
+        
+        assert _position_digest([(first, 1, 10), (second, 2, 20)]) != _position_digest(
+            [(first, 2, 20), (second, 1, 10)]
+        )
+    
+    def test_digest_changes_with_patients(self):
+        """Test a different set of patients changes the digest."""
+        patient_id = uuid4()
+        
+        assert _position_digest([(patient_id, 1, 10)]) != _position_digest(
+            [(patient_id, 1, 10), (uuid4(), 2, 20)]
+        )
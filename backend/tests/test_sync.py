@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime, timezone
+from uuid import uuid4
+from fastapi import HTTPException
+
+from api.routes.sync import get_server_updates
+from services.sync_service import encode_sync_cursor, decode_sync_cursor
+
+class TestSyncCursor:
+    """Test sync cursor encoding and decoding."""
+    
+    def test_cursor_round_trip(self):
+        """Test a decoded cursor matches the one encoded."""
+        cursor = {
+            "patients": (datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc), uuid4()),
+            "queue": (datetime(2024, 5, 1, 9, 15, 42, 123456, tzinfo=timezone.utc), uuid4())
+        }
+        
+        assert decode_sync_cursor(encode_sync_cursor(cursor)) == cursor
+    
+    def test_cursor_is_url_safe(self):
+        """Test the encoded cursor can be passed as a query parameter."""
+        token = encode_sync_cursor({
+            "appointments": (datetime(2024, 5, 1, tzinfo=timezone.utc), uuid4())
+        })
+        
+        assert all(c.isalnum() or c in "-_=" for c in token)
+    
+    @pytest.mark.parametrize("token", [
+        "not-a-cursor",
+        "bm90IGpzb24=",  # base64 of "not json"
+        "eyJwYXRpZW50cyI6IDF9",  # {"patients": 1}
+        "eyJwYXRpZW50cyI6IFsieCIsICJ5Il19"  # {"patients": ["x", "y"]}
+    ])
+    def test_decode_malformed_cursor(self, token):
+        """Test malformed cursors are rejected."""
+        with pytest.raises(ValueError, match="Invalid sync cursor"):
+            decode_sync_cursor(token)
+    
+    async def test_server_updates_malformed_cursor(self):
+        """Test the server updates endpoint answers 400 for a malformed cursor."""
+        with pytest.raises(HTTPException) as exc_info:
+            await get_server_updates(cursor="not-a-cursor", db=None, current_user=None)
+        
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "Invalid sync cursor"
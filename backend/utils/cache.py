@@ -0,0 +1,153 @@
+"""
+Small caching helpers.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from api.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+
+def get_redis():
+    """
+    Return the shared asyncio Redis client, or None when REDIS_URL is not set.
+    """
+    global _redis_client
+    if _redis_client is None and settings.REDIS_URL:
+        from redis.asyncio import Redis
+        _redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+class AsyncTTLCache:
+    """
+    TTL cache for coroutine results with per-key single-flight loading.
+    
+    Concurrent callers asking for the same missing key wait on one loader
+    instead of each recomputing it. invalidate() drops all entries; a load
+    that was already running when the cache was invalidated is not stored.
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._generation = 0
+    
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, calling loader() when it is missing or expired.
+        
+        Args:
+            key (Hashable): Cache key
+            loader (Callable[[], Awaitable[Any]]): Coroutine factory producing the value
+            
+        Returns:
+            Any: Cached or freshly loaded value
+        """
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another caller may have filled the entry while we waited
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            
+            generation = self._generation
+            value = await loader()
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+    
+    def invalidate(self) -> None:
+        """Drop every cached entry"""
+        self._generation += 1
+        self._entries.clear()
+    
+    def invalidate_key(self, key: Hashable) -> None:
+        """Drop the cached entry for key"""
+        self._entries.pop(key, None)
+
+
+class SharedTTLCache:
+    """
+    TTL cache for JSON-serialisable coroutine results shared between workers.
+    
+    Entries live in Redis when REDIS_URL is configured so every API process
+    sees the same values and invalidations; otherwise (or if Redis is
+    unreachable) it falls back to an in-process AsyncTTLCache. Invalidation
+    bumps a generation number that is part of every key, so stale entries
+    are simply never read again and expire on their own.
+    """
+    
+    def __init__(self, namespace: str, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._local = AsyncTTLCache(ttl=ttl)
+        self._generation_key = f"{namespace}:generation"
+    
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, calling loader() when it is missing or expired.
+        
+        Args:
+            key (str): Cache key, unique within the namespace
+            loader (Callable[[], Awaitable[Any]]): Coroutine factory producing the value
+            
+        Returns:
+            Any: Cached or freshly loaded value
+        """
+        redis = get_redis()
+        if redis is None:
+            return await self._local.get_or_load(key, loader)
+        
+        try:
+            generation = await redis.get(self._generation_key) or "0"
+            redis_key = f"{self.namespace}:{generation}:{key}"
+            cached = await redis.get(redis_key)
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable for {self.namespace}: {str(e)}")
+            return await self._local.get_or_load(key, loader)
+        
+        if cached is not None:
+            return json.loads(cached)
+        
+        value = await loader()
+        try:
+            await redis.set(redis_key, json.dumps(value), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to store {redis_key} in Redis: {str(e)}")
+        return value
+    
+    async def invalidate(self) -> None:
+        """Drop every cached entry in this namespace"""
+        self._local.invalidate()
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.incr(self._generation_key)
+        except Exception as e:
+            logger.warning(f"Failed to invalidate {self.namespace} in Redis: {str(e)}")
+    
+    async def invalidate_key(self, key: str) -> None:
+        """Drop the cached entry for key"""
+        self._local.invalidate_key(key)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            generation = await redis.get(self._generation_key) or "0"
+            await redis.delete(f"{self.namespace}:{generation}:{key}")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate {key} in {self.namespace} in Redis: {str(e)}")
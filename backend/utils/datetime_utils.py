@@ -3,9 +3,11 @@ Utility functions for handling timezone-aware datetime operations.
 This module provides consistent datetime handling across the application.
 """
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 
+_UTC = timezone.utc
+
 
 def get_timezone_aware_now() -> datetime:
     """
@@ -17,6 +19,19 @@ def get_timezone_aware_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def get_utc_today() -> date:
+    """
+    Get the current calendar day in UTC.
+    
+    This is the day queue.queue_date is computed in, so daily queue lookups
+    and numbering should compare against this rather than date.today().
+    
+    Returns:
+        date: Today's date in UTC
+    """
+    return datetime.now(timezone.utc).date()
+
+
 def make_timezone_aware(dt: datetime) -> datetime:
     """
     Make a datetime timezone-aware if it isn't already.
@@ -27,9 +42,7 @@ def make_timezone_aware(dt: datetime) -> datetime:
     Returns:
         datetime: Timezone-aware datetime in UTC
     """
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=_UTC)
 
 
 def get_utc_datetime(year: int, month: int, day: int, 
@@ -66,6 +79,9 @@ def format_datetime_for_display(dt: Optional[datetime]) -> Optional[str]:
     if dt is None:
         return None
     
-    # Make sure it's timezone-aware
-    dt = make_timezone_aware(dt)
-    return dt.isoformat() 
\ No newline at end of file
+    # Aware values are formatted as they are; only naive ones are copied.
+    # Not memoized: aware datetimes for the same instant in different zones
+    # compare and hash equal but format differently. isoformat() is
+    # implemented in C and is faster than strftime, which also writes the
+    # offset as +0000 instead of +00:00
+    return make_timezone_aware(dt).isoformat() 
\ No newline at end of file
@@ -0,0 +1,19 @@
+import logging
+
+from database import AsyncSessionLocal
+from services.queue_analytics import refresh_queue_stats_views
+from workers.celery_app import celery_app, run_in_worker_loop
+
+logger = logging.getLogger(__name__)
+
+
+async def _refresh_queue_stats() -> None:
+    async with AsyncSessionLocal() as db:  # type: ignore
+        await refresh_queue_stats_views(db)
+
+
+@celery_app.task(name="analytics.refresh_queue_stats")
+def refresh_queue_stats() -> None:
+    """Nightly refresh of the queue analytics rollups"""
+    run_in_worker_loop(_refresh_queue_stats())
+    logger.info("Refreshed queue analytics rollups")
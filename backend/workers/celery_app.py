@@ -0,0 +1,43 @@
+from typing import Any, Awaitable, Optional
+import asyncio
+
+from celery import Celery
+from celery.schedules import crontab
+
+from api.core.config import settings
+
+# Celery application for out-of-process notification delivery
+celery_app = Celery(
+    "notifications",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["workers.notification_tasks", "workers.analytics_tasks"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_acks_late=True,
+    task_ignore_result=True,
+    worker_prefetch_multiplier=4,
+    beat_schedule={
+        # Roll the previous day into the analytics materialized view
+        "refresh-queue-hourly-stats": {
+            "task": "analytics.refresh_queue_stats",
+            "schedule": crontab(hour=0, minute=5),
+        },
+    }
+)
+
+# Worker-process event loop, reused so pooled database connections, the
+# shared HTTP session and the FCM token cache survive between tasks
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_in_worker_loop(coro: Awaitable[Any]) -> Any:
+    """Run a coroutine to completion on the worker process's event loop"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop.run_until_complete(coro)
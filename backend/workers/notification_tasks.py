@@ -0,0 +1,129 @@
+from typing import Any, Dict, Optional, Set
+from uuid import UUID
+import asyncio
+import logging
+
+from sqlalchemy import select
+
+from api.core.config import settings
+from database import AsyncSessionLocal
+from models import Notification
+from services.notification_service import NOTIFICATION_STATUS_DISABLED, get_notification_service
+from workers.celery_app import celery_app, run_in_worker_loop
+
+logger = logging.getLogger(__name__)
+
+# NotificationService methods that may be dispatched through the worker
+NOTIFICATION_TASKS = {
+    "send_appointment_confirmation",
+    "send_queue_position_update",
+    "send_your_turn_notification",
+    "send_reminder_notification",
+    "send_appointment_cancelled",
+    "send_queue_position_notification",
+}
+
+# Strong references to in-process fallback tasks so they are not garbage collected
+_pending_tasks: Set[asyncio.Task] = set()
+
+
+class NotificationDeliveryError(Exception):
+    """Raised when a recorded notification was not delivered"""
+    
+    def __init__(self, notification_id: UUID, status: Optional[str]):
+        super().__init__(f"Notification {notification_id} not delivered (status: {status})")
+        self.notification_id = notification_id
+
+
+async def run_notification_task(
+    task_name: str,
+    notification_id: Optional[UUID] = None,
+    **kwargs: Any
+) -> None:
+    """
+    Run a NotificationService send method with its own database session.
+    
+    When notification_id is given the existing notification row is delivered
+    again instead, so a retry never records or sends a duplicate. Raises
+    NotificationDeliveryError when delivery failed in a way a retry may fix;
+    a notification whose channel is not configured is left DISABLED.
+    """
+    if task_name not in NOTIFICATION_TASKS:
+        raise ValueError(f"Unknown notification task: {task_name}")
+    
+    service = get_notification_service()
+    async with AsyncSessionLocal() as db:  # type: ignore
+        if notification_id is None:
+            notification = await getattr(service, task_name)(db=db, **kwargs)
+        else:
+            notification = await service.resend_notification(db, notification_id)
+        
+        # Nothing was recorded (unknown patient, no channel) so there is nothing to retry
+        if notification is None:
+            return
+        
+        status = await db.scalar(
+            select(Notification.status).where(Notification.id == notification.id)
+        )
+        if status not in ("SENT", NOTIFICATION_STATUS_DISABLED):
+            raise NotificationDeliveryError(notification.id, status)
+
+
+def _serialize_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: str(value) if isinstance(value, UUID) else value for key, value in kwargs.items()}
+
+
+def _deserialize_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: UUID(value) if key.endswith("_id") and isinstance(value, str) else value
+        for key, value in kwargs.items()
+    }
+
+
+@celery_app.task(bind=True, name="notifications.send", max_retries=5)
+def send_notification(self, task_name: str, **kwargs: Any) -> None:
+    """Celery entrypoint dispatching to NotificationService by method name"""
+    countdown = min(2 ** self.request.retries, 300)
+    try:
+        run_in_worker_loop(
+            run_notification_task(task_name, **_deserialize_kwargs(kwargs))
+        )
+    except NotificationDeliveryError as e:
+        # Retry against the recorded row so the resend reuses its notification id
+        raise self.retry(
+            exc=e,
+            countdown=countdown,
+            kwargs={**kwargs, "notification_id": str(e.notification_id)}
+        )
+    except Exception as e:
+        raise self.retry(exc=e, countdown=countdown)
+
+
+def _log_task_result(task: asyncio.Task) -> None:
+    _pending_tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error(f"In-process notification task failed: {exc}", exc_info=exc)
+
+
+async def enqueue_notification(task_name: str, **kwargs: Any) -> None:
+    """
+    Hand a notification off for delivery outside the request cycle.
+    
+    Publishes to the Celery worker when a broker is configured; otherwise the
+    send runs as a detached task on the current event loop.
+    """
+    if task_name not in NOTIFICATION_TASKS:
+        raise ValueError(f"Unknown notification task: {task_name}")
+    
+    if settings.CELERY_BROKER_URL:
+        await asyncio.to_thread(
+            send_notification.delay, task_name, **_serialize_kwargs(kwargs)
+        )
+        return
+    
+    task = asyncio.create_task(run_notification_task(task_name, **kwargs))
+    _pending_tasks.add(task)
+    task.add_done_callback(_log_task_result)